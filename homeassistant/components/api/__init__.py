@@ -34,7 +34,6 @@ from homeassistant.const import (
 import homeassistant.core as ha
 from homeassistant.exceptions import ServiceNotFound, TemplateError, Unauthorized
 from homeassistant.helpers import template
-from homeassistant.helpers.json import JSONEncoder
 from homeassistant.helpers.network import NoURLAvailableError, get_url
 from homeassistant.helpers.service import async_get_all_descriptions
 from homeassistant.helpers.state import AsyncTrackStates
@@ -120,7 +119,7 @@ class APIEventStream(HomeAssistantView):
             if event.event_type == EVENT_HOMEASSISTANT_STOP:
                 data = stop_obj
             else:
-                data = json.dumps(event, cls=JSONEncoder)
+                data = event.as_json()
 
             await to_write.put(data)
 
@@ -229,7 +228,13 @@ class APIStatesView(HomeAssistantView):
             for state in request.app["hass"].states.async_all()
             if entity_perm(state.entity_id, "read")
         ]
-        return self.json(states)
+        try:
+            return self.json_serialized(
+                "[" + ",".join(state.as_json() for state in states) + "]"
+            )
+        except (ValueError, TypeError):
+            # Logs the error
+            return self.json(states)
 
 
 class APIEntityStateView(HomeAssistantView):
@@ -247,7 +252,11 @@ class APIEntityStateView(HomeAssistantView):
 
         state = request.app["hass"].states.get(entity_id)
         if state:
-            return self.json(state)
+            try:
+                return self.json_serialized(state.as_json())
+            except (ValueError, TypeError):
+                # Logs the error
+                return self.json(state)
         return self.json_message("Entity not found.", HTTP_NOT_FOUND)
 
     async def post(self, request, entity_id):
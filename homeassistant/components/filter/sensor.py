@@ -13,6 +13,7 @@ import voluptuous as vol
 from homeassistant.components import history
 from homeassistant.components.binary_sensor import DOMAIN as BINARY_SENSOR_DOMAIN
 from homeassistant.components.input_number import DOMAIN as INPUT_NUMBER_DOMAIN
+from homeassistant.components.recorder.util import async_add_read_job
 from homeassistant.components.sensor import (
     DEVICE_CLASSES as SENSOR_DEVICE_CLASSES,
     DOMAIN as SENSOR_DOMAIN,
@@ -278,25 +279,27 @@ class SensorFilter(Entity):
 
             # Retrieve the largest window_size of each type
             if largest_window_items > 0:
-                filter_history = await self.hass.async_add_executor_job(
+                filter_history = await async_add_read_job(
+                    self.hass,
                     partial(
                         history.get_last_state_changes,
                         self.hass,
                         largest_window_items,
                         entity_id=self._entity,
-                    )
+                    ),
                 )
                 if self._entity in filter_history:
                     history_list.extend(filter_history[self._entity])
             if largest_window_time > timedelta(seconds=0):
                 start = dt_util.utcnow() - largest_window_time
-                filter_history = await self.hass.async_add_executor_job(
+                filter_history = await async_add_read_job(
+                    self.hass,
                     partial(
                         history.state_changes_during_period,
                         self.hass,
                         start,
                         entity_id=self._entity,
-                    )
+                    ),
                 )
                 if self._entity in filter_history:
                     history_list.extend(
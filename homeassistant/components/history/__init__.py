@@ -1,13 +1,18 @@
 """Provide pre-made queries on top of the recorder component."""
+import asyncio
 from collections import defaultdict
 from datetime import datetime as dt, timedelta
-from itertools import groupby
-import json
+from functools import partial
+from itertools import chain, groupby
 import logging
+import math
+from operator import attrgetter
+import threading
 import time
 from typing import Iterable, Optional, cast
 
 from aiohttp import web
+from aiohttp.hdrs import CONTENT_TYPE
 from sqlalchemy import and_, bindparam, func, not_, or_
 from sqlalchemy.ext import baked
 import voluptuous as vol
@@ -15,16 +20,21 @@ import voluptuous as vol
 from homeassistant.components import recorder
 from homeassistant.components.http import HomeAssistantView
 from homeassistant.components.recorder.models import (
+    StateAttributes,
     States,
     process_timestamp,
-    process_timestamp_to_utc_isoformat,
 )
-from homeassistant.components.recorder.util import execute, session_scope
+from homeassistant.components.recorder.util import (
+    async_add_read_job,
+    execute,
+    session_scope,
+)
 from homeassistant.const import (
     CONF_DOMAINS,
     CONF_ENTITIES,
     CONF_EXCLUDE,
     CONF_INCLUDE,
+    CONTENT_TYPE_JSON,
     HTTP_BAD_REQUEST,
 )
 from homeassistant.core import Context, State, split_entity_id
@@ -33,9 +43,12 @@ from homeassistant.helpers.entityfilter import (
     CONF_ENTITY_GLOBS,
     INCLUDE_EXCLUDE_BASE_FILTER_SCHEMA,
 )
+from homeassistant.helpers.json import json_dumps, json_loads
 from homeassistant.helpers.typing import HomeAssistantType
 import homeassistant.util.dt as dt_util
 
+from .downsample import largest_triangle_three_buckets, min_max_buckets
+
 # mypy: allow-untyped-defs, no-check-untyped-defs
 
 _LOGGER = logging.getLogger(__name__)
@@ -46,6 +59,21 @@ CONF_ORDER = "use_include_order"
 STATE_KEY = "state"
 LAST_CHANGED_KEY = "last_changed"
 
+# Keys of the columns of the streamed history
+STREAM_ENTITY_ID_KEY = "entity_id"
+STREAM_TIME_KEY = "t"
+STREAM_STATE_KEY = "s"
+STREAM_ATTRIBUTES_KEY = "a"
+
+STREAM_FORMAT_JSON = "json"
+STREAM_FORMAT_NDJSON = "ndjson"
+CONTENT_TYPE_NDJSON = "application/x-ndjson"
+
+# Most states of an entity in one streamed chunk
+HISTORY_STREAM_CHUNK_SIZE = 1000
+# Most chunks read from the database ahead of the client
+HISTORY_STREAM_QUEUE_SIZE = 8
+
 GLOB_TO_SQL_CHARS = {
     42: "%",  # *
     46: "_",  # .
@@ -79,17 +107,25 @@ QUERY_STATES = [
     States.domain,
     States.entity_id,
     States.state,
-    States.attributes,
-    States.last_changed,
-    States.last_updated,
+    States.numeric_state,
+    StateAttributes.shared_attrs,
+    States.last_changed_ts,
+    States.last_updated_ts,
 ]
 
 HISTORY_BAKERY = "history_bakery"
 
 
+def _join_state_attributes(query):
+    """Join the shared attributes of the states."""
+    return query.outerjoin(
+        StateAttributes, States.attributes_id == StateAttributes.attributes_id
+    )
+
+
 def get_significant_states(hass, *args, **kwargs):
     """Wrap _get_significant_states with a sql session."""
-    with session_scope(hass=hass) as session:
+    with session_scope(hass=hass, read_only=True) as session:
         return _get_significant_states(hass, session, *args, **kwargs)
 
 
@@ -103,6 +139,7 @@ def _get_significant_states(
     include_start_time_state=True,
     significant_changes_only=True,
     minimal_response=False,
+    downsample=None,
 ):
     """
     Return states changes during UTC period start_time - end_time.
@@ -110,23 +147,78 @@ def _get_significant_states(
     Significant states are all states where there is a state change,
     as well as all states from certain domains (for instance
     thermostat so that we get current temperature in our graphs).
+
+    downsample is an optional function reducing the numeric states of
+    each entity, see _downsample_states.
     """
     timer_start = time.perf_counter()
 
+    def query_states(end_time):
+        return execute(
+            _significant_states_query(
+                hass,
+                session,
+                start_time,
+                end_time,
+                entity_ids,
+                filters,
+                significant_changes_only,
+            )
+        )
+
+    states = _states_with_history_cache(
+        hass,
+        entity_ids,
+        start_time,
+        end_time,
+        query_states,
+        _is_significant_state if significant_changes_only else None,
+    )
+
+    if _LOGGER.isEnabledFor(logging.DEBUG):
+        elapsed = time.perf_counter() - timer_start
+        _LOGGER.debug("get_significant_states took %fs", elapsed)
+
+    return _sorted_states_to_json(
+        hass,
+        session,
+        states,
+        start_time,
+        entity_ids,
+        filters,
+        include_start_time_state,
+        minimal_response,
+        downsample,
+    )
+
+
+def _significant_states_query(
+    hass,
+    session,
+    start_time,
+    end_time,
+    entity_ids,
+    filters,
+    significant_changes_only,
+):
+    """Return the query of the significant states ordered by entity and time."""
     baked_query = hass.data[HISTORY_BAKERY](
         lambda session: session.query(*QUERY_STATES)
     )
+    baked_query += _join_state_attributes
 
     if significant_changes_only:
         baked_query += lambda q: q.filter(
             (
                 States.domain.in_(SIGNIFICANT_DOMAINS)
-                | (States.last_changed == States.last_updated)
+                | (States.last_changed_ts == States.last_updated_ts)
             )
-            & (States.last_updated > bindparam("start_time"))
+            & (States.last_updated_ts > bindparam("start_time_ts"))
         )
     else:
-        baked_query += lambda q: q.filter(States.last_updated > bindparam("start_time"))
+        baked_query += lambda q: q.filter(
+            States.last_updated_ts > bindparam("start_time_ts")
+        )
 
     if entity_ids is not None:
         baked_query += lambda q: q.filter(
@@ -138,62 +230,155 @@ def _get_significant_states(
             filters.bake(baked_query)
 
     if end_time is not None:
-        baked_query += lambda q: q.filter(States.last_updated < bindparam("end_time"))
+        baked_query += lambda q: q.filter(
+            States.last_updated_ts < bindparam("end_time_ts")
+        )
 
-    baked_query += lambda q: q.order_by(States.entity_id, States.last_updated)
+    baked_query += lambda q: q.order_by(States.entity_id, States.last_updated_ts)
 
-    states = execute(
-        baked_query(session).params(
-            start_time=start_time, end_time=end_time, entity_ids=entity_ids
-        )
+    return baked_query(session).params(
+        start_time_ts=start_time.timestamp(),
+        end_time_ts=_timestamp_or_none(end_time),
+        entity_ids=entity_ids,
     )
 
-    if _LOGGER.isEnabledFor(logging.DEBUG):
-        elapsed = time.perf_counter() - timer_start
-        _LOGGER.debug("get_significant_states took %fs", elapsed)
 
-    return _sorted_states_to_json(
+def _stream_significant_states(
+    hass,
+    session,
+    start_time,
+    end_time,
+    entity_ids,
+    filters,
+    include_start_time_state,
+    significant_changes_only,
+    downsample=None,
+):
+    """Yield the significant states during UTC period start_time - end_time.
+
+    The states are read with a database cursor and yielded per entity in
+    chunks of at most HISTORY_STREAM_CHUNK_SIZE states, see
+    _stream_entity_chunks. With downsample the states of one entity are
+    read at once to reduce them, see _downsample_states.
+    """
+    start_time_ts = start_time.timestamp()
+    initial_rows = {}
+    if include_start_time_state:
+        run = recorder.run_information_from_instance(hass, start_time)
+        for state in _get_start_time_states(
+            hass, session, start_time, entity_ids, run, filters
+        ):
+            initial_rows[
+                state.entity_id
+            ] = state._row  # pylint: disable=protected-access
+
+    query = _significant_states_query(
         hass,
         session,
-        states,
         start_time,
+        end_time,
         entity_ids,
         filters,
-        include_start_time_state,
-        minimal_response,
-    )
+        significant_changes_only,
+    ).with_post_criteria(lambda q: q.yield_per(HISTORY_STREAM_CHUNK_SIZE))
+
+    for ent_id, group in groupby(query, attrgetter("entity_id")):
+        if downsample is not None:
+            group = _downsample_states(list(group), downsample)
+        timed_rows = ((db_state.last_updated_ts, db_state) for db_state in group)
+        initial_row = initial_rows.pop(ent_id, None)
+        if initial_row is not None:
+            timed_rows = chain(((start_time_ts, initial_row),), timed_rows)
+        yield from _stream_entity_chunks(ent_id, timed_rows)
+
+    # Entities without changes during the period
+    for ent_id in sorted(initial_rows):
+        yield from _stream_entity_chunks(
+            ent_id, ((start_time_ts, initial_rows[ent_id]),)
+        )
+
+
+def _stream_entity_chunks(entity_id, timed_rows):
+    """Yield the timed states of an entity in columns.
+
+    Each chunk holds the epoch timestamps of the states, their state values
+    and, as index and attributes pairs, the attributes of the first state of
+    the chunk and of the states where they changed.
+    """
+    prev_shared_attrs = chunk = None
+    for timestamp, db_state in timed_rows:
+        if chunk is None:
+            times, states, attributes = [], [], []
+            chunk = {
+                STREAM_ENTITY_ID_KEY: entity_id,
+                STREAM_TIME_KEY: times,
+                STREAM_STATE_KEY: states,
+                STREAM_ATTRIBUTES_KEY: attributes,
+            }
+
+        if not times or db_state.shared_attrs != prev_shared_attrs:
+            prev_shared_attrs = db_state.shared_attrs
+            try:
+                attributes.append([len(times), json_loads(prev_shared_attrs or "{}")])
+            except ValueError:
+                _LOGGER.exception("Error converting attributes of %s", entity_id)
+                attributes.append([len(times), {}])
+
+        times.append(timestamp)
+        states.append(db_state.state or "")
+
+        if len(times) >= HISTORY_STREAM_CHUNK_SIZE:
+            yield chunk
+            chunk = None
+
+    if chunk is not None:
+        yield chunk
 
 
 def state_changes_during_period(hass, start_time, end_time=None, entity_id=None):
     """Return states changes during UTC period start_time - end_time."""
-    with session_scope(hass=hass) as session:
-        baked_query = hass.data[HISTORY_BAKERY](
-            lambda session: session.query(*QUERY_STATES)
-        )
+    if entity_id is not None:
+        entity_id = entity_id.lower()
+    entity_ids = [entity_id] if entity_id is not None else None
 
-        baked_query += lambda q: q.filter(
-            (States.last_changed == States.last_updated)
-            & (States.last_updated > bindparam("start_time"))
-        )
+    with session_scope(hass=hass, read_only=True) as session:
+
+        def query_states(end_time):
+            baked_query = hass.data[HISTORY_BAKERY](
+                lambda session: session.query(*QUERY_STATES)
+            )
+            baked_query += _join_state_attributes
 
-        if end_time is not None:
             baked_query += lambda q: q.filter(
-                States.last_updated < bindparam("end_time")
+                (States.last_changed_ts == States.last_updated_ts)
+                & (States.last_updated_ts > bindparam("start_time_ts"))
             )
 
-        if entity_id is not None:
-            baked_query += lambda q: q.filter_by(entity_id=bindparam("entity_id"))
-            entity_id = entity_id.lower()
+            if end_time is not None:
+                baked_query += lambda q: q.filter(
+                    States.last_updated_ts < bindparam("end_time_ts")
+                )
 
-        baked_query += lambda q: q.order_by(States.entity_id, States.last_updated)
+            if entity_id is not None:
+                baked_query += lambda q: q.filter(
+                    States.entity_id == bindparam("entity_id")
+                )
 
-        states = execute(
-            baked_query(session).params(
-                start_time=start_time, end_time=end_time, entity_id=entity_id
+            baked_query += lambda q: q.order_by(
+                States.entity_id, States.last_updated_ts
             )
-        )
 
-        entity_ids = [entity_id] if entity_id is not None else None
+            return execute(
+                baked_query(session).params(
+                    start_time_ts=start_time.timestamp(),
+                    end_time_ts=_timestamp_or_none(end_time),
+                    entity_id=entity_id,
+                )
+            )
+
+        states = _states_with_history_cache(
+            hass, entity_ids, start_time, end_time, query_states, _is_state_change
+        )
 
         return _sorted_states_to_json(hass, session, states, start_time, entity_ids)
 
@@ -202,40 +387,147 @@ def get_last_state_changes(hass, number_of_states, entity_id):
     """Return the last number_of_states."""
     start_time = dt_util.utcnow()
 
-    with session_scope(hass=hass) as session:
-        baked_query = hass.data[HISTORY_BAKERY](
-            lambda session: session.query(*QUERY_STATES)
-        )
-        baked_query += lambda q: q.filter(States.last_changed == States.last_updated)
+    if entity_id is not None:
+        entity_id = entity_id.lower()
+    entity_ids = [entity_id] if entity_id is not None else None
 
-        if entity_id is not None:
-            baked_query += lambda q: q.filter_by(entity_id=bindparam("entity_id"))
-            entity_id = entity_id.lower()
+    states = _last_cached_state_changes(hass, number_of_states, entity_id)
 
-        baked_query += lambda q: q.order_by(
-            States.entity_id, States.last_updated.desc()
-        )
+    with session_scope(hass=hass, read_only=True) as session:
+        if states is None:
+            baked_query = hass.data[HISTORY_BAKERY](
+                lambda session: session.query(*QUERY_STATES)
+            )
+            baked_query += _join_state_attributes
+            baked_query += lambda q: q.filter(
+                States.last_changed_ts == States.last_updated_ts
+            )
 
-        baked_query += lambda q: q.limit(bindparam("number_of_states"))
+            if entity_id is not None:
+                baked_query += lambda q: q.filter(
+                    States.entity_id == bindparam("entity_id")
+                )
 
-        states = execute(
-            baked_query(session).params(
-                number_of_states=number_of_states, entity_id=entity_id
+            baked_query += lambda q: q.order_by(
+                States.entity_id, States.last_updated_ts.desc()
             )
-        )
 
-        entity_ids = [entity_id] if entity_id is not None else None
+            baked_query += lambda q: q.limit(bindparam("number_of_states"))
+
+            states = reversed(
+                execute(
+                    baked_query(session).params(
+                        number_of_states=number_of_states, entity_id=entity_id
+                    )
+                )
+            )
 
         return _sorted_states_to_json(
             hass,
             session,
-            reversed(states),
+            states,
             start_time,
             entity_ids,
             include_start_time_state=False,
         )
 
 
+def _history_cache(hass):
+    """Return the history cache of the recorder or None if it has none."""
+    return getattr(hass.data.get(recorder.DATA_INSTANCE), "history_cache", None)
+
+
+def _is_state_change(state):
+    """Return if a cached state changed the state and not only attributes."""
+    return state.last_changed_ts == state.last_updated_ts
+
+
+def _is_significant_state(state):
+    """Return if a cached state is significant, like the significant query."""
+    return state.domain in SIGNIFICANT_DOMAINS or _is_state_change(state)
+
+
+def _states_with_history_cache(
+    hass, entity_ids, start_time, end_time, query_states, keep_state
+):
+    """Return the states of the entities during UTC period start_time - end_time.
+
+    The states recorded since the history cache covers all the entities
+    come from the cache, query_states(end_time) reads the older ones from
+    the database. keep_state filters the cached states like the query.
+    """
+    history_cache = _history_cache(hass)
+    if history_cache is None or not entity_ids:
+        return query_states(end_time)
+
+    covered_from = dt_util.utc_from_timestamp(history_cache.covered_from(entity_ids))
+    if end_time is not None and end_time <= covered_from:
+        return query_states(end_time)
+
+    states = query_states(covered_from) if start_time < covered_from else []
+
+    start_time_ts = start_time.timestamp()
+    covered_from_ts = covered_from.timestamp()
+    end_time_ts = math.inf if end_time is None else end_time.timestamp()
+    cached_states = [
+        state
+        for state in history_cache.states(entity_ids)
+        if start_time_ts < state.last_updated_ts < end_time_ts
+        and state.last_updated_ts >= covered_from_ts
+        and (keep_state is None or keep_state(state))
+    ]
+    if not states:
+        return cached_states
+    # The sort is stable and keeps the older states of the database first
+    return sorted(chain(states, cached_states), key=attrgetter("entity_id"))
+
+
+def _last_cached_state_changes(hass, number_of_states, entity_id):
+    """Return the last number_of_states of entity_id from the history cache.
+
+    Returns None if the cache holds fewer state changes of the entity.
+    """
+    history_cache = _history_cache(hass)
+    if history_cache is None or entity_id is None or number_of_states < 1:
+        return None
+
+    covered_from_ts = history_cache.covered_from([entity_id])
+    changes = [
+        state
+        for state in history_cache.states([entity_id])
+        if state.last_updated_ts >= covered_from_ts and _is_state_change(state)
+    ]
+    if len(changes) < number_of_states:
+        return None
+    return changes[-number_of_states:]
+
+
+def _get_start_time_states(hass, session, start_time, entity_ids, run, filters):
+    """Return the states at start_time, from the history cache if it has them."""
+    history_cache = _history_cache(hass)
+    if history_cache is None or not entity_ids:
+        return _get_states_with_session(
+            hass, session, start_time, entity_ids, run=run, filters=filters
+        )
+
+    states = []
+    uncached_entity_ids = []
+    for entity_id in entity_ids:
+        cached_state = history_cache.state_before(entity_id, start_time)
+        if cached_state is None:
+            uncached_entity_ids.append(entity_id)
+        else:
+            states.append(LazyState(cached_state))
+
+    if uncached_entity_ids:
+        states.extend(
+            _get_states_with_session(
+                hass, session, start_time, uncached_entity_ids, run=run, filters=filters
+            )
+        )
+    return states
+
+
 def get_states(hass, utc_point_in_time, entity_ids=None, run=None, filters=None):
     """Return the states at a specific point in time."""
     if run is None:
@@ -245,7 +537,7 @@ def get_states(hass, utc_point_in_time, entity_ids=None, run=None, filters=None)
         if run is None:
             return []
 
-    with session_scope(hass=hass) as session:
+    with session_scope(hass=hass, read_only=True) as session:
         return _get_states_with_session(
             hass, session, utc_point_in_time, entity_ids, run, filters
         )
@@ -270,17 +562,20 @@ def _get_states_with_session(
     # We have more than one entity to look at (most commonly we want
     # all entities,) so we need to do a search on all states since the
     # last recorder run started.
-    query = session.query(*QUERY_STATES)
+    query = _join_state_attributes(session.query(*QUERY_STATES))
 
     most_recent_states_by_date = session.query(
         States.entity_id.label("max_entity_id"),
-        func.max(States.last_updated).label("max_last_updated"),
+        func.max(States.last_updated_ts).label("max_last_updated"),
     ).filter(
-        (States.last_updated >= run.start) & (States.last_updated < utc_point_in_time)
+        (States.last_updated_ts >= process_timestamp(run.start).timestamp())
+        & (States.last_updated_ts < utc_point_in_time.timestamp())
     )
 
     if entity_ids:
-        most_recent_states_by_date.filter(States.entity_id.in_(entity_ids))
+        most_recent_states_by_date = most_recent_states_by_date.filter(
+            States.entity_id.in_(entity_ids)
+        )
 
     most_recent_states_by_date = most_recent_states_by_date.group_by(States.entity_id)
 
@@ -292,7 +587,7 @@ def _get_states_with_session(
         most_recent_states_by_date,
         and_(
             States.entity_id == most_recent_states_by_date.c.max_entity_id,
-            States.last_updated == most_recent_states_by_date.c.max_last_updated,
+            States.last_updated_ts == most_recent_states_by_date.c.max_last_updated,
         ),
     )
 
@@ -321,15 +616,16 @@ def _get_single_entity_states_with_session(hass, session, utc_point_in_time, ent
     baked_query = hass.data[HISTORY_BAKERY](
         lambda session: session.query(*QUERY_STATES)
     )
+    baked_query += _join_state_attributes
     baked_query += lambda q: q.filter(
-        States.last_updated < bindparam("utc_point_in_time"),
+        States.last_updated_ts < bindparam("utc_point_in_time_ts"),
         States.entity_id == bindparam("entity_id"),
     )
-    baked_query += lambda q: q.order_by(States.last_updated.desc())
+    baked_query += lambda q: q.order_by(States.last_updated_ts.desc())
     baked_query += lambda q: q.limit(1)
 
     query = baked_query(session).params(
-        utc_point_in_time=utc_point_in_time, entity_id=entity_id
+        utc_point_in_time_ts=utc_point_in_time.timestamp(), entity_id=entity_id
     )
 
     return [LazyState(row) for row in execute(query)]
@@ -344,6 +640,7 @@ def _sorted_states_to_json(
     filters=None,
     include_start_time_state=True,
     minimal_response=False,
+    downsample=None,
 ):
     """Convert SQL results into JSON friendly data structure.
 
@@ -366,8 +663,8 @@ def _sorted_states_to_json(
     timer_start = time.perf_counter()
     if include_start_time_state:
         run = recorder.run_information_from_instance(hass, start_time)
-        for state in _get_states_with_session(
-            hass, session, start_time, entity_ids, run=run, filters=filters
+        for state in _get_start_time_states(
+            hass, session, start_time, entity_ids, run, filters
         ):
             state.last_changed = start_time
             state.last_updated = start_time
@@ -379,10 +676,12 @@ def _sorted_states_to_json(
 
     # Called in a tight loop so cache the function
     # here
-    _process_timestamp_to_utc_isoformat = process_timestamp_to_utc_isoformat
+    _utc_from_timestamp = dt_util.utc_from_timestamp
 
     # Append all changes to it
     for ent_id, group in groupby(states, lambda state: state.entity_id):
+        if downsample is not None:
+            group = iter(_downsample_states(list(group), downsample))
         domain = split_entity_id(ent_id)[0]
         ent_results = result[ent_id]
         if not minimal_response or domain in NEED_ATTRIBUTE_DOMAINS:
@@ -407,9 +706,9 @@ def _sorted_states_to_json(
             ent_results.append(
                 {
                     STATE_KEY: db_state.state,
-                    LAST_CHANGED_KEY: _process_timestamp_to_utc_isoformat(
-                        db_state.last_changed
-                    ),
+                    LAST_CHANGED_KEY: _utc_from_timestamp(
+                        db_state.last_changed_ts
+                    ).isoformat(),
                 }
             )
             prev_state = db_state
@@ -424,6 +723,33 @@ def _sorted_states_to_json(
     return {key: val for key, val in result.items() if val}
 
 
+def _downsample_states(db_states, downsample):
+    """Return the db_states needed to draw the numeric states of an entity.
+
+    downsample takes the (timestamp, value) points of the numeric states
+    and returns the indexes of the points to keep. States that are not
+    numeric, like unavailable, are always kept.
+    """
+    indexes = []
+    points = []
+    for index, db_state in enumerate(db_states):
+        if db_state.numeric_state is not None:
+            indexes.append(index)
+            points.append((db_state.last_updated_ts, db_state.numeric_state))
+
+    if len(points) < 3:
+        return db_states
+
+    keep = set(range(len(db_states))).difference(indexes)
+    keep.update(indexes[index] for index in downsample(points))
+    return [db_states[index] for index in sorted(keep)]
+
+
+def _timestamp_or_none(utc_time):
+    """Return the epoch timestamp of utc_time or None."""
+    return utc_time.timestamp() if utc_time is not None else None
+
+
 def get_state(hass, utc_point_in_time, entity_id, run=None):
     """Return a state at a specific point in time."""
     states = get_states(hass, utc_point_in_time, (entity_id,), run)
@@ -441,6 +767,7 @@ async def async_setup(hass, config):
     use_include_order = conf.get(CONF_ORDER)
 
     hass.http.register_view(HistoryPeriodView(filters, use_include_order))
+    hass.http.register_view(HistoryStreamView(filters, use_include_order))
     hass.components.frontend.async_register_built_in_panel(
         "history", "history", "hass:poll-box"
     )
@@ -480,7 +807,7 @@ class HistoryPeriodView(HomeAssistantView):
             start_time = now - one_day
 
         if start_time > now:
-            return self.json([])
+            return self._empty_response(request)
 
         end_time_str = request.query.get("end_time")
         if end_time_str:
@@ -502,6 +829,30 @@ class HistoryPeriodView(HomeAssistantView):
 
         minimal_response = "minimal_response" in request.query
 
+        max_points_str = request.query.get("max_points")
+        bucket_width_str = request.query.get("bucket_width")
+        downsample = None
+        if max_points_str and bucket_width_str:
+            return self.json_message(
+                "Use either max_points or bucket_width", HTTP_BAD_REQUEST
+            )
+        if max_points_str:
+            try:
+                max_points = int(max_points_str)
+            except ValueError:
+                max_points = 0
+            if max_points < 3:
+                return self.json_message("Invalid max_points", HTTP_BAD_REQUEST)
+            downsample = partial(largest_triangle_three_buckets, threshold=max_points)
+        elif bucket_width_str:
+            try:
+                bucket_width = float(bucket_width_str)
+            except ValueError:
+                bucket_width = 0
+            if not 0 < bucket_width < math.inf:
+                return self.json_message("Invalid bucket_width", HTTP_BAD_REQUEST)
+            downsample = partial(min_max_buckets, bucket_width=bucket_width)
+
         hass = request.app["hass"]
 
         if (
@@ -509,11 +860,41 @@ class HistoryPeriodView(HomeAssistantView):
             and entity_ids
             and not _entities_may_have_state_changes_after(hass, entity_ids, start_time)
         ):
-            return self.json([])
+            return self._empty_response(request)
+
+        return await self._async_history_response(
+            request,
+            hass,
+            start_time,
+            end_time,
+            entity_ids,
+            include_start_time_state,
+            significant_changes_only,
+            minimal_response,
+            downsample,
+        )
+
+    def _empty_response(self, request: web.Request) -> web.Response:
+        """Return the response for a period without history."""
+        return self.json([])
 
+    async def _async_history_response(
+        self,
+        request,
+        hass,
+        start_time,
+        end_time,
+        entity_ids,
+        include_start_time_state,
+        significant_changes_only,
+        minimal_response,
+        downsample,
+    ) -> web.StreamResponse:
+        """Return the history of the period."""
         return cast(
             web.Response,
-            await hass.async_add_executor_job(
+            await async_add_read_job(
+                hass,
                 self._sorted_significant_states_json,
                 hass,
                 start_time,
@@ -522,6 +903,7 @@ class HistoryPeriodView(HomeAssistantView):
                 include_start_time_state,
                 significant_changes_only,
                 minimal_response,
+                downsample,
             ),
         )
 
@@ -534,11 +916,12 @@ class HistoryPeriodView(HomeAssistantView):
         include_start_time_state,
         significant_changes_only,
         minimal_response,
+        downsample,
     ):
         """Fetch significant stats from the database as json."""
         timer_start = time.perf_counter()
 
-        with session_scope(hass=hass) as session:
+        with session_scope(hass=hass, read_only=True) as session:
             result = _get_significant_states(
                 hass,
                 session,
@@ -549,6 +932,7 @@ class HistoryPeriodView(HomeAssistantView):
                 include_start_time_state,
                 significant_changes_only,
                 minimal_response,
+                downsample,
             )
 
         result = list(result.values())
@@ -569,7 +953,109 @@ class HistoryPeriodView(HomeAssistantView):
             sorted_result.extend(result)
             result = sorted_result
 
-        return self.json(result)
+        # The states can be many, encoded without walking them for NaN
+        return self.json_serialized(json_dumps(result))
+
+
+class HistoryStreamView(HistoryPeriodView):
+    """Stream the history of a period in columns.
+
+    The history is streamed while it is read from the database, each
+    entity as one or more chunks of _stream_entity_chunks. The chunks are
+    sent as newline delimited JSON, or as a JSON array with format=json.
+    The entities are not reordered by use_include_order.
+    """
+
+    url = "/api/history/stream"
+    name = "api:history:view-stream"
+    extra_urls = ["/api/history/stream/{datetime}"]
+
+    def _empty_response(self, request: web.Request) -> web.Response:
+        """Return the response for a period without history."""
+        if request.query.get("format") == STREAM_FORMAT_JSON:
+            return self.json([])
+        return web.Response(content_type=CONTENT_TYPE_NDJSON)
+
+    async def _async_history_response(
+        self,
+        request,
+        hass,
+        start_time,
+        end_time,
+        entity_ids,
+        include_start_time_state,
+        significant_changes_only,
+        minimal_response,
+        downsample,
+    ) -> web.StreamResponse:
+        """Stream the history of the period."""
+        as_json_array = request.query.get("format") == STREAM_FORMAT_JSON
+        response = web.StreamResponse(
+            headers={
+                CONTENT_TYPE: CONTENT_TYPE_JSON
+                if as_json_array
+                else CONTENT_TYPE_NDJSON
+            }
+        )
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+
+        lines: asyncio.Queue = asyncio.Queue()
+        # Limits the chunks read ahead of the client
+        slots = threading.Semaphore(HISTORY_STREAM_QUEUE_SIZE)
+        stop = threading.Event()
+
+        def read_history():
+            """Read the history and queue it as JSON lines."""
+            try:
+                with session_scope(hass=hass, read_only=True) as session:
+                    for chunk in _stream_significant_states(
+                        hass,
+                        session,
+                        start_time,
+                        end_time,
+                        entity_ids,
+                        self.filters,
+                        include_start_time_state,
+                        significant_changes_only,
+                        downsample,
+                    ):
+                        line = json_dumps(chunk).encode("utf-8")
+                        slots.acquire()
+                        if stop.is_set():
+                            return
+                        hass.loop.call_soon_threadsafe(lines.put_nowait, line)
+            finally:
+                hass.loop.call_soon_threadsafe(lines.put_nowait, None)
+
+        # Streams wait for slow clients, they would hold up the read executor
+        reader = hass.async_add_executor_job(read_history)
+        separator = b"," if as_json_array else b"\n"
+        first = True
+        try:
+            if as_json_array:
+                await response.write(b"[")
+            while True:
+                line = await lines.get()
+                if line is None:
+                    break
+                if as_json_array:
+                    await response.write(line if first else separator + line)
+                else:
+                    await response.write(line + separator)
+                first = False
+                slots.release()
+        finally:
+            # Let the reader stop when the client went away
+            stop.set()
+            slots.release()
+
+        # A failed read must not look like a complete response
+        await reader
+        if as_json_array:
+            await response.write(b"]")
+        await response.write_eof()
+        return response
 
 
 def sqlalchemy_filter_from_include_exclude_conf(conf):
@@ -710,9 +1196,9 @@ class LazyState(State):
         """State attributes."""
         if not self._attributes:
             try:
-                self._attributes = json.loads(self._row.attributes)
+                self._attributes = json_loads(self._row.shared_attrs or "{}")
             except ValueError:
-                # When json.loads fails
+                # When json_loads fails
                 _LOGGER.exception("Error converting row to state: %s", self)
                 self._attributes = {}
         return self._attributes
@@ -738,7 +1224,7 @@ class LazyState(State):
     def last_changed(self):
         """Last changed datetime."""
         if not self._last_changed:
-            self._last_changed = process_timestamp(self._row.last_changed)
+            self._last_changed = dt_util.utc_from_timestamp(self._row.last_changed_ts)
         return self._last_changed
 
     @last_changed.setter
@@ -750,7 +1236,7 @@ class LazyState(State):
     def last_updated(self):
         """Last updated datetime."""
         if not self._last_updated:
-            self._last_updated = process_timestamp(self._row.last_updated)
+            self._last_updated = dt_util.utc_from_timestamp(self._row.last_updated_ts)
         return self._last_updated
 
     @last_updated.setter
@@ -765,24 +1251,12 @@ class LazyState(State):
 
         To be used for JSON serialization.
         """
-        if self._last_changed:
-            last_changed_isoformat = self._last_changed.isoformat()
-        else:
-            last_changed_isoformat = process_timestamp_to_utc_isoformat(
-                self._row.last_changed
-            )
-        if self._last_updated:
-            last_updated_isoformat = self._last_updated.isoformat()
-        else:
-            last_updated_isoformat = process_timestamp_to_utc_isoformat(
-                self._row.last_updated
-            )
         return {
             "entity_id": self.entity_id,
             "state": self.state,
             "attributes": self._attributes or self.attributes,
-            "last_changed": last_changed_isoformat,
-            "last_updated": last_updated_isoformat,
+            "last_changed": self.last_changed.isoformat(),
+            "last_updated": self.last_updated.isoformat(),
         }
 
     def __eq__(self, other):
@@ -0,0 +1,81 @@
+"""Reduce numeric series to the points needed to draw them."""
+import math
+from typing import List, Sequence, Tuple
+
+# A point of a series: (epoch timestamp, value)
+Point = Tuple[float, float]
+
+
+def largest_triangle_three_buckets(
+    points: Sequence[Point], threshold: int
+) -> List[int]:
+    """Return the indexes of the points to keep to draw the series.
+
+    Largest-Triangle-Three-Buckets keeps the first and the last point and
+    from each of threshold - 2 buckets in between the point forming the
+    largest triangle with the point kept before and the average of the
+    next bucket.
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+
+    every = (count - 2) / (threshold - 2)
+    kept = [0]
+    prev = 0
+    for bucket in range(threshold - 2):
+        avg_start = int((bucket + 1) * every) + 1
+        avg_end = min(int((bucket + 2) * every) + 1, count)
+        avg_points = points[avg_start:avg_end]
+        avg_time = math.fsum(point[0] for point in avg_points) / len(avg_points)
+        avg_value = math.fsum(point[1] for point in avg_points) / len(avg_points)
+
+        prev_time, prev_value = points[prev]
+        max_area = -1.0
+        selected = range_start = int(bucket * every) + 1
+        for index in range(range_start, int((bucket + 1) * every) + 1):
+            time, value = points[index]
+            # Twice the area of the triangle, only the order matters
+            area = abs(
+                (prev_time - avg_time) * (value - prev_value)
+                - (prev_time - time) * (avg_value - prev_value)
+            )
+            if area > max_area:
+                max_area = area
+                selected = index
+
+        kept.append(selected)
+        prev = selected
+
+    kept.append(count - 1)
+    return kept
+
+
+def min_max_buckets(points: Sequence[Point], bucket_width: float) -> List[int]:
+    """Return the indexes of the points to keep to draw the series.
+
+    The series is cut in buckets of bucket_width seconds of which the
+    points with the lowest and the highest value are kept, as well as
+    the first and the last point of the series.
+    """
+    count = len(points)
+    if count < 3:
+        return list(range(count))
+
+    start = points[0][0]
+    kept = {0, count - 1}
+    current = low = high = None
+    for index, (time, value) in enumerate(points):
+        bucket = int((time - start) // bucket_width)
+        if bucket != current:
+            if current is not None:
+                kept.update((low, high))
+            current = bucket
+            low = high = index
+        elif value < points[low][1]:
+            low = index
+        elif value > points[high][1]:
+            high = index
+
+    kept.update((low, high))
+    return sorted(kept)
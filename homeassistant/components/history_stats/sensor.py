@@ -1,4 +1,5 @@
 """Component to make instant statistics about your history."""
+from collections import deque
 import datetime
 import logging
 import math
@@ -6,6 +7,7 @@ import math
 import voluptuous as vol
 
 from homeassistant.components import history
+from homeassistant.components.recorder.util import async_add_read_job
 from homeassistant.components.sensor import PLATFORM_SCHEMA
 from homeassistant.const import (
     CONF_ENTITY_ID,
@@ -122,6 +124,11 @@ class HistoryStatsSensor(Entity):
         self.value = None
         self.count = None
 
+        # The period counted from the history so far, extended with the
+        # state changes seen since instead of querying the history again
+        self._history = None
+        self._state_changes = deque()
+
     async def async_added_to_hass(self):
         """Create listeners when the entity is added."""
 
@@ -134,10 +141,18 @@ class HistoryStatsSensor(Entity):
                 """Force the component to refresh."""
                 self.async_schedule_update_ha_state(True)
 
+            @callback
+            def state_changed(event):
+                """Remember the state change and refresh."""
+                self._async_record_state_change(
+                    event.data.get("new_state"), event.time_fired
+                )
+                force_refresh()
+
             force_refresh()
             self.async_on_remove(
                 async_track_state_change_event(
-                    self.hass, [self._entity_id], force_refresh
+                    self.hass, [self._entity_id], state_changed
                 )
             )
 
@@ -148,6 +163,20 @@ class HistoryStatsSensor(Entity):
         # Delay first refresh to keep startup fast
         self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_START, start_refresh)
 
+    @callback
+    def _async_record_state_change(self, new_state, time_fired):
+        """Queue a state change for the next update to count."""
+        if new_state is None:
+            self._state_changes.append((False, time_fired.timestamp()))
+        # Attribute changes are not state changes in the history either
+        elif new_state.last_changed == new_state.last_updated:
+            self._state_changes.append(
+                (
+                    new_state.state in self._entity_states,
+                    new_state.last_changed.timestamp(),
+                )
+            )
+
     @property
     def name(self):
         """Return the name of the sensor."""
@@ -187,6 +216,10 @@ class HistoryStatsSensor(Entity):
         """Return the icon to use in the frontend, if any."""
         return ICON
 
+    async def async_update(self):
+        """Update the sensor in the read executor of the recorder."""
+        await async_add_read_job(self.hass, self.update)
+
     def update(self):
         """Get the latest data and updates the states."""
         # Get previous values of start and end
@@ -210,53 +243,73 @@ class HistoryStatsSensor(Entity):
         p_end_timestamp = math.floor(dt_util.as_timestamp(p_end))
         now_timestamp = math.floor(dt_util.as_timestamp(now))
 
-        # If period has not changed and current time after the period end...
+        # If period has not changed, current time after the period end
+        # and no state change in the period is left to count...
         if (
             start_timestamp == p_start_timestamp
             and end_timestamp == p_end_timestamp
             and end_timestamp <= now_timestamp
+            and not (self._state_changes and self._state_changes[0][1] <= end_timestamp)
         ):
             # Don't compute anything as the value cannot have changed
             return
 
+        # Only query the history again when the period start moved
+        if (
+            self._history is None
+            or self._history.start != start_timestamp
+            or self._history.end > end_timestamp
+        ):
+            self._history = self._query_history(start, end, start_timestamp)
+            if self._history is None:
+                return
+
+        period = self._history
+        period.end = end_timestamp
+        # Count the state changes seen since the last update
+        while self._state_changes and self._state_changes[0][1] <= end_timestamp:
+            current_state, current_time = self._state_changes.popleft()
+            # Already counted from the history
+            if current_time <= period.last_time:
+                continue
+            period.add(current_state, current_time)
+
+        # Count time elapsed between last history state and end of measure
+        elapsed = period.elapsed
+        if period.last_state:
+            measure_end = min(end_timestamp, now_timestamp)
+            elapsed += measure_end - period.last_time
+
+        # Save value in hours
+        self.value = elapsed / 3600
+
+        # Save counter
+        self.count = period.count
+
+    def _query_history(self, start, end, start_timestamp):
+        """Count the state changes in the history between start and end."""
         # Get history between start and end
         history_list = history.state_changes_during_period(
             self.hass, start, end, str(self._entity_id)
         )
 
         if self._entity_id not in history_list:
-            return
+            # The queued changes will be in the history of the next query
+            self._state_changes.clear()
+            return None
 
         # Get the first state
         last_state = history.get_state(self.hass, start, self._entity_id)
-        last_state = last_state is not None and last_state in self._entity_states
-        last_time = start_timestamp
-        elapsed = 0
-        count = 0
+        period = HistoryStatsPeriod(
+            start_timestamp,
+            last_state is not None and last_state in self._entity_states,
+        )
 
         # Make calculations
         for item in history_list.get(self._entity_id):
-            current_state = item.state in self._entity_states
-            current_time = item.last_changed.timestamp()
+            period.add(item.state in self._entity_states, item.last_changed.timestamp())
 
-            if last_state:
-                elapsed += current_time - last_time
-            if current_state and not last_state:
-                count += 1
-
-            last_state = current_state
-            last_time = current_time
-
-        # Count time elapsed between last history state and end of measure
-        if last_state:
-            measure_end = min(end_timestamp, now_timestamp)
-            elapsed += measure_end - last_time
-
-        # Save value in hours
-        self.value = elapsed / 3600
-
-        # Save counter
-        self.count = count
+        return period
 
     def update_period(self):
         """Parse the templates and store a datetime tuple in _period."""
@@ -319,6 +372,29 @@ class HistoryStatsSensor(Entity):
         self._period = start, end
 
 
+class HistoryStatsPeriod:
+    """The time spent in and the number of times the states were entered."""
+
+    def __init__(self, start, last_state):
+        """Start counting at start with the state at that time."""
+        self.start = start
+        self.end = start
+        self.last_state = last_state
+        self.last_time = start
+        self.elapsed = 0
+        self.count = 0
+
+    def add(self, current_state, current_time):
+        """Count the state change at current_time."""
+        if self.last_state:
+            self.elapsed += current_time - self.last_time
+        if current_state and not self.last_state:
+            self.count += 1
+
+        self.last_state = current_state
+        self.last_time = current_time
+
+
 class HistoryStatsHelper:
     """Static methods to make the HistoryStatsSensor code lighter."""
 
@@ -11,6 +11,9 @@ CONF_EVENT_TYPE = "event_type"
 CONF_EVENT_DATA = "event_data"
 CONF_EVENT_CONTEXT = "context"
 
+# Event data keys preferred for the keyed bus lookup
+INDEXED_EVENT_DATA_KEYS = ("device_id", "entity_id", "domain")
+
 TRIGGER_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_PLATFORM): "event",
@@ -28,6 +31,15 @@ def _schema_value(value):
     return value
 
 
+def _event_data_key(event_data):
+    """Return the event data key to look up the listener by or None."""
+    keys = [key for key, value in event_data.items() if isinstance(value, str)]
+    for key in INDEXED_EVENT_DATA_KEYS:
+        if key in keys:
+            return key
+    return keys[0] if keys else None
+
+
 async def async_attach_trigger(
     hass, config, action, automation_info, *, platform_type="event"
 ):
@@ -83,9 +95,19 @@ async def async_attach_trigger(
             event.context,
         )
 
-    removes = [
-        hass.bus.async_listen(event_type, handle_event) for event_type in event_types
-    ]
+    data_key = _event_data_key(config[CONF_EVENT_DATA]) if event_data_schema else None
+    if data_key is None:
+        removes = [
+            hass.bus.async_listen(event_type, handle_event)
+            for event_type in event_types
+        ]
+    else:
+        # The bus only calls handle_event for events with the configured value
+        data_value = config[CONF_EVENT_DATA][data_key]
+        removes = [
+            hass.bus.async_listen_keyed(event_type, data_key, data_value, handle_event)
+            for event_type in event_types
+        ]
 
     @callback
     def remove_listen_events():
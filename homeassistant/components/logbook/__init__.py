@@ -1,7 +1,6 @@
 """Event parser and human readable log generator."""
 from datetime import timedelta
 from itertools import groupby
-import json
 import re
 
 import sqlalchemy
@@ -13,11 +12,14 @@ from homeassistant.components.automation import EVENT_AUTOMATION_TRIGGERED
 from homeassistant.components.history import sqlalchemy_filter_from_include_exclude_conf
 from homeassistant.components.http import HomeAssistantView
 from homeassistant.components.recorder.models import (
+    EventData,
     Events,
+    EventTypes,
+    StateAttributes,
     States,
     process_timestamp_to_utc_isoformat,
 )
-from homeassistant.components.recorder.util import session_scope
+from homeassistant.components.recorder.util import async_add_read_job, session_scope
 from homeassistant.components.script import EVENT_SCRIPT_STARTED
 from homeassistant.const import (
     ATTR_DOMAIN,
@@ -44,13 +46,15 @@ from homeassistant.helpers.entityfilter import (
 from homeassistant.helpers.integration_platform import (
     async_process_integration_platforms,
 )
+from homeassistant.helpers.json import json_loads
 from homeassistant.loader import bind_hass
 import homeassistant.util.dt as dt_util
 
-ENTITY_ID_JSON_TEMPLATE = '"entity_id": "{}"'
-ENTITY_ID_JSON_EXTRACT = re.compile('"entity_id": "([^"]+)"')
-DOMAIN_JSON_EXTRACT = re.compile('"domain": "([^"]+)"')
-ICON_JSON_EXTRACT = re.compile('"icon": "([^"]+)"')
+# Rows are compact JSON, rows recorded before have a space after the colon
+ENTITY_ID_JSON_TEMPLATES = ('"entity_id":"{}"', '"entity_id": "{}"')
+ENTITY_ID_JSON_EXTRACT = re.compile(r'"entity_id":\s*"([^"]+)"')
+DOMAIN_JSON_EXTRACT = re.compile(r'"domain":\s*"([^"]+)"')
+ICON_JSON_EXTRACT = re.compile(r'"icon":\s*"([^"]+)"')
 
 ATTR_MESSAGE = "message"
 
@@ -88,8 +92,8 @@ ALL_EVENT_TYPES = [
 ]
 
 EVENT_COLUMNS = [
-    Events.event_type,
-    Events.event_data,
+    EventTypes.event_type,
+    EventData.shared_data.label("event_data"),
     Events.time_fired,
     Events.context_id,
     Events.context_user_id,
@@ -248,7 +252,7 @@ class LogbookView(HomeAssistantView):
                 )
             )
 
-        return await hass.async_add_executor_job(json_events)
+        return await async_add_read_job(hass, json_events)
 
 
 def humanify(hass, events, entity_attr_cache, context_lookup):
@@ -436,11 +440,13 @@ def _get_events(
     if entity_ids is not None:
         entities_filter = generate_filter([], entity_ids, [], [])
 
-    with session_scope(hass=hass) as session:
+    with session_scope(hass=hass, read_only=True) as session:
         old_state = aliased(States, name="old_state")
 
         if entity_ids is not None:
-            query = _generate_events_query_without_states(session)
+            query = _join_event_type_and_data(
+                _generate_events_query_without_states(session).select_from(Events)
+            )
             query = _apply_event_time_filter(query, start_day, end_day)
             query = _apply_event_types_filter(
                 hass, query, ALL_EVENT_TYPES_EXCEPT_STATE_CHANGED
@@ -456,17 +462,20 @@ def _get_events(
                 )
             )
         else:
-            query = _generate_events_query(session)
+            query = _join_event_type_and_data(
+                _generate_events_query(session).select_from(Events)
+            )
             query = _apply_event_time_filter(query, start_day, end_day)
             query = _apply_events_types_and_states_filter(
                 hass, query, old_state
             ).filter(
                 (States.last_updated == States.last_changed)
-                | (Events.event_type != EVENT_STATE_CHANGED)
+                | (EventTypes.event_type != EVENT_STATE_CHANGED)
             )
             if filters:
                 query = query.filter(
-                    filters.entity_filter() | (Events.event_type != EVENT_STATE_CHANGED)
+                    filters.entity_filter()
+                    | (EventTypes.event_type != EVENT_STATE_CHANGED)
                 )
 
         query = query.order_by(Events.time_fired)
@@ -482,10 +491,16 @@ def _generate_events_query(session):
         States.state,
         States.entity_id,
         States.domain,
-        States.attributes,
+        StateAttributes.shared_attrs.label("attributes"),
     )
 
 
+def _join_event_type_and_data(query):
+    return query.join(
+        EventTypes, (Events.event_type_id == EventTypes.event_type_id)
+    ).outerjoin(EventData, (Events.data_id == EventData.data_id))
+
+
 def _generate_events_query_without_states(session):
     return session.query(
         *EVENT_COLUMNS,
@@ -499,8 +514,14 @@ def _generate_events_query_without_states(session):
 def _generate_states_query(session, start_day, end_day, old_state, entity_ids):
     return (
         _generate_events_query(session)
+        .select_from(States)
         .outerjoin(Events, (States.event_id == Events.event_id))
+        .outerjoin(EventTypes, (Events.event_type_id == EventTypes.event_type_id))
+        .outerjoin(EventData, (Events.data_id == EventData.data_id))
         .outerjoin(old_state, (States.old_state_id == old_state.state_id))
+        .outerjoin(
+            StateAttributes, (States.attributes_id == StateAttributes.attributes_id)
+        )
         .filter(_missing_state_matcher(old_state))
         .filter(_continuous_entity_matcher())
         .filter((States.last_updated > start_day) & (States.last_updated < end_day))
@@ -515,12 +536,16 @@ def _apply_events_types_and_states_filter(hass, query, old_state):
     events_query = (
         query.outerjoin(States, (Events.event_id == States.event_id))
         .outerjoin(old_state, (States.old_state_id == old_state.state_id))
+        .outerjoin(
+            StateAttributes, (States.attributes_id == StateAttributes.attributes_id)
+        )
         .filter(
-            (Events.event_type != EVENT_STATE_CHANGED)
+            (EventTypes.event_type != EVENT_STATE_CHANGED)
             | _missing_state_matcher(old_state)
         )
         .filter(
-            (Events.event_type != EVENT_STATE_CHANGED) | _continuous_entity_matcher()
+            (EventTypes.event_type != EVENT_STATE_CHANGED)
+            | _continuous_entity_matcher()
         )
     )
     return _apply_event_types_filter(hass, events_query, ALL_EVENT_TYPES)
@@ -544,7 +569,9 @@ def _continuous_entity_matcher():
     #
     return sqlalchemy.or_(
         sqlalchemy.not_(States.domain.in_(CONTINUOUS_DOMAINS)),
-        sqlalchemy.not_(States.attributes.contains(UNIT_OF_MEASUREMENT_JSON)),
+        sqlalchemy.not_(
+            StateAttributes.shared_attrs.contains(UNIT_OF_MEASUREMENT_JSON)
+        ),
     )
 
 
@@ -556,7 +583,7 @@ def _apply_event_time_filter(events_query, start_day, end_day):
 
 def _apply_event_types_filter(hass, query, event_types):
     return query.filter(
-        Events.event_type.in_(event_types + list(hass.data.get(DOMAIN, {})))
+        EventTypes.event_type.in_(event_types + list(hass.data.get(DOMAIN, {})))
     )
 
 
@@ -564,8 +591,9 @@ def _apply_event_entity_id_matchers(events_query, entity_ids):
     return events_query.filter(
         sqlalchemy.or_(
             *[
-                Events.event_data.contains(ENTITY_ID_JSON_TEMPLATE.format(entity_id))
+                EventData.shared_data.contains(template.format(entity_id))
                 for entity_id in entity_ids
+                for template in ENTITY_ID_JSON_TEMPLATES
             ]
         )
     )
@@ -713,7 +741,7 @@ class LazyEventPartialState:
         if self._event_data:
             return self._event_data.get(ATTR_ENTITY_ID)
 
-        result = ENTITY_ID_JSON_EXTRACT.search(self._row.event_data)
+        result = ENTITY_ID_JSON_EXTRACT.search(self._row.event_data or "")
         return result and result.group(1)
 
     @property
@@ -722,7 +750,7 @@ class LazyEventPartialState:
         if self._event_data:
             return self._event_data.get(ATTR_DOMAIN)
 
-        result = DOMAIN_JSON_EXTRACT.search(self._row.event_data)
+        result = DOMAIN_JSON_EXTRACT.search(self._row.event_data or "")
         return result and result.group(1)
 
     @property
@@ -735,17 +763,20 @@ class LazyEventPartialState:
             ):
                 self._attributes = {}
             else:
-                self._attributes = json.loads(self._row.attributes)
+                self._attributes = json_loads(self._row.attributes)
         return self._attributes
 
     @property
     def data(self):
         """Event data."""
         if not self._event_data:
-            if self._row.event_data == EMPTY_JSON_OBJECT:
+            if (
+                self._row.event_data is None
+                or self._row.event_data == EMPTY_JSON_OBJECT
+            ):
                 self._event_data = {}
             else:
-                self._event_data = json.loads(self._row.event_data)
+                self._event_data = json_loads(self._row.event_data)
         return self._event_data
 
     @property
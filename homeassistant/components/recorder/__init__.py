@@ -2,19 +2,26 @@
 import asyncio
 from collections import namedtuple
 import concurrent.futures
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
-import queue
 import threading
 import time
-from typing import Any, Callable, List, Optional
-
-from sqlalchemy import create_engine, event as sqlalchemy_event, exc, select
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import (
+    create_engine,
+    event as sqlalchemy_event,
+    exc,
+    func,
+    inspect,
+    select,
+    text,
+)
 from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import QueuePool, StaticPool
 import voluptuous as vol
 
-from homeassistant.components import persistent_notification
+from homeassistant.components import persistent_notification, websocket_api
 from homeassistant.const import (
     ATTR_ENTITY_ID,
     CONF_EXCLUDE,
@@ -24,7 +31,7 @@ from homeassistant.const import (
     EVENT_TIME_CHANGED,
     MATCH_ALL,
 )
-from homeassistant.core import CoreState, HomeAssistant, callback
+from homeassistant.core import CoreState, HomeAssistant, callback, split_entity_id
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entityfilter import (
     INCLUDE_EXCLUDE_BASE_FILTER_SCHEMA,
@@ -34,10 +41,26 @@ from homeassistant.helpers.entityfilter import (
 from homeassistant.helpers.typing import ConfigType
 import homeassistant.util.dt as dt_util
 
-from . import migration, purge
+from . import migration, purge, statistics
 from .const import CONF_DB_INTEGRITY_CHECK, DATA_INSTANCE, DOMAIN, SQLITE_URL_PREFIX
-from .models import Base, Events, RecorderRuns, States
-from .util import session_scope, validate_or_move_away_sqlite_database
+from .history_cache import HISTORY_CACHE_SCHEMA, CachedState, HistoryCache
+from .models import (
+    Base,
+    EventData,
+    Events,
+    EventTypes,
+    RecorderRuns,
+    StateAttributes,
+    States,
+)
+from .throttle import THROTTLE_SCHEMA, RecorderThrottle, ThrottleRule
+from .util import (
+    LRUCache,
+    RecorderQueue,
+    async_add_read_job,
+    session_scope,
+    validate_or_move_away_sqlite_database,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -58,6 +81,7 @@ DEFAULT_DB_FILE = "home-assistant_v2.db"
 DEFAULT_DB_INTEGRITY_CHECK = True
 DEFAULT_DB_MAX_RETRIES = 10
 DEFAULT_DB_RETRY_WAIT = 3
+DEFAULT_DB_READ_CONCURRENCY = 2
 DEFAULT_COMMIT_INTERVAL = 1
 KEEPALIVE_TIME = 30
 
@@ -65,14 +89,43 @@ KEEPALIVE_TIME = 30
 # States and Events objects
 EXPIRE_AFTER_COMMITS = 120
 
+# The number of recently written shared attributes
+# to keep in memory to avoid looking them up in the database
+STATE_ATTRIBUTES_ID_CACHE_SIZE = 2048
+EVENT_DATA_ID_CACHE_SIZE = 2048
+EVENT_TYPE_ID_CACHE_SIZE = 2048
+
+# Commit before the next time tick once this many events are waiting
+MAX_PENDING_EVENTS = 1000
+
+# The number of ids reserved at once from the PostgreSQL sequences
+ID_BLOCK_SIZE = 1000
+
 CONF_AUTO_PURGE = "auto_purge"
 CONF_DB_URL = "db_url"
 CONF_DB_MAX_RETRIES = "db_max_retries"
 CONF_DB_RETRY_WAIT = "db_retry_wait"
+CONF_DB_READ_CONCURRENCY = "db_read_concurrency"
 CONF_PURGE_KEEP_DAYS = "purge_keep_days"
 CONF_PURGE_INTERVAL = "purge_interval"
+CONF_PURGE_KEEP_DAYS_DOMAINS = "purge_keep_days_domains"
+CONF_PURGE_KEEP_DAYS_ENTITIES = "purge_keep_days_entities"
 CONF_EVENT_TYPES = "event_types"
 CONF_COMMIT_INTERVAL = "commit_interval"
+CONF_MAX_BACKLOG = "max_backlog"
+CONF_BACKLOG_POLICY = "backlog_policy"
+CONF_BACKLOG_CRITICAL_DOMAINS = "backlog_critical_domains"
+CONF_THROTTLE = "throttle"
+CONF_HISTORY_CACHE = "history_cache"
+
+BACKLOG_POLICY_DROP_OLDEST = "drop_oldest"
+BACKLOG_POLICY_PAUSE = "pause"
+BACKLOG_POLICIES = [BACKLOG_POLICY_DROP_OLDEST, BACKLOG_POLICY_PAUSE]
+
+DEFAULT_MAX_BACKLOG = 40000
+# The pause policy keeps queueing the critical events until the backlog
+# reaches this many times max_backlog, then their oldest are dropped
+PAUSE_BACKLOG_LIMIT_FACTOR = 2
 
 EXCLUDE_SCHEMA = INCLUDE_EXCLUDE_FILTER_SCHEMA_INNER.extend(
     {vol.Optional(CONF_EVENT_TYPES): vol.All(cv.ensure_list, [cv.string])}
@@ -93,6 +146,12 @@ CONFIG_SCHEMA = vol.Schema(
                         vol.Coerce(int), vol.Range(min=1)
                     ),
                     vol.Optional(CONF_PURGE_INTERVAL, default=1): cv.positive_int,
+                    vol.Optional(CONF_PURGE_KEEP_DAYS_DOMAINS, default={}): {
+                        cv.string: vol.All(vol.Coerce(int), vol.Range(min=1))
+                    },
+                    vol.Optional(CONF_PURGE_KEEP_DAYS_ENTITIES, default={}): {
+                        cv.entity_id: vol.All(vol.Coerce(int), vol.Range(min=1))
+                    },
                     vol.Optional(CONF_DB_URL): cv.string,
                     vol.Optional(
                         CONF_COMMIT_INTERVAL, default=DEFAULT_COMMIT_INTERVAL
@@ -103,9 +162,25 @@ CONFIG_SCHEMA = vol.Schema(
                     vol.Optional(
                         CONF_DB_RETRY_WAIT, default=DEFAULT_DB_RETRY_WAIT
                     ): cv.positive_int,
+                    vol.Optional(
+                        CONF_DB_READ_CONCURRENCY, default=DEFAULT_DB_READ_CONCURRENCY
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1)),
                     vol.Optional(
                         CONF_DB_INTEGRITY_CHECK, default=DEFAULT_DB_INTEGRITY_CHECK
                     ): cv.boolean,
+                    vol.Optional(
+                        CONF_MAX_BACKLOG, default=DEFAULT_MAX_BACKLOG
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_BACKLOG_POLICY, default=BACKLOG_POLICY_DROP_OLDEST
+                    ): vol.In(BACKLOG_POLICIES),
+                    vol.Optional(CONF_BACKLOG_CRITICAL_DOMAINS, default=[]): vol.All(
+                        cv.ensure_list, [cv.string]
+                    ),
+                    vol.Optional(CONF_THROTTLE, default=[]): vol.All(
+                        cv.ensure_list, [THROTTLE_SCHEMA]
+                    ),
+                    vol.Optional(CONF_HISTORY_CACHE): HISTORY_CACHE_SCHEMA,
                 }
             ),
         )
@@ -160,27 +235,50 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     entity_filter = convert_include_exclude_filter(conf)
     auto_purge = conf[CONF_AUTO_PURGE]
     keep_days = conf[CONF_PURGE_KEEP_DAYS]
+    keep_days_domains = conf[CONF_PURGE_KEEP_DAYS_DOMAINS]
+    keep_days_entities = conf[CONF_PURGE_KEEP_DAYS_ENTITIES]
     commit_interval = conf[CONF_COMMIT_INTERVAL]
     db_max_retries = conf[CONF_DB_MAX_RETRIES]
     db_retry_wait = conf[CONF_DB_RETRY_WAIT]
+    db_read_concurrency = conf[CONF_DB_READ_CONCURRENCY]
     db_integrity_check = conf[CONF_DB_INTEGRITY_CHECK]
+    max_backlog = conf[CONF_MAX_BACKLOG]
+    backlog_policy = conf[CONF_BACKLOG_POLICY]
+    backlog_critical_domains = conf[CONF_BACKLOG_CRITICAL_DOMAINS]
 
     db_url = conf.get(CONF_DB_URL)
     if not db_url:
         db_url = DEFAULT_URL.format(hass_config_path=hass.config.path(DEFAULT_DB_FILE))
     exclude = conf[CONF_EXCLUDE]
     exclude_t = exclude.get(CONF_EVENT_TYPES, [])
+    throttle = None
+    if conf[CONF_THROTTLE]:
+        throttle = RecorderThrottle(
+            hass, [ThrottleRule.from_config(rule) for rule in conf[CONF_THROTTLE]]
+        )
+        await throttle.async_setup()
+    history_cache = None
+    if CONF_HISTORY_CACHE in conf:
+        history_cache = HistoryCache.from_config(conf[CONF_HISTORY_CACHE])
     instance = hass.data[DATA_INSTANCE] = Recorder(
         hass=hass,
         auto_purge=auto_purge,
         keep_days=keep_days,
+        keep_days_domains=keep_days_domains,
+        keep_days_entities=keep_days_entities,
         commit_interval=commit_interval,
         uri=db_url,
         db_max_retries=db_max_retries,
         db_retry_wait=db_retry_wait,
+        db_read_concurrency=db_read_concurrency,
         entity_filter=entity_filter,
         exclude_t=exclude_t,
         db_integrity_check=db_integrity_check,
+        max_backlog=max_backlog,
+        backlog_policy=backlog_policy,
+        backlog_critical_domains=backlog_critical_domains,
+        throttle=throttle,
+        history_cache=history_cache,
     )
     instance.async_initialize()
     instance.start()
@@ -192,12 +290,66 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     hass.services.async_register(
         DOMAIN, SERVICE_PURGE, async_handle_purge_service, schema=SERVICE_PURGE_SCHEMA
     )
+    hass.components.websocket_api.async_register_command(websocket_backlog_info)
+    hass.components.websocket_api.async_register_command(
+        websocket_statistics_during_period
+    )
 
     return await instance.async_db_ready
 
 
+@callback
+@websocket_api.websocket_command({vol.Required("type"): "recorder/backlog_info"})
+def websocket_backlog_info(hass, connection, msg):
+    """Return how far behind the recorder is."""
+    instance = hass.data[DATA_INSTANCE]
+    connection.send_message(
+        websocket_api.result_message(msg["id"], instance.backlog_info())
+    )
+
+
+@websocket_api.async_response
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "recorder/statistics_during_period",
+        vol.Required("start_time"): str,
+        vol.Optional("end_time"): str,
+        vol.Optional("statistic_ids"): [str],
+        vol.Optional("period", default=statistics.PERIOD_HOUR): vol.In(
+            list(statistics.PERIODS)
+        ),
+    }
+)
+async def websocket_statistics_during_period(hass, connection, msg):
+    """Return the long-term statistics of a period."""
+    start_time = dt_util.parse_datetime(msg["start_time"])
+    if start_time is None:
+        connection.send_error(msg["id"], "invalid_start_time", "Invalid start_time")
+        return
+
+    end_time = None
+    if "end_time" in msg:
+        end_time = dt_util.parse_datetime(msg["end_time"])
+        if end_time is None:
+            connection.send_error(msg["id"], "invalid_end_time", "Invalid end_time")
+            return
+
+    result = await async_add_read_job(
+        hass,
+        statistics.statistics_during_period,
+        hass,
+        dt_util.as_utc(start_time),
+        dt_util.as_utc(end_time) if end_time else None,
+        msg.get("statistic_ids"),
+        msg["period"],
+    )
+    connection.send_result(msg["id"], result)
+
+
 PurgeTask = namedtuple("PurgeTask", ["keep_days", "repack"])
 
+StatisticsTask = namedtuple("StatisticsTask", ["start"])
+
 
 class WaitTask:
     """An object to insert into the recorder queue to tell it set the _queue_watch event."""
@@ -211,13 +363,21 @@ class Recorder(threading.Thread):
         hass: HomeAssistant,
         auto_purge: bool,
         keep_days: int,
+        keep_days_domains: Dict[str, int],
+        keep_days_entities: Dict[str, int],
         commit_interval: int,
         uri: str,
         db_max_retries: int,
         db_retry_wait: int,
+        db_read_concurrency: int,
         entity_filter: Callable[[str], bool],
         exclude_t: List[str],
         db_integrity_check: bool,
+        max_backlog: int,
+        backlog_policy: str,
+        backlog_critical_domains: List[str],
+        throttle: Optional[RecorderThrottle],
+        history_cache: Optional[HistoryCache],
     ) -> None:
         """Initialize the recorder."""
         threading.Thread.__init__(self, name="Recorder")
@@ -225,16 +385,40 @@ class Recorder(threading.Thread):
         self.hass = hass
         self.auto_purge = auto_purge
         self.keep_days = keep_days
+        self.keep_days_domains = keep_days_domains
+        self.keep_days_entities = keep_days_entities
         self.commit_interval = commit_interval
-        self.queue: Any = queue.SimpleQueue()
+        self.queue = RecorderQueue()
         self.recording_start = dt_util.utcnow()
         self.db_url = uri
         self.db_max_retries = db_max_retries
         self.db_retry_wait = db_retry_wait
+        self.db_read_concurrency = db_read_concurrency
+        # Reads of the integrations run here and not in the recorder thread
+        self.read_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=db_read_concurrency, thread_name_prefix="RecorderRead"
+        )
+        self.read_executor_closed = False
         self.db_integrity_check = db_integrity_check
+        self.max_backlog = max_backlog
+        self.backlog_policy = backlog_policy
+        self.backlog_critical_domains = set(backlog_critical_domains)
+        self.throttle = throttle
+        self.history_cache = history_cache
+        if history_cache is not None:
+            history_cache.reset(self.recording_start)
+        self.backlog_exceeded = False
+        self.dropped_events = 0
+        self.event_lag: Optional[float] = None
+        self.commit_latency: Optional[float] = None
+        self.rows_per_commit = 0
+        # The states of the statistics entities when the last period ended
+        self.statistics_end: Optional[datetime] = None
+        self.statistics_states: Dict[str, tuple] = {}
         self.async_db_ready = asyncio.Future()
         self._queue_watch = threading.Event()
         self.engine: Any = None
+        self.read_engine: Any = None
         self.run_info: Any = None
 
         self.entity_filter = entity_filter
@@ -242,11 +426,25 @@ class Recorder(threading.Thread):
 
         self._timechanges_seen = 0
         self._commits_without_expire = 0
+        self._pending_events = 0
+        self._last_time_fired = None
         self._keepalive_count = 0
         self._old_states = {}
+        self._state_attributes_ids = LRUCache(STATE_ATTRIBUTES_ID_CACHE_SIZE)
+        self._pending_state_attributes = {}
+        self._last_state_attributes = {}
+        self._event_data_ids = LRUCache(EVENT_DATA_ID_CACHE_SIZE)
+        self._pending_event_data = {}
+        self._event_type_ids = LRUCache(EVENT_TYPE_ID_CACHE_SIZE)
+        self._pending_event_types = {}
         self._pending_expunge = []
+        # The next primary key and the last id reserved in the sequence per model
+        self._next_ids = {}
+        self._reserved_ids = {}
+        self._uncommitted_rows = []
         self.event_session = None
         self.get_session = None
+        self.get_read_session = None
         self._completed_database_setup = False
 
     @callback
@@ -263,6 +461,15 @@ class Recorder(threading.Thread):
 
     def run(self):
         """Start processing events to save."""
+        try:
+            self._run()
+        finally:
+            # The loop can end without closing the connection,
+            # e.g. when it never came up or shutdown came first
+            self._shutdown_read_executor()
+
+    def _run(self):
+        """Set up the connection and save events until shutdown."""
         tries = 1
         connected = False
 
@@ -348,6 +555,16 @@ class Recorder(threading.Thread):
                 async_purge, hour=4, minute=12, second=0
             )
 
+        @callback
+        def async_compile_statistics(now):
+            """Trigger compiling the statistics of the last five minutes."""
+            self.queue.put(StatisticsTask(statistics.get_start_time()))
+
+        # Compile statistics shortly after every five minute period
+        self.hass.helpers.event.track_time_change(
+            async_compile_statistics, minute=range(0, 60, 5), second=10
+        )
+
         self.event_session = self.get_session()
         self.event_session.expire_on_commit = False
         # Use a session for the event read loop
@@ -363,6 +580,13 @@ class Recorder(threading.Thread):
                 # Schedule a new purge task if this one didn't finish
                 if not purge.purge_old_data(self, event.keep_days, event.repack):
                     self.queue.put(PurgeTask(event.keep_days, event.repack))
+                if self.history_cache is not None:
+                    self._evict_purged_history(event.keep_days)
+                continue
+            if isinstance(event, StatisticsTask):
+                # Include the states of the end of the period
+                self._commit_event_session_or_retry()
+                self._compile_statistics(event.start)
                 continue
             if isinstance(event, WaitTask):
                 self._queue_watch.set()
@@ -386,11 +610,17 @@ class Recorder(threading.Thread):
                 if not self.entity_filter(entity_id):
                     continue
 
+            dbevent = None
             try:
+                dbevent = Events.from_event(event)
+                # The data of state_changed events is stored in the states table
                 if event.event_type == EVENT_STATE_CHANGED:
-                    dbevent = Events.from_event(event, event_data="{}")
+                    dbevent_data = None
                 else:
-                    dbevent = Events.from_event(event)
+                    dbevent_data = EventData.from_event(event)
+                if dbevent_data is not None:
+                    self._set_event_data(dbevent, dbevent_data)
+                self._set_event_type(dbevent, event.event_type)
                 dbevent.created = event.time_fired
                 self.event_session.add(dbevent)
             except (TypeError, ValueError):
@@ -402,6 +632,8 @@ class Recorder(threading.Thread):
             if dbevent and event.event_type == EVENT_STATE_CHANGED:
                 try:
                     dbstate = States.from_event(event)
+                    dbstate_attributes = self._state_attributes_from_event(event)
+                    self._set_state_attributes(dbstate, dbstate_attributes)
                     has_new_state = event.data.get("new_state")
                     if dbstate.entity_id in self._old_states:
                         old_state = self._old_states.pop(dbstate.entity_id)
@@ -414,6 +646,18 @@ class Recorder(threading.Thread):
                     dbstate.event = dbevent
                     dbstate.created = event.time_fired
                     self.event_session.add(dbstate)
+                    if self.history_cache is not None:
+                        self.history_cache.add(
+                            CachedState(
+                                dbstate.domain,
+                                dbstate.entity_id,
+                                dbstate.state,
+                                dbstate.numeric_state,
+                                dbstate_attributes.shared_attrs,
+                                dbstate.last_changed_ts,
+                                dbstate.last_updated_ts,
+                            )
+                        )
                     if has_new_state:
                         self._old_states[dbstate.entity_id] = dbstate
                         self._pending_expunge.append(dbstate)
@@ -426,11 +670,147 @@ class Recorder(threading.Thread):
                     # Must catch the exception to prevent the loop from collapsing
                     _LOGGER.exception("Error adding state change: %s", err)
 
+            self._pending_events += 1
+            self._last_time_fired = event.time_fired
             # If they do not have a commit interval
-            # than we commit right away
-            if not self.commit_interval:
+            # than we commit right away, if too many rows
+            # are waiting we commit early to bound the batch size
+            if not self.commit_interval or self._pending_events >= MAX_PENDING_EVENTS:
                 self._commit_event_session_or_retry()
 
+    def _set_event_type(self, dbevent, event_type):
+        """Link dbevent to its event_types row, creating one if needed."""
+        pending_event_type = self._pending_event_types.get(event_type)
+        if pending_event_type is not None:
+            dbevent.event_type_rel = pending_event_type
+            return
+
+        event_type_id = self._event_type_ids.get(event_type)
+        if event_type_id is None:
+            with self.event_session.no_autoflush:
+                db_event_type = (
+                    self.event_session.query(EventTypes.event_type_id)
+                    .filter(EventTypes.event_type == event_type)
+                    .first()
+                )
+            if db_event_type:
+                event_type_id = self._event_type_ids[event_type] = db_event_type[0]
+
+        if event_type_id is not None:
+            dbevent.event_type_id = event_type_id
+            return
+
+        dbevent.event_type_rel = self._pending_event_types[event_type] = EventTypes(
+            event_type=event_type
+        )
+
+    def _set_event_data(self, dbevent, dbevent_data):
+        """Link dbevent to a shared event_data row, reusing one if possible."""
+        shared_data = dbevent_data.shared_data
+        pending_event_data = self._pending_event_data.get(shared_data)
+        if pending_event_data is not None:
+            dbevent.event_data_rel = pending_event_data
+            return
+
+        data_id = self._event_data_ids.get(shared_data)
+        if data_id is None:
+            with self.event_session.no_autoflush:
+                db_event_data = (
+                    self.event_session.query(EventData.data_id)
+                    .filter(EventData.hash == dbevent_data.hash)
+                    .filter(EventData.shared_data == shared_data)
+                    .first()
+                )
+            if db_event_data:
+                data_id = self._event_data_ids[shared_data] = db_event_data[0]
+
+        if data_id is not None:
+            dbevent.data_id = data_id
+            return
+
+        dbevent.event_data_rel = dbevent_data
+        self._pending_event_data[shared_data] = dbevent_data
+
+    def _state_attributes_from_event(self, event):
+        """Create the attributes row of a state_changed event.
+
+        The state machine shares the attributes mapping between states whose
+        attributes did not change, those are only serialized once.
+        """
+        entity_id = event.data["entity_id"]
+        new_state = event.data.get("new_state")
+        last = self._last_state_attributes.pop(entity_id, None)
+        if new_state is None:
+            return StateAttributes.from_event(event)
+
+        if last is not None and last[0] is new_state.attributes:
+            dbstate_attributes = StateAttributes(hash=last[1], shared_attrs=last[2])
+        else:
+            dbstate_attributes = StateAttributes.from_event(event)
+        self._last_state_attributes[entity_id] = (
+            new_state.attributes,
+            dbstate_attributes.hash,
+            dbstate_attributes.shared_attrs,
+        )
+        return dbstate_attributes
+
+    def _evict_purged_history(self, keep_days):
+        """Evict the cached states a purge with keep_days may have deleted."""
+        shortest_keep_days = min(
+            [
+                keep_days,
+                *self.keep_days_domains.values(),
+                *self.keep_days_entities.values(),
+            ]
+        )
+        self.history_cache.evict_before(
+            dt_util.utcnow() - timedelta(days=shortest_keep_days)
+        )
+
+    def _set_state_attributes(self, dbstate, dbstate_attributes):
+        """Link dbstate to a shared attributes row, reusing one if possible."""
+        shared_attrs = dbstate_attributes.shared_attrs
+        # Matching attributes are waiting for the next commit
+        pending_attributes = self._pending_state_attributes.get(shared_attrs)
+        if pending_attributes is not None:
+            dbstate.state_attributes = pending_attributes
+            return
+
+        # Matching attributes were written recently
+        attributes_id = self._state_attributes_ids.get(shared_attrs)
+        if attributes_id is None:
+            attributes_id = self._find_shared_attrs_in_db(
+                dbstate_attributes.hash, shared_attrs
+            )
+            if attributes_id is not None:
+                self._state_attributes_ids[shared_attrs] = attributes_id
+
+        if attributes_id is not None:
+            dbstate.attributes_id = attributes_id
+            return
+
+        dbstate.state_attributes = dbstate_attributes
+        self._pending_state_attributes[shared_attrs] = dbstate_attributes
+
+    def _find_shared_attrs_in_db(self, attr_hash, shared_attrs):
+        """Find an attributes_id by hash and shared_attrs."""
+        # Avoid flushing the pending rows just to look up the attributes
+        with self.event_session.no_autoflush:
+            attributes = (
+                self.event_session.query(StateAttributes.attributes_id)
+                .filter(StateAttributes.hash == attr_hash)
+                .filter(StateAttributes.shared_attrs == shared_attrs)
+                .first()
+            )
+        return attributes[0] if attributes else None
+
+    def _compile_statistics(self, start):
+        try:
+            statistics.compile_statistics(self, start)
+        except Exception as err:  # pylint: disable=broad-except
+            # Must catch the exception to prevent the loop from collapsing
+            _LOGGER.exception("Error compiling statistics: %s", err)
+
     def _send_keep_alive(self):
         try:
             _LOGGER.debug("Sending keepalive")
@@ -482,11 +862,14 @@ class Recorder(threading.Thread):
         self._reopen_event_session()
 
     def _reopen_event_session(self):
+        self._pending_events = 0
+        self._clear_pending_shared_rows()
         try:
             self.event_session.rollback()
         except Exception as err:  # pylint: disable=broad-except
             # Must catch the exception to prevent the loop from collapsing
             _LOGGER.exception("Error while rolling back event session: %s", err)
+        self._forget_uncommitted_rows()
 
         try:
             self.event_session.close()
@@ -503,8 +886,13 @@ class Recorder(threading.Thread):
 
     def _commit_event_session(self):
         self._commits_without_expire += 1
+        self._pending_events = 0
+        start = time.monotonic()
+        rows = len(self.event_session.new)
 
         try:
+            if self.event_session.new:
+                self._assign_primary_keys()
             if self._pending_expunge:
                 self.event_session.flush()
                 for dbstate in self._pending_expunge:
@@ -512,7 +900,6 @@ class Recorder(threading.Thread):
                     # until we use it later for dbstate.old_state
                     if dbstate in self.event_session:
                         self.event_session.expunge(dbstate)
-                self._pending_expunge = []
             self.event_session.commit()
         except exc.IntegrityError as err:
             _LOGGER.error(
@@ -520,13 +907,39 @@ class Recorder(threading.Thread):
                 err,
             )
             self.event_session.rollback()
+            self._forget_uncommitted_rows()
             self._old_states = {}
+            self._state_attributes_ids.clear()
+            self._event_data_ids.clear()
+            self._event_type_ids.clear()
+            self._clear_pending_shared_rows()
             raise
         except Exception as err:
             _LOGGER.error("Error executing query: %s", err)
             self.event_session.rollback()
+            self._forget_uncommitted_rows()
+            self._clear_pending_shared_rows()
             raise
 
+        self._pending_expunge = []
+        self._uncommitted_rows = []
+
+        # Once committed the shared rows can be reused by id
+        for shared_attrs, dbstate_attributes in self._pending_state_attributes.items():
+            self._state_attributes_ids[shared_attrs] = dbstate_attributes.attributes_id
+        for shared_data, dbevent_data in self._pending_event_data.items():
+            self._event_data_ids[shared_data] = dbevent_data.data_id
+        for event_type, db_event_type in self._pending_event_types.items():
+            self._event_type_ids[event_type] = db_event_type.event_type_id
+        self._clear_pending_shared_rows()
+
+        self.commit_latency = round(time.monotonic() - start, 3)
+        self.rows_per_commit = rows
+        if self._last_time_fired is not None:
+            self.event_lag = round(
+                (dt_util.utcnow() - self._last_time_fired).total_seconds(), 3
+            )
+
         # Expire is an expensive operation (frequently more expensive
         # than the flush and commit itself) so we only
         # do it after EXPIRE_AFTER_COMMITS commits
@@ -534,10 +947,176 @@ class Recorder(threading.Thread):
             self._commits_without_expire = 0
             self.event_session.expire_all()
 
+    def _assign_primary_keys(self):
+        """Assign the ids of the pending rows before they are flushed.
+
+        When the ids are already known the rows of each table are inserted
+        with a single executemany instead of one INSERT per row to read back
+        the generated id. The next id of each table is read from the
+        database once and then tracked in memory, on PostgreSQL the ids
+        are reserved in the sequence ID_BLOCK_SIZE at a time.
+        """
+        pending = {}
+        for obj in self.event_session.new:
+            pending.setdefault(type(obj), []).append(obj)
+
+        for model, objs in pending.items():
+            pk_column = model.__table__.primary_key.columns.values()[0]
+            new_objs = sorted(
+                (obj for obj in objs if getattr(obj, pk_column.key) is None),
+                key=lambda obj: inspect(obj).insert_order,
+            )
+            if not new_objs:
+                continue
+            next_id = self._next_ids.get(model)
+            if next_id is None:
+                with self.event_session.no_autoflush:
+                    next_id = (
+                        self.event_session.query(func.max(pk_column)).scalar() or 0
+                    ) + 1
+
+            last_id = next_id + len(new_objs) - 1
+            if (
+                self.engine.dialect.name == "postgresql"
+                and last_id > self._reserved_ids.get(model, 0)
+            ):
+                # Keep the sequence ahead for rows inserted without an id
+                reserved_id = last_id + ID_BLOCK_SIZE
+                self.event_session.execute(
+                    text(
+                        "SELECT setval(pg_get_serial_sequence(:table, :column), :value)"
+                    ),
+                    {
+                        "table": model.__tablename__,
+                        "column": pk_column.name,
+                        "value": reserved_id,
+                    },
+                )
+                self._reserved_ids[model] = reserved_id
+
+            for obj in new_objs:
+                setattr(obj, pk_column.key, next_id)
+                self._uncommitted_rows.append((obj, pk_column.key))
+                next_id += 1
+            self._next_ids[model] = next_id
+
+    def _forget_uncommitted_rows(self):
+        """Forget the ids and old states of the rows of a rolled back commit.
+
+        The next ids are read from the database again and the next states
+        do not refer to old states that were never written.
+        """
+        for obj, pk_key in self._uncommitted_rows:
+            setattr(obj, pk_key, None)
+        for dbstate in self._pending_expunge:
+            if self._old_states.get(dbstate.entity_id) is dbstate:
+                del self._old_states[dbstate.entity_id]
+        self._uncommitted_rows = []
+        self._pending_expunge = []
+        self._next_ids = {}
+
+    def _clear_pending_shared_rows(self):
+        """Forget the shared rows that have not been committed."""
+        self._pending_state_attributes = {}
+        self._pending_event_data = {}
+        self._pending_event_types = {}
+
+    def evict_purged_event_data(self, data_ids):
+        """Remove purged data_ids from the cache.
+
+        Must be called from the recorder thread.
+        """
+        purged = [
+            shared_data
+            for shared_data, data_id in self._event_data_ids.items()
+            if data_id in data_ids
+        ]
+        for shared_data in purged:
+            self._event_data_ids.pop(shared_data)
+
+    def evict_purged_state_attributes(self, attributes_ids):
+        """Remove purged attributes_ids from the cache.
+
+        Must be called from the recorder thread.
+        """
+        purged = [
+            shared_attrs
+            for shared_attrs, attributes_id in self._state_attributes_ids.items()
+            if attributes_id in attributes_ids
+        ]
+        for shared_attrs in purged:
+            self._state_attributes_ids.pop(shared_attrs)
+
+    @property
+    def backlog(self):
+        """Return the number of items waiting in the queue."""
+        return self.queue.qsize()
+
+    def backlog_info(self):
+        """Return the backlog metrics."""
+        return {
+            "backlog": self.backlog,
+            "max_backlog": self.max_backlog,
+            "backlog_exceeded": self.backlog_exceeded,
+            "backlog_policy": self.backlog_policy,
+            "dropped_events": self.dropped_events,
+            "event_lag": self.event_lag,
+            "commit_latency": self.commit_latency,
+            "rows_per_commit": self.rows_per_commit,
+            "throttled_events": self.throttle.dropped_events if self.throttle else 0,
+        }
+
     @callback
     def event_listener(self, event):
         """Listen for new events and put them in the process queue."""
-        self.queue.put(event)
+        if self.throttle is None:
+            self._queue_event(event)
+            return
+
+        for recorded_event in self.throttle.async_filter(event):
+            self._queue_event(recorded_event)
+
+    @callback
+    def _queue_event(self, event):
+        """Put an event in the queue unless the backlog is full."""
+        if self.backlog < self.max_backlog:
+            if self.backlog_exceeded:
+                self.backlog_exceeded = False
+                _LOGGER.warning(
+                    "The recorder backlog is below %s again, "
+                    "%s events were not recorded",
+                    self.max_backlog,
+                    self.dropped_events,
+                )
+            self.queue.put(event)
+            return
+
+        if not self.backlog_exceeded:
+            self.backlog_exceeded = True
+            _LOGGER.error(
+                "The recorder backlog reached %s events because the database "
+                "is not keeping up, applying the %s policy until it recovers",
+                self.max_backlog,
+                self.backlog_policy,
+            )
+
+        if self.backlog_policy == BACKLOG_POLICY_PAUSE:
+            entity_id = event.data.get(ATTR_ENTITY_ID)
+            if (
+                entity_id is not None
+                and split_entity_id(entity_id)[0] not in self.backlog_critical_domains
+            ):
+                self.dropped_events += 1
+                return
+            if self.backlog < self.max_backlog * PAUSE_BACKLOG_LIMIT_FACTOR:
+                self.queue.put(event)
+                return
+
+        # Make room by dropping the oldest queued event, the tasks keep
+        # their place in the queue
+        self.dropped_events += 1
+        if self.queue.drop_oldest_event():
+            self.queue.put(event)
 
     def block_till_done(self):
         """Block till all events processed.
@@ -614,9 +1193,51 @@ class Recorder(threading.Thread):
 
         Base.metadata.create_all(self.engine)
         self.get_session = scoped_session(sessionmaker(bind=self.engine))
+        self._setup_read_connection()
+
+    def _setup_read_connection(self):
+        """Set up the connections the reads use besides the recorder.
+
+        SQLite in WAL mode lets them read while the recorder writes. The
+        pool keeps a connection for each read the read executor runs at once.
+        """
+        if self.read_engine is not None and self.read_engine is not self.engine:
+            self.read_engine.dispose()
+
+        # An in memory database is only reachable through its connection
+        if self.db_url == SQLITE_URL_PREFIX or ":memory:" in self.db_url:
+            self.read_engine = self.engine
+        else:
+            kwargs = {"pool_size": self.db_read_concurrency}
+            if self.db_url.startswith(SQLITE_URL_PREFIX):
+                kwargs["connect_args"] = {"check_same_thread": False}
+                kwargs["poolclass"] = QueuePool
+            self.read_engine = create_engine(self.db_url, **kwargs)
+
+            def setup_read_connection(dbapi_connection, connection_record):
+                """Make sure the read connections do not write."""
+                if self.db_url.startswith(SQLITE_URL_PREFIX):
+                    # The recorder connection already enabled WAL mode
+                    cursor = dbapi_connection.cursor()
+                    cursor.execute("PRAGMA query_only=ON")
+                    cursor.close()
+
+            sqlalchemy_event.listen(self.read_engine, "connect", setup_read_connection)
+
+        self.get_read_session = scoped_session(sessionmaker(bind=self.read_engine))
+
+    def _shutdown_read_executor(self):
+        """Stop accepting database reads."""
+        self.read_executor_closed = True
+        self.read_executor.shutdown(wait=False)
 
     def _close_connection(self):
         """Close the connection."""
+        self._shutdown_read_executor()
+        if self.read_engine is not self.engine:
+            self.read_engine.dispose()
+        self.read_engine = None
+        self.get_read_session = None
         self.engine.dispose()
         self.engine = None
         self.get_session = None
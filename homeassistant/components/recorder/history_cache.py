@@ -0,0 +1,147 @@
+"""Keep the recently recorded states in memory for the history queries."""
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+import threading
+from typing import Deque, Dict, Iterable, List, Optional
+
+import voluptuous as vol
+
+import homeassistant.helpers.config_validation as cv
+
+CONF_WINDOW = "window"
+CONF_MAX_STATES = "max_states"
+
+DEFAULT_WINDOW = timedelta(hours=6)
+DEFAULT_MAX_STATES = 100000
+
+HISTORY_CACHE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_WINDOW, default=DEFAULT_WINDOW): cv.time_period,
+        vol.Optional(CONF_MAX_STATES, default=DEFAULT_MAX_STATES): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+    }
+)
+
+# The columns of the history queries, so cached states are handled like rows
+CachedState = namedtuple(
+    "CachedState",
+    [
+        "domain",
+        "entity_id",
+        "state",
+        "numeric_state",
+        "shared_attrs",
+        "last_changed_ts",
+        "last_updated_ts",
+    ],
+)
+
+# The resolution of the recorded timestamps
+_RESOLUTION = 1e-6
+
+
+class HistoryCache:
+    """The states recorded in the last window of time, per entity.
+
+    The states are evicted oldest first once they are older than the window
+    or more than max_states are kept. All the states an entity recorded
+    since covered_from are in the cache, the older ones must be read from
+    the database. The cache is fed by the recorder thread and read from
+    the executor, so it is guarded by a lock.
+    """
+
+    def __init__(self, window: timedelta, max_states: int) -> None:
+        """Initialize the cache."""
+        self.window = window.total_seconds()
+        self.max_states = max_states
+        self._lock = threading.Lock()
+        self._entity_states: Dict[str, Deque[CachedState]] = {}
+        self._states: Deque[CachedState] = deque()
+        self._start_ts = 0.0
+        self._covered_from: Dict[str, float] = {}
+
+    @classmethod
+    def from_config(cls, config: dict) -> "HistoryCache":
+        """Create a cache from its configuration."""
+        return cls(config[CONF_WINDOW], config[CONF_MAX_STATES])
+
+    def reset(self, start: datetime) -> None:
+        """Forget all states, the states recorded from start on are cached."""
+        with self._lock:
+            self._entity_states.clear()
+            self._states.clear()
+            self._covered_from.clear()
+            self._start_ts = start.timestamp()
+
+    def add(self, state: CachedState) -> None:
+        """Add a recorded state and evict the states that no longer fit."""
+        with self._lock:
+            self._entity_states.setdefault(state.entity_id, deque()).append(state)
+            self._states.append(state)
+            oldest_ts = state.last_updated_ts - self.window
+            while len(self._states) > self.max_states or (
+                self._states[0].last_updated_ts < oldest_ts
+            ):
+                self._evict()
+
+    def evict_before(self, point_in_time: datetime) -> None:
+        """Stop covering the states recorded before point_in_time.
+
+        Called after a purge, the database no longer has the states the
+        cache would be answering for.
+        """
+        point_in_time_ts = point_in_time.timestamp()
+        with self._lock:
+            while self._states and self._states[0].last_updated_ts < point_in_time_ts:
+                self._evict()
+            # Out of order states are kept but no longer covered
+            self._start_ts = max(self._start_ts, point_in_time_ts)
+
+    def _evict(self) -> None:
+        """Evict the oldest state."""
+        state = self._states.popleft()
+        entity_states = self._entity_states[state.entity_id]
+        entity_states.popleft()
+        if not entity_states:
+            del self._entity_states[state.entity_id]
+        self._covered_from[state.entity_id] = max(
+            self._covered_from.get(state.entity_id, self._start_ts),
+            state.last_updated_ts + _RESOLUTION,
+        )
+
+    def covered_from(self, entity_ids: Iterable[str]) -> float:
+        """Return the timestamp since which all states of the entities are cached."""
+        with self._lock:
+            return max(
+                [
+                    max(self._covered_from.get(entity_id, 0.0), self._start_ts)
+                    for entity_id in entity_ids
+                ],
+                default=self._start_ts,
+            )
+
+    def states(self, entity_ids: Iterable[str]) -> List[CachedState]:
+        """Return the cached states of the entities ordered by entity and time."""
+        with self._lock:
+            result: List[CachedState] = []
+            for entity_id in sorted(entity_ids):
+                result.extend(self._entity_states.get(entity_id, ()))
+            return result
+
+    def state_before(
+        self, entity_id: str, point_in_time: datetime
+    ) -> Optional[CachedState]:
+        """Return the last state recorded before point_in_time.
+
+        Returns None if the state might be older than the cached states.
+        """
+        point_in_time_ts = point_in_time.timestamp()
+        with self._lock:
+            covered_from = max(self._covered_from.get(entity_id, 0.0), self._start_ts)
+            for state in reversed(self._entity_states.get(entity_id, ())):
+                if state.last_updated_ts < point_in_time_ts:
+                    if state.last_updated_ts < covered_from:
+                        return None
+                    return state
+        return None
@@ -1,17 +1,39 @@
 """Schema migration helpers."""
 import logging
 
-from sqlalchemy import ForeignKeyConstraint, MetaData, Table, text
+from sqlalchemy import ForeignKeyConstraint, MetaData, Table, bindparam, text
 from sqlalchemy.engine import reflection
 from sqlalchemy.exc import InternalError, OperationalError, SQLAlchemyError
 from sqlalchemy.schema import AddConstraint, DropConstraint
 
+from homeassistant.helpers.json import json_dumps, json_loads
+
 from .const import DOMAIN
-from .models import SCHEMA_VERSION, TABLE_STATES, Base, SchemaChanges
-from .util import session_scope
+from .models import (
+    EMPTY_JSON_OBJECT,
+    SCHEMA_VERSION,
+    TABLE_STATES,
+    TABLE_STATISTICS,
+    TABLE_STATISTICS_SHORT_TERM,
+    Base,
+    EventData,
+    Events,
+    EventTypes,
+    SchemaChanges,
+    StateAttributes,
+    States,
+    parse_numeric_state,
+    process_timestamp,
+)
+from .util import LRUCache, session_scope
 
 _LOGGER = logging.getLogger(__name__)
 
+# Number of rows converted per transaction when
+# moving data between tables during a migration
+MIGRATION_BATCH_SIZE = 1000
+MIGRATION_CACHE_SIZE = 4096
+
 
 def migrate_schema(instance):
     """Check if the schema needs to be upgraded."""
@@ -206,6 +228,33 @@ def _add_columns(engine, table_name, columns_def):
             )
 
 
+def _modify_columns(engine, table_name, columns_def):
+    """Change the type of columns of a table.
+
+    Only MySQL needs it, the float types of SQLite and PostgreSQL are
+    already double precision.
+    """
+    if engine.dialect.name != "mysql":
+        return
+
+    _LOGGER.warning(
+        "Modifying columns %s in table %s. Note: this can take several "
+        "minutes on large databases and slow computers. Please "
+        "be patient!",
+        ", ".join(column.split(" ")[0] for column in columns_def),
+        table_name,
+    )
+
+    columns_def = [f"MODIFY {col_def}" for col_def in columns_def]
+    engine.execute(
+        text(
+            "ALTER TABLE {table} {columns_def}".format(
+                table=table_name, columns_def=", ".join(columns_def)
+            )
+        )
+    )
+
+
 def _update_states_table_with_foreign_key_options(engine):
     """Add the options to foreign key constraints."""
     inspector = reflection.Inspector.from_engine(engine)
@@ -245,6 +294,281 @@ def _update_states_table_with_foreign_key_options(engine):
             )
 
 
+def _set_numeric_states(engine):
+    """Set the numeric_state of existing states that are numeric."""
+    _LOGGER.warning(
+        "Setting the numeric state of existing states. Note: this can take "
+        "several minutes on large databases and slow computers. Please "
+        "be patient!"
+    )
+    states_table = States.__table__
+    select_states = (
+        states_table.select()
+        .with_only_columns([states_table.c.state_id, states_table.c.state])
+        .where(states_table.c.state_id > bindparam("last_state_id"))
+        .order_by(states_table.c.state_id)
+        .limit(MIGRATION_BATCH_SIZE)
+    )
+    update_states = (
+        states_table.update()
+        .where(states_table.c.state_id == bindparam("b_state_id"))
+        .values(numeric_state=bindparam("b_numeric_state"))
+    )
+
+    last_state_id = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select_states, last_state_id=last_state_id
+            ).fetchall()
+            if not rows:
+                return
+
+            updates = []
+            for state_id, state in rows:
+                numeric_state = parse_numeric_state(state)
+                if numeric_state is not None:
+                    updates.append(
+                        {"b_state_id": state_id, "b_numeric_state": numeric_state}
+                    )
+            if updates:
+                connection.execute(update_states, updates)
+            last_state_id = rows[-1][0]
+
+
+def _set_states_timestamps(engine):
+    """Set the epoch timestamps of existing states."""
+    _LOGGER.warning(
+        "Converting the timestamps of existing states. Note: this can take "
+        "several minutes on large databases and slow computers. Please "
+        "be patient!"
+    )
+    states_table = States.__table__
+    select_states = (
+        states_table.select()
+        .with_only_columns(
+            [
+                states_table.c.state_id,
+                states_table.c.last_changed,
+                states_table.c.last_updated,
+            ]
+        )
+        .where(states_table.c.state_id > bindparam("last_state_id"))
+        .order_by(states_table.c.state_id)
+        .limit(MIGRATION_BATCH_SIZE)
+    )
+    update_states = (
+        states_table.update()
+        .where(states_table.c.state_id == bindparam("b_state_id"))
+        .values(
+            last_changed_ts=bindparam("b_last_changed_ts"),
+            last_updated_ts=bindparam("b_last_updated_ts"),
+        )
+    )
+
+    last_state_id = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select_states, last_state_id=last_state_id
+            ).fetchall()
+            if not rows:
+                return
+
+            connection.execute(
+                update_states,
+                [
+                    {
+                        "b_state_id": state_id,
+                        "b_last_changed_ts": _timestamp_or_none(last_changed),
+                        "b_last_updated_ts": _timestamp_or_none(last_updated),
+                    }
+                    for state_id, last_changed, last_updated in rows
+                ],
+            )
+            last_state_id = rows[-1][0]
+
+
+def _timestamp_or_none(value):
+    """Return the epoch timestamp of a datetime read from the database."""
+    if value is None:
+        return None
+    return process_timestamp(value).timestamp()
+
+
+def _compact_json(shared):
+    """Re-encode legacy JSON text the same way new rows are encoded.
+
+    Rows written before the shared tables existed used spaced separators,
+    so they would never match the compact text stored for new rows.
+    """
+    try:
+        return json_dumps(json_loads(shared))
+    except ValueError:
+        return shared
+
+
+def _move_states_attributes_to_shared_table(engine):
+    """Move the attributes of existing states to the state_attributes table.
+
+    States that have the same attributes end up sharing a single row.
+    """
+    _LOGGER.warning(
+        "Moving state attributes to the %s table. Note: this can take several "
+        "minutes on large databases and slow computers. Please "
+        "be patient!",
+        StateAttributes.__tablename__,
+    )
+    states_table = States.__table__
+    attributes_table = StateAttributes.__table__
+    select_states = (
+        states_table.select()
+        .with_only_columns([states_table.c.state_id, states_table.c.attributes])
+        .where(states_table.c.attributes.isnot(None))
+        .where(states_table.c.attributes_id.is_(None))
+        .limit(MIGRATION_BATCH_SIZE)
+    )
+    select_attributes_id = (
+        attributes_table.select()
+        .with_only_columns([attributes_table.c.attributes_id])
+        .where(attributes_table.c.hash == bindparam("hash"))
+        .where(attributes_table.c.shared_attrs == bindparam("shared_attrs"))
+        .limit(1)
+    )
+    update_states = (
+        states_table.update()
+        .where(states_table.c.state_id == bindparam("b_state_id"))
+        .values(attributes_id=bindparam("b_attributes_id"), attributes=None)
+    )
+    attributes_ids = LRUCache(MIGRATION_CACHE_SIZE)
+
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(select_states).fetchall()
+            if not rows:
+                return
+
+            updates = []
+            for state_id, attributes in rows:
+                shared_attrs = _compact_json(attributes)
+                attributes_id = attributes_ids.get(shared_attrs)
+                if attributes_id is None:
+                    attr_hash = StateAttributes.hash_shared_attrs(shared_attrs)
+                    attributes_id = connection.execute(
+                        select_attributes_id,
+                        hash=attr_hash,
+                        shared_attrs=shared_attrs,
+                    ).scalar()
+                    if attributes_id is None:
+                        attributes_id = connection.execute(
+                            attributes_table.insert().values(
+                                hash=attr_hash, shared_attrs=shared_attrs
+                            )
+                        ).inserted_primary_key[0]
+                    attributes_ids[shared_attrs] = attributes_id
+                updates.append(
+                    {"b_state_id": state_id, "b_attributes_id": attributes_id}
+                )
+
+            connection.execute(update_states, updates)
+
+
+def _move_events_data_to_shared_tables(engine):
+    """Move the type and data of existing events to the shared tables.
+
+    Events with the same data end up sharing a single event_data row.
+    """
+    _LOGGER.warning(
+        "Moving event types and data to the %s and %s tables. Note: this can "
+        "take several minutes on large databases and slow computers. Please "
+        "be patient!",
+        EventTypes.__tablename__,
+        EventData.__tablename__,
+    )
+    events_table = Events.__table__
+    data_table = EventData.__table__
+    types_table = EventTypes.__table__
+    select_events = (
+        events_table.select()
+        .with_only_columns(
+            [
+                events_table.c.event_id,
+                events_table.c.event_type,
+                events_table.c.event_data,
+            ]
+        )
+        .where(events_table.c.event_type_id.is_(None))
+        .where(events_table.c.event_type.isnot(None))
+        .limit(MIGRATION_BATCH_SIZE)
+    )
+    select_data_id = (
+        data_table.select()
+        .with_only_columns([data_table.c.data_id])
+        .where(data_table.c.hash == bindparam("hash"))
+        .where(data_table.c.shared_data == bindparam("shared_data"))
+        .limit(1)
+    )
+    update_events = (
+        events_table.update()
+        .where(events_table.c.event_id == bindparam("b_event_id"))
+        .values(
+            event_type_id=bindparam("b_event_type_id"),
+            data_id=bindparam("b_data_id"),
+            event_type=None,
+            event_data=None,
+        )
+    )
+    event_type_ids = {}
+    data_ids = LRUCache(MIGRATION_CACHE_SIZE)
+
+    with engine.begin() as connection:
+        for event_type_id, event_type in connection.execute(
+            types_table.select()
+        ).fetchall():
+            event_type_ids[event_type] = event_type_id
+
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(select_events).fetchall()
+            if not rows:
+                return
+
+            updates = []
+            for event_id, event_type, event_data in rows:
+                event_type_id = event_type_ids.get(event_type)
+                if event_type_id is None:
+                    event_type_id = event_type_ids[event_type] = connection.execute(
+                        types_table.insert().values(event_type=event_type)
+                    ).inserted_primary_key[0]
+
+                data_id = None
+                if event_data and event_data != EMPTY_JSON_OBJECT:
+                    shared_data = _compact_json(event_data)
+                    data_id = data_ids.get(shared_data)
+                    if data_id is None:
+                        data_hash = EventData.hash_shared_data(shared_data)
+                        data_id = connection.execute(
+                            select_data_id, hash=data_hash, shared_data=shared_data
+                        ).scalar()
+                        if data_id is None:
+                            data_id = connection.execute(
+                                data_table.insert().values(
+                                    hash=data_hash, shared_data=shared_data
+                                )
+                            ).inserted_primary_key[0]
+                        data_ids[shared_data] = data_id
+
+                updates.append(
+                    {
+                        "b_event_id": event_id,
+                        "b_event_type_id": event_type_id,
+                        "b_data_id": data_id,
+                    }
+                )
+
+            connection.execute(update_events, updates)
+
+
 def _apply_update(engine, new_version, old_version):
     """Perform operations to bring schema up to date."""
     if new_version == 1:
@@ -323,6 +647,43 @@ def _apply_update(engine, new_version, old_version):
     elif new_version == 11:
         _create_index(engine, "states", "ix_states_old_state_id")
         _update_states_table_with_foreign_key_options(engine)
+    elif new_version == 12:
+        # The state_attributes table is created by create_all
+        _add_columns(engine, "states", ["attributes_id INTEGER"])
+        _create_index(engine, "states", "ix_states_attributes_id")
+        _move_states_attributes_to_shared_table(engine)
+    elif new_version == 13:
+        # The event_data and event_types tables are created by create_all
+        _add_columns(engine, "events", ["data_id INTEGER", "event_type_id INTEGER"])
+        _create_index(engine, "events", "ix_events_data_id")
+        _create_index(engine, "events", "ix_events_event_type_id_time_fired")
+        _drop_index(engine, "events", "ix_events_event_type_time_fired")
+        _move_events_data_to_shared_tables(engine)
+    elif new_version == 14:
+        # The statistics tables are created by create_all
+        pass
+    elif new_version == 15:
+        _add_columns(engine, "states", ["numeric_state DOUBLE PRECISION"])
+        _set_numeric_states(engine)
+    elif new_version == 16:
+        _add_columns(
+            engine,
+            "states",
+            ["last_changed_ts DOUBLE PRECISION", "last_updated_ts DOUBLE PRECISION"],
+        )
+        _set_states_timestamps(engine)
+        _create_index(engine, "states", "ix_states_last_updated_ts")
+        _create_index(engine, "states", "ix_states_entity_id_last_updated_ts")
+    elif new_version == 17:
+        for table in (TABLE_STATISTICS, TABLE_STATISTICS_SHORT_TERM):
+            _modify_columns(
+                engine,
+                table,
+                [
+                    f"{column} DOUBLE PRECISION"
+                    for column in ("mean", "min", "max", "state", "sum")
+                ],
+            )
     else:
         raise ValueError(f"No schema migration defined for version {new_version}")
 
@@ -1,11 +1,14 @@
 """Models for SQLAlchemy."""
-import json
 import logging
+import math
+import zlib
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
+    Float,
     ForeignKey,
     Index,
     Integer,
@@ -13,30 +16,53 @@ from sqlalchemy import (
     Text,
     distinct,
 )
+from sqlalchemy.dialects import mysql
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm.session import Session
 
 from homeassistant.core import Context, Event, EventOrigin, State, split_entity_id
-from homeassistant.helpers.json import JSONEncoder
+from homeassistant.helpers.json import json_dumps, json_loads
 import homeassistant.util.dt as dt_util
 
 # SQLAlchemy Schema
 # pylint: disable=invalid-name
 Base = declarative_base()
 
-SCHEMA_VERSION = 11
+SCHEMA_VERSION = 17
 
 _LOGGER = logging.getLogger(__name__)
 
 DB_TIMEZONE = "+00:00"
 
 TABLE_EVENTS = "events"
+TABLE_EVENT_DATA = "event_data"
+TABLE_EVENT_TYPES = "event_types"
 TABLE_STATES = "states"
+TABLE_STATE_ATTRIBUTES = "state_attributes"
 TABLE_RECORDER_RUNS = "recorder_runs"
 TABLE_SCHEMA_CHANGES = "schema_changes"
+TABLE_STATISTICS = "statistics"
+TABLE_STATISTICS_SHORT_TERM = "statistics_short_term"
 
-ALL_TABLES = [TABLE_STATES, TABLE_EVENTS, TABLE_RECORDER_RUNS, TABLE_SCHEMA_CHANGES]
+ALL_TABLES = [
+    TABLE_STATES,
+    TABLE_STATE_ATTRIBUTES,
+    TABLE_EVENTS,
+    TABLE_EVENT_DATA,
+    TABLE_EVENT_TYPES,
+    TABLE_RECORDER_RUNS,
+    TABLE_SCHEMA_CHANGES,
+    TABLE_STATISTICS,
+    TABLE_STATISTICS_SHORT_TERM,
+]
+
+# Events without data do not get an event_data row
+EMPTY_JSON_OBJECT = "{}"
+
+# FLOAT is single precision on MySQL, too coarse for epoch timestamps
+# and the growing sums of meters
+DOUBLE_TYPE = Float().with_variant(mysql.DOUBLE(asdecimal=False), "mysql")
 
 
 class Events(Base):  # type: ignore
@@ -48,6 +74,9 @@ class Events(Base):  # type: ignore
     }
     __tablename__ = TABLE_EVENTS
     event_id = Column(Integer, primary_key=True)
+    # event_type and event_data are only set for rows recorded
+    # before schema version 13, newer rows reference the
+    # event_types and event_data tables instead
     event_type = Column(String(32))
     event_data = Column(Text)
     origin = Column(String(32))
@@ -56,19 +85,24 @@ class Events(Base):  # type: ignore
     context_id = Column(String(36), index=True)
     context_user_id = Column(String(36), index=True)
     context_parent_id = Column(String(36), index=True)
+    data_id = Column(Integer, ForeignKey("event_data.data_id"), index=True)
+    event_type_id = Column(Integer, ForeignKey("event_types.event_type_id"))
+    event_data_rel = relationship("EventData", lazy="joined")
+    event_type_rel = relationship("EventTypes", lazy="joined")
 
     __table_args__ = (
         # Used for fetching events at a specific time
         # see logbook
-        Index("ix_events_event_type_time_fired", "event_type", "time_fired"),
+        Index("ix_events_event_type_id_time_fired", "event_type_id", "time_fired"),
     )
 
     @staticmethod
-    def from_event(event, event_data=None):
-        """Create an event database object from a native event."""
+    def from_event(event):
+        """Create an event database object from a native event.
+
+        The event type and data are linked by the recorder.
+        """
         return Events(
-            event_type=event.event_type,
-            event_data=event_data or json.dumps(event.data, cls=JSONEncoder),
             origin=str(event.origin.value),
             time_fired=event.time_fired,
             context_id=event.context.id,
@@ -83,20 +117,81 @@ class Events(Base):  # type: ignore
             user_id=self.context_user_id,
             parent_id=self.context_parent_id,
         )
+        if self.event_type_rel is not None:
+            event_type = self.event_type_rel.event_type
+        else:
+            event_type = self.event_type
+        if self.event_data_rel is not None:
+            shared_data = self.event_data_rel.shared_data
+        else:
+            shared_data = self.event_data or EMPTY_JSON_OBJECT
         try:
             return Event(
-                self.event_type,
-                json.loads(self.event_data),
+                event_type,
+                json_loads(shared_data),
                 EventOrigin(self.origin),
                 process_timestamp(self.time_fired),
                 context=context,
             )
         except ValueError:
-            # When json.loads fails
+            # When json_loads fails
             _LOGGER.exception("Error converting to event: %s", self)
             return None
 
 
+class EventData(Base):  # type: ignore
+    """Event data shared between events."""
+
+    __table_args__ = {
+        "mysql_default_charset": "utf8mb4",
+        "mysql_collate": "utf8mb4_unicode_ci",
+    }
+    __tablename__ = TABLE_EVENT_DATA
+    data_id = Column(Integer, primary_key=True)
+    hash = Column(BigInteger, index=True)
+    # Not named event_data to avoid confusion with the events table
+    shared_data = Column(Text)
+
+    @staticmethod
+    def from_event(event):
+        """Create object from an event.
+
+        Returns None if the event has no data to store.
+        """
+        if not event.data:
+            return None
+        shared_data = json_dumps(event.data)
+        return EventData(
+            hash=EventData.hash_shared_data(shared_data), shared_data=shared_data
+        )
+
+    @staticmethod
+    def hash_shared_data(shared_data):
+        """Return the hash of json encoded shared data.
+
+        The hash is only used to narrow down the lookup, rows
+        must still be matched on shared_data.
+        """
+        return zlib.crc32(shared_data.encode("utf-8"))
+
+    def to_native(self):
+        """Convert to an event data dictionary."""
+        try:
+            return json_loads(self.shared_data)
+        except ValueError:
+            # When json_loads fails
+            _LOGGER.exception("Error converting row to event data: %s", self)
+            return {}
+
+
+class EventTypes(Base):  # type: ignore
+    """Event types, stored once and referenced by id."""
+
+    __tablename__ = TABLE_EVENT_TYPES
+    event_type_id = Column(Integer, primary_key=True)
+    event_type = Column(String(64), index=True)
+
+
 class States(Base):  # type: ignore
     """State change history."""
 
@@ -109,23 +204,38 @@ class States(Base):  # type: ignore
     domain = Column(String(64))
     entity_id = Column(String(255))
     state = Column(String(255))
+    # The state as a number for states that are numeric
+    numeric_state = Column(DOUBLE_TYPE)
+    # Only set for rows recorded before schema version 12,
+    # newer rows reference the state_attributes table instead
     attributes = Column(Text)
     event_id = Column(
         Integer, ForeignKey("events.event_id", ondelete="CASCADE"), index=True
     )
     last_changed = Column(DateTime(timezone=True), default=dt_util.utcnow)
     last_updated = Column(DateTime(timezone=True), default=dt_util.utcnow, index=True)
+    # last_changed and last_updated as UTC epoch timestamps, these are cheaper
+    # to compare and convert than the datetime columns
+    last_changed_ts = Column(DOUBLE_TYPE)
+    last_updated_ts = Column(DOUBLE_TYPE, index=True)
     created = Column(DateTime(timezone=True), default=dt_util.utcnow)
     old_state_id = Column(
         Integer, ForeignKey("states.state_id", ondelete="SET NULL"), index=True
     )
+    attributes_id = Column(
+        Integer, ForeignKey("state_attributes.attributes_id"), index=True
+    )
     event = relationship("Events", uselist=False)
     old_state = relationship("States", remote_side=[state_id])
+    state_attributes = relationship("StateAttributes", lazy="joined")
 
     __table_args__ = (
         # Used for fetching the state of entities at a specific time
         # (get_states in history.py)
         Index("ix_states_entity_id_last_updated", "entity_id", "last_updated"),
+        # Used for range scans of the states of entities
+        # (get_significant_states in history.py)
+        Index("ix_states_entity_id_last_updated_ts", "entity_id", "last_updated_ts"),
     )
 
     @staticmethod
@@ -140,25 +250,32 @@ class States(Base):  # type: ignore
         if state is None:
             dbstate.state = ""
             dbstate.domain = split_entity_id(entity_id)[0]
-            dbstate.attributes = "{}"
             dbstate.last_changed = event.time_fired
             dbstate.last_updated = event.time_fired
         else:
             dbstate.domain = state.domain
             dbstate.state = state.state
-            dbstate.attributes = json.dumps(dict(state.attributes), cls=JSONEncoder)
+            dbstate.numeric_state = parse_numeric_state(state.state)
             dbstate.last_changed = state.last_changed
             dbstate.last_updated = state.last_updated
 
+        dbstate.last_changed_ts = dbstate.last_changed.timestamp()
+        dbstate.last_updated_ts = dbstate.last_updated.timestamp()
         return dbstate
 
     def to_native(self, validate_entity_id=True):
         """Convert to an HA state object."""
+        if self.attributes is not None:
+            shared_attrs = self.attributes
+        elif self.state_attributes is not None:
+            shared_attrs = self.state_attributes.shared_attrs
+        else:
+            shared_attrs = "{}"
         try:
             return State(
                 self.entity_id,
                 self.state,
-                json.loads(self.attributes),
+                json_loads(shared_attrs),
                 process_timestamp(self.last_changed),
                 process_timestamp(self.last_updated),
                 # Join the events table on event_id to get the context instead
@@ -167,11 +284,117 @@ class States(Base):  # type: ignore
                 validate_entity_id=validate_entity_id,
             )
         except ValueError:
-            # When json.loads fails
+            # When json_loads fails
             _LOGGER.exception("Error converting row to state: %s", self)
             return None
 
 
+class StateAttributes(Base):  # type: ignore
+    """State attributes shared between state changes."""
+
+    __table_args__ = {
+        "mysql_default_charset": "utf8mb4",
+        "mysql_collate": "utf8mb4_unicode_ci",
+    }
+    __tablename__ = TABLE_STATE_ATTRIBUTES
+    attributes_id = Column(Integer, primary_key=True)
+    hash = Column(BigInteger, index=True)
+    # Not named attributes to avoid confusion with the states table
+    shared_attrs = Column(Text)
+
+    @staticmethod
+    def from_event(event):
+        """Create object from a state_changed event."""
+        state = event.data.get("new_state")
+        # State got deleted
+        if state is None:
+            shared_attrs = "{}"
+        else:
+            try:
+                shared_attrs = state.attributes_as_json()
+            except ValueError:
+                # NaN and infinity are recorded as null
+                shared_attrs = json_dumps(dict(state.attributes))
+        return StateAttributes(
+            hash=StateAttributes.hash_shared_attrs(shared_attrs),
+            shared_attrs=shared_attrs,
+        )
+
+    @staticmethod
+    def hash_shared_attrs(shared_attrs):
+        """Return the hash of json encoded shared attributes.
+
+        The hash is only used to narrow down the lookup, rows
+        must still be matched on shared_attrs.
+        """
+        return zlib.crc32(shared_attrs.encode("utf-8"))
+
+    def to_native(self):
+        """Convert to a state attributes dictionary."""
+        try:
+            return json_loads(self.shared_attrs)
+        except ValueError:
+            # When json_loads fails
+            _LOGGER.exception("Error converting row to state attributes: %s", self)
+            return {}
+
+
+class StatisticsBase:
+    """Columns shared by the statistics tables."""
+
+    id = Column(Integer, primary_key=True)
+    created = Column(DateTime(timezone=True), default=dt_util.utcnow)
+    statistic_id = Column(String(255))
+    start = Column(DateTime(timezone=True))
+    mean = Column(DOUBLE_TYPE)
+    min = Column(DOUBLE_TYPE)
+    max = Column(DOUBLE_TYPE)
+    state = Column(DOUBLE_TYPE)
+    sum = Column(DOUBLE_TYPE)
+
+    @classmethod
+    def from_stats(cls, statistic_id, start, stats):
+        """Create object from compiled statistics."""
+        return cls(statistic_id=statistic_id, start=start, **stats)
+
+    def to_native(self):
+        """Convert to a statistics dictionary."""
+        return {
+            "statistic_id": self.statistic_id,
+            "start": process_timestamp(self.start),
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "state": self.state,
+            "sum": self.sum,
+        }
+
+
+class Statistics(Base, StatisticsBase):  # type: ignore
+    """Hourly statistics."""
+
+    __tablename__ = TABLE_STATISTICS
+    __table_args__ = (
+        Index("ix_statistics_statistic_id_start", "statistic_id", "start", unique=True),
+        Index("ix_statistics_start", "start"),
+    )
+
+
+class StatisticsShortTerm(Base, StatisticsBase):  # type: ignore
+    """Five minute statistics."""
+
+    __tablename__ = TABLE_STATISTICS_SHORT_TERM
+    __table_args__ = (
+        Index(
+            "ix_statistics_short_term_statistic_id_start",
+            "statistic_id",
+            "start",
+            unique=True,
+        ),
+        Index("ix_statistics_short_term_start", "start"),
+    )
+
+
 class RecorderRuns(Base):  # type: ignore
     """Representation of recorder run."""
 
@@ -219,6 +442,15 @@ class SchemaChanges(Base):  # type: ignore
     changed = Column(DateTime(timezone=True), default=dt_util.utcnow)
 
 
+def parse_numeric_state(state):
+    """Return the state as a float or None if it is not a finite number."""
+    try:
+        value = float(state)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
 def process_timestamp(ts):
     """Process a timestamp into datetime object."""
     if ts is None:
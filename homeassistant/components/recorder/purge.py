@@ -3,64 +3,56 @@ from datetime import timedelta
 import logging
 import time
 
+from sqlalchemy import and_, distinct, exists, true
 from sqlalchemy.exc import OperationalError, SQLAlchemyError
 
 import homeassistant.util.dt as dt_util
 
-from .models import Events, RecorderRuns, States
-from .util import execute, session_scope
+from .models import (
+    EventData,
+    Events,
+    RecorderRuns,
+    StateAttributes,
+    States,
+    StatisticsShortTerm,
+)
+from .util import session_scope
 
 _LOGGER = logging.getLogger(__name__)
 
+# SQLite limits the number of bound parameters to 999
+MAX_ROWS_TO_PURGE = 998
+
 
 def purge_old_data(instance, purge_days: int, repack: bool) -> bool:
     """Purge events and states older than purge_days ago.
 
-    Cleans up an timeframe of an hour, based on the oldest record.
+    Deletes at most MAX_ROWS_TO_PURGE rows of each kind per call and
+    returns False until nothing older is left, so the recorder can process
+    new events between the chunks. Entities and domains with their own
+    retention are purged with their own number of days.
     """
-    purge_before = dt_util.utcnow() - timedelta(days=purge_days)
+    now = dt_util.utcnow()
+    purge_before = now - timedelta(days=purge_days)
     _LOGGER.debug("Purging states and events before target %s", purge_before)
 
     try:
         with session_scope(session=instance.get_session()) as session:
-            # Purge a max of 1 hour, based on the oldest states or events record
-            batch_purge_before = purge_before
-
-            query = session.query(States).order_by(States.last_updated.asc()).limit(1)
-            states = execute(query, to_native=True, validate_entity_ids=False)
-            if states:
-                batch_purge_before = min(
-                    batch_purge_before,
-                    states[0].last_updated + timedelta(hours=1),
-                )
-
-            query = session.query(Events).order_by(Events.time_fired.asc()).limit(1)
-            events = execute(query, to_native=True)
-            if events:
-                batch_purge_before = min(
-                    batch_purge_before,
-                    events[0].time_fired + timedelta(hours=1),
-                )
-
-            _LOGGER.debug("Purging states and events before %s", batch_purge_before)
-
-            deleted_rows = (
-                session.query(States)
-                .filter(States.last_updated < batch_purge_before)
-                .delete(synchronize_session=False)
-            )
-            _LOGGER.debug("Deleted %s states", deleted_rows)
-
-            deleted_rows = (
-                session.query(Events)
-                .filter(Events.time_fired < batch_purge_before)
-                .delete(synchronize_session=False)
-            )
-            _LOGGER.debug("Deleted %s events", deleted_rows)
+            finished = True
+            for criterion, states_purge_before in _states_retention(
+                instance, purge_before, now
+            ):
+                if not _purge_states_chunk(
+                    instance, session, criterion, states_purge_before
+                ):
+                    finished = False
+
+            if not _purge_events_chunk(instance, session, purge_before):
+                finished = False
 
             # If states or events purging isn't processing the purge_before yet,
             # return false, as we are not done yet.
-            if batch_purge_before != purge_before:
+            if not finished:
                 _LOGGER.debug("Purging hasn't fully completed yet")
                 return False
 
@@ -73,6 +65,15 @@ def purge_old_data(instance, purge_days: int, repack: bool) -> bool:
             )
             _LOGGER.debug("Deleted %s recorder_runs", deleted_rows)
 
+            # Only the hourly statistics are kept beyond purge_days
+            deleted_rows = (
+                session.query(StatisticsShortTerm)
+                .filter(StatisticsShortTerm.start < purge_before)
+                .delete(synchronize_session=False)
+            )
+            if deleted_rows:
+                _LOGGER.debug("Deleted %s short term statistics", deleted_rows)
+
         if repack:
             # Execute sqlite or postgresql vacuum command to free up space on disk
             if instance.engine.driver in ("pysqlite", "postgresql"):
@@ -101,3 +102,139 @@ def purge_old_data(instance, purge_days: int, repack: bool) -> bool:
     except SQLAlchemyError as err:
         _LOGGER.warning("Error purging history: %s", err)
     return True
+
+
+def _states_retention(instance, purge_before, now):
+    """Return the states criteria and the time to purge them before.
+
+    Entity rules win over domain rules, which win over purge_days.
+    """
+    keep_days_entities = instance.keep_days_entities
+    keep_days_domains = instance.keep_days_domains
+    not_entity_rule = (
+        States.entity_id.notin_(list(keep_days_entities))
+        if keep_days_entities
+        else true()
+    )
+
+    retention = [
+        (States.entity_id == entity_id, now - timedelta(days=keep_days))
+        for entity_id, keep_days in keep_days_entities.items()
+    ]
+    retention.extend(
+        (
+            and_(States.domain == domain, not_entity_rule),
+            now - timedelta(days=keep_days),
+        )
+        for domain, keep_days in keep_days_domains.items()
+    )
+    not_domain_rule = (
+        States.domain.notin_(list(keep_days_domains)) if keep_days_domains else true()
+    )
+    retention.append((and_(not_domain_rule, not_entity_rule), purge_before))
+    return retention
+
+
+def _purge_states_chunk(instance, session, criterion, purge_before):
+    """Delete a chunk of the states matching criterion older than purge_before.
+
+    The state_changed events of the states are deleted with them.
+    Returns True when no older states are left.
+    """
+    rows = (
+        session.query(States.state_id, States.attributes_id, States.event_id)
+        .filter(criterion)
+        .filter(States.last_updated < purge_before)
+        .limit(MAX_ROWS_TO_PURGE)
+        .all()
+    )
+    if not rows:
+        return True
+
+    state_ids = [state_id for state_id, _, _ in rows]
+    attributes_ids = {attributes_id for _, attributes_id, _ in rows if attributes_id}
+    event_ids = [event_id for _, _, event_id in rows if event_id]
+
+    deleted_rows = (
+        session.query(States)
+        .filter(States.state_id.in_(state_ids))
+        .delete(synchronize_session=False)
+    )
+    _LOGGER.debug("Deleted %s states", deleted_rows)
+
+    if event_ids:
+        session.query(Events).filter(Events.event_id.in_(event_ids)).delete(
+            synchronize_session=False
+        )
+
+    unused_attributes_ids = _purge_unused_shared_rows(
+        session, attributes_ids, States.attributes_id, StateAttributes
+    )
+    if unused_attributes_ids:
+        instance.evict_purged_state_attributes(unused_attributes_ids)
+
+    return len(rows) < MAX_ROWS_TO_PURGE
+
+
+def _purge_events_chunk(instance, session, purge_before):
+    """Delete a chunk of the events older than purge_before.
+
+    Events of states that are kept longer by a retention rule are kept.
+    Returns True when no older events are left.
+    """
+    rows = (
+        session.query(Events.event_id, Events.data_id)
+        .filter(Events.time_fired < purge_before)
+        .filter(~exists().where(States.event_id == Events.event_id))
+        .limit(MAX_ROWS_TO_PURGE)
+        .all()
+    )
+    if not rows:
+        return True
+
+    event_ids = [event_id for event_id, _ in rows]
+    data_ids = {data_id for _, data_id in rows if data_id}
+
+    deleted_rows = (
+        session.query(Events)
+        .filter(Events.event_id.in_(event_ids))
+        .delete(synchronize_session=False)
+    )
+    _LOGGER.debug("Deleted %s events", deleted_rows)
+
+    unused_data_ids = _purge_unused_shared_rows(
+        session, data_ids, Events.data_id, EventData
+    )
+    if unused_data_ids:
+        instance.evict_purged_event_data(unused_data_ids)
+
+    return len(rows) < MAX_ROWS_TO_PURGE
+
+
+def _purge_unused_shared_rows(session, ids, referencing_column, model):
+    """Delete the shared rows with ids that are no longer referenced.
+
+    Returns the set of deleted ids.
+    """
+    model_id_column = getattr(model, referencing_column.key)
+    ids = list(ids)
+    unused_ids = set()
+    for idx in range(0, len(ids), MAX_ROWS_TO_PURGE):
+        chunk = ids[idx : idx + MAX_ROWS_TO_PURGE]
+        used_ids = {
+            used_id
+            for (used_id,) in session.query(distinct(referencing_column)).filter(
+                referencing_column.in_(chunk)
+            )
+        }
+        unused_chunk = set(chunk) - used_ids
+        if not unused_chunk:
+            continue
+        deleted_rows = (
+            session.query(model)
+            .filter(model_id_column.in_(unused_chunk))
+            .delete(synchronize_session=False)
+        )
+        _LOGGER.debug("Deleted %s %s", deleted_rows, model.__tablename__)
+        unused_ids |= unused_chunk
+    return unused_ids
@@ -0,0 +1,141 @@
+"""Typed reads of the recorded states for the integrations.
+
+The functions read from the read connections of the recorder, run them in
+the read executor with async_add_read_job or use their async variants.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from homeassistant.core import HomeAssistant, State
+import homeassistant.util.dt as dt_util
+
+from .models import States
+from .util import async_add_read_job, execute, session_scope
+
+
+def get_last_states(
+    hass: HomeAssistant,
+    entity_id: str,
+    number_of_states: int,
+    start_time: Optional[datetime] = None,
+) -> List[State]:
+    """Return the last number_of_states of entity_id, oldest first.
+
+    With start_time only the states recorded since then are returned.
+    """
+    with session_scope(hass=hass, read_only=True) as session:
+        query = session.query(States).filter(States.entity_id == entity_id.lower())
+        if start_time is not None:
+            query = query.filter(States.last_updated_ts >= start_time.timestamp())
+        query = query.order_by(States.last_updated_ts.desc()).limit(number_of_states)
+        states = execute(query, to_native=True, validate_entity_ids=False)
+
+    states.reverse()
+    return states
+
+
+def get_numeric_states(
+    hass: HomeAssistant,
+    entity_id: str,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    number_of_states: Optional[int] = None,
+) -> List[Tuple[datetime, float]]:
+    """Return the time and value of the numeric states of entity_id, oldest first.
+
+    Only the states recorded during start_time - end_time are returned,
+    the last number_of_states of them if given. Numbers do not need the
+    whole state to be loaded and parsed.
+    """
+    with session_scope(hass=hass, read_only=True) as session:
+        query = session.query(States.last_updated_ts, States.numeric_state).filter(
+            (States.entity_id == entity_id.lower()) & States.numeric_state.isnot(None)
+        )
+        if start_time is not None:
+            query = query.filter(States.last_updated_ts >= start_time.timestamp())
+        if end_time is not None:
+            query = query.filter(States.last_updated_ts < end_time.timestamp())
+        query = query.order_by(States.last_updated_ts.desc())
+        if number_of_states is not None:
+            query = query.limit(number_of_states)
+        rows = execute(query)
+
+    return [
+        (dt_util.utc_from_timestamp(last_updated_ts), numeric_state)
+        for last_updated_ts, numeric_state in reversed(rows)
+    ]
+
+
+def get_numeric_aggregates(
+    hass: HomeAssistant,
+    entity_id: str,
+    start_time: datetime,
+    end_time: Optional[datetime] = None,
+) -> Optional[Dict[str, float]]:
+    """Return the min, max, mean and count of the numeric states of entity_id.
+
+    The aggregates are computed by the database over the states recorded
+    during start_time - end_time, None is returned if there are none.
+    """
+    with session_scope(hass=hass, read_only=True) as session:
+        query = session.query(
+            func.min(States.numeric_state),
+            func.max(States.numeric_state),
+            func.avg(States.numeric_state),
+            func.count(States.numeric_state),
+        ).filter(
+            (States.entity_id == entity_id.lower())
+            & (States.last_updated_ts >= start_time.timestamp())
+        )
+        if end_time is not None:
+            query = query.filter(States.last_updated_ts < end_time.timestamp())
+        minimum, maximum, mean, count = execute(query)[0]
+
+    if not count:
+        return None
+    return {"min": minimum, "max": maximum, "mean": mean, "count": count}
+
+
+async def async_get_last_states(
+    hass: HomeAssistant,
+    entity_id: str,
+    number_of_states: int,
+    start_time: Optional[datetime] = None,
+) -> List[State]:
+    """Return the last number_of_states of entity_id, see get_last_states."""
+    return await async_add_read_job(
+        hass, get_last_states, hass, entity_id, number_of_states, start_time
+    )
+
+
+async def async_get_numeric_states(
+    hass: HomeAssistant,
+    entity_id: str,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    number_of_states: Optional[int] = None,
+) -> List[Tuple[datetime, float]]:
+    """Return the numeric states of entity_id, see get_numeric_states."""
+    return await async_add_read_job(
+        hass,
+        get_numeric_states,
+        hass,
+        entity_id,
+        start_time,
+        end_time,
+        number_of_states,
+    )
+
+
+async def async_get_numeric_aggregates(
+    hass: HomeAssistant,
+    entity_id: str,
+    start_time: datetime,
+    end_time: Optional[datetime] = None,
+) -> Optional[Dict[str, float]]:
+    """Return the aggregates of entity_id, see get_numeric_aggregates."""
+    return await async_add_read_job(
+        hass, get_numeric_aggregates, hass, entity_id, start_time, end_time
+    )
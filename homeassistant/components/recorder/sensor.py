@@ -0,0 +1,69 @@
+"""Sensor reporting how far behind the recorder is."""
+from datetime import timedelta
+
+import voluptuous as vol
+
+from homeassistant.components.sensor import PLATFORM_SCHEMA
+from homeassistant.const import CONF_NAME
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.entity import Entity
+
+from .const import DATA_INSTANCE
+
+DEFAULT_NAME = "Recorder backlog"
+
+ICON = "mdi:database"
+
+SCAN_INTERVAL = timedelta(seconds=10)
+
+UNIT_EVENTS = "events"
+
+PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
+    {vol.Optional(CONF_NAME, default=DEFAULT_NAME): cv.string}
+)
+
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    """Set up the recorder backlog sensor."""
+    async_add_entities(
+        [RecorderBacklogSensor(hass.data[DATA_INSTANCE], config[CONF_NAME])], True
+    )
+
+
+class RecorderBacklogSensor(Entity):
+    """Representation of the recorder backlog."""
+
+    def __init__(self, instance, name):
+        """Initialize the sensor."""
+        self._instance = instance
+        self._name = name
+        self._info = {}
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return self._name
+
+    @property
+    def icon(self):
+        """Return the icon to use in the frontend."""
+        return ICON
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit the value is expressed in."""
+        return UNIT_EVENTS
+
+    @property
+    def state(self):
+        """Return the number of events waiting to be recorded."""
+        return self._info.get("backlog")
+
+    @property
+    def device_state_attributes(self):
+        """Return the other backlog metrics."""
+        return {key: value for key, value in self._info.items() if key != "backlog"}
+
+    def update(self):
+        """Read the current metrics from the recorder."""
+        self._info = self._instance.backlog_info()
@@ -0,0 +1,306 @@
+"""Long-term statistics compiled from the recorded states."""
+from datetime import timedelta
+import logging
+
+from sqlalchemy import func
+
+from homeassistant.const import ATTR_DEVICE_CLASS, ATTR_UNIT_OF_MEASUREMENT
+from homeassistant.helpers.json import json_loads
+import homeassistant.util.dt as dt_util
+
+from .models import (
+    StateAttributes,
+    States,
+    Statistics,
+    StatisticsShortTerm,
+    process_timestamp,
+)
+from .util import session_scope
+
+_LOGGER = logging.getLogger(__name__)
+
+SHORT_TERM_PERIOD = timedelta(minutes=5)
+HOURLY_PERIOD = timedelta(hours=1)
+
+PERIOD_5MINUTE = "5minute"
+PERIOD_HOUR = "hour"
+PERIODS = {PERIOD_5MINUTE: StatisticsShortTerm, PERIOD_HOUR: Statistics}
+
+# Only entities of these domains have a meaningful numeric state
+STATISTICS_DOMAINS = ["sensor"]
+
+ATTR_STATE_CLASS = "state_class"
+# The state is a measurement at the time it was taken, e.g. a temperature
+STATE_CLASS_MEASUREMENT = "measurement"
+# The state is a meter reading that only grows until it is reset
+STATE_CLASS_TOTAL = "total"
+
+METER_DEVICE_CLASSES = ["energy"]
+
+
+def get_start_time():
+    """Return the start of the last completed five minute period."""
+    now = dt_util.utcnow()
+    current_period = now.replace(
+        minute=now.minute - now.minute % 5, second=0, microsecond=0
+    )
+    return current_period - SHORT_TERM_PERIOD
+
+
+def compile_statistics(instance, start):
+    """Compile the five minute statistics of the period starting at start.
+
+    The hourly statistics are compiled as well once start is the last
+    five minute period of an hour. The states at the end of the period are
+    kept on the instance, so the next period starts from them instead of
+    looking them up in the database.
+    """
+    end = start + SHORT_TERM_PERIOD
+    initial_states = None
+    if instance.statistics_end == start:
+        initial_states = instance.statistics_states
+    with session_scope(session=instance.get_session()) as session:
+        if (
+            session.query(StatisticsShortTerm.id)
+            .filter(StatisticsShortTerm.start == start)
+            .first()
+        ):
+            _LOGGER.debug("Statistics already compiled for %s-%s", start, end)
+            return
+
+        _LOGGER.debug("Compiling statistics for %s-%s", start, end)
+        result, end_states = _compile_short_term(
+            session, start, end, initial_states, _purge_horizon(instance, start)
+        )
+        for statistic_id, stats in result.items():
+            session.add(StatisticsShortTerm.from_stats(statistic_id, start, stats))
+
+        if end.minute == 0:
+            # Make the five minute rows of this hour visible to the query
+            session.flush()
+            hour_start = end - HOURLY_PERIOD
+            for statistic_id, stats in _compile_hourly(
+                session, hour_start, end
+            ).items():
+                session.add(Statistics.from_stats(statistic_id, hour_start, stats))
+
+    instance.statistics_end = end
+    instance.statistics_states = end_states
+
+
+def _purge_horizon(instance, start):
+    """Return the time before which the purge may have removed the states."""
+    longest_keep_days = max(
+        [
+            instance.keep_days,
+            *instance.keep_days_domains.values(),
+            *instance.keep_days_entities.values(),
+        ]
+    )
+    return start - timedelta(days=longest_keep_days)
+
+
+def statistics_during_period(
+    hass, start_time, end_time=None, statistic_ids=None, period=PERIOD_HOUR
+):
+    """Return statistics during UTC period start_time - end_time.
+
+    The result is a dict of statistic_id to a list of statistics ordered
+    by their start.
+    """
+    table = PERIODS[period]
+    with session_scope(hass=hass, read_only=True) as session:
+        query = session.query(table).filter(table.start >= start_time)
+        if end_time is not None:
+            query = query.filter(table.start < end_time)
+        if statistic_ids is not None:
+            query = query.filter(table.statistic_id.in_(statistic_ids))
+        query = query.order_by(table.statistic_id, table.start)
+
+        result = {}
+        for row in query:
+            result.setdefault(row.statistic_id, []).append(row.to_native())
+        return result
+
+
+def _state_class(attributes):
+    """Return the state class of a state with these attributes or None."""
+    state_class = attributes.get(ATTR_STATE_CLASS)
+    if state_class in (STATE_CLASS_MEASUREMENT, STATE_CLASS_TOTAL):
+        return state_class
+    if ATTR_UNIT_OF_MEASUREMENT not in attributes:
+        return None
+    if attributes.get(ATTR_DEVICE_CLASS) in METER_DEVICE_CLASSES:
+        return STATE_CLASS_TOTAL
+    return STATE_CLASS_MEASUREMENT
+
+
+def _compile_short_term(session, start, end, initial_states, oldest):
+    """Compile the statistics of each entity between start and end.
+
+    initial_states maps the entity_ids to their numeric state and shared
+    attributes when the period started, if they are not known they are
+    looked up among the states recorded since oldest. Returns the
+    statistics and the states when the period ended.
+    """
+    columns = (
+        States.entity_id,
+        States.numeric_state,
+        States.last_updated,
+        StateAttributes.shared_attrs,
+    )
+
+    if initial_states is None:
+        initial_states = _get_initial_states(session, columns, start, oldest)
+    period_states = (
+        session.query(*columns)
+        .outerjoin(
+            StateAttributes, States.attributes_id == StateAttributes.attributes_id
+        )
+        .filter(States.domain.in_(STATISTICS_DOMAINS))
+        .filter(States.last_updated >= start)
+        .filter(States.last_updated < end)
+        .order_by(States.entity_id, States.last_updated)
+    )
+
+    entity_states = {}
+    for entity_id, (numeric_state, shared_attrs) in initial_states.items():
+        entity_states[entity_id] = [(numeric_state, start, shared_attrs)]
+    for entity_id, numeric_state, last_updated, shared_attrs in period_states:
+        entity_states.setdefault(entity_id, []).append(
+            (numeric_state, process_timestamp(last_updated), shared_attrs)
+        )
+
+    end_states = {}
+    result = {}
+    for entity_id, states in entity_states.items():
+        end_states[entity_id] = (states[-1][0], states[-1][2])
+        try:
+            attributes = json_loads(states[-1][2] or "{}")
+        except ValueError:
+            _LOGGER.exception("Error parsing the attributes of %s", entity_id)
+            continue
+        state_class = _state_class(attributes)
+        if state_class is None:
+            continue
+
+        values = [(numeric_state, when) for numeric_state, when, _ in states]
+        if state_class == STATE_CLASS_TOTAL:
+            stats = _compile_total(session, entity_id, start, values)
+        else:
+            stats = _compile_measurement(values, end)
+        if stats is not None:
+            result[entity_id] = stats
+
+    return result, end_states
+
+
+def _get_initial_states(session, columns, start, oldest):
+    """Return the numeric state and shared attributes of each entity at start.
+
+    Only the states recorded since oldest are considered, so the lookup
+    does not scan the whole states table.
+    """
+    most_recent_state_ids = (
+        session.query(func.max(States.state_id).label("max_state_id"))
+        .filter(States.domain.in_(STATISTICS_DOMAINS))
+        .filter(States.last_updated >= oldest)
+        .filter(States.last_updated < start)
+        .group_by(States.entity_id)
+        .subquery()
+    )
+    query = (
+        session.query(*columns)
+        .outerjoin(
+            StateAttributes, States.attributes_id == StateAttributes.attributes_id
+        )
+        .join(
+            most_recent_state_ids,
+            States.state_id == most_recent_state_ids.c.max_state_id,
+        )
+    )
+    return {
+        entity_id: (numeric_state, shared_attrs)
+        for entity_id, numeric_state, _, shared_attrs in query
+    }
+
+
+def _compile_measurement(values, end):
+    """Compile the time weighted mean, min and max of the numeric values."""
+    weighted_sum = 0.0
+    duration = 0.0
+    numeric_values = []
+    for idx, (value, when) in enumerate(values):
+        if value is None:
+            continue
+        until = values[idx + 1][1] if idx + 1 < len(values) else end
+        seconds = (until - when).total_seconds()
+        weighted_sum += value * seconds
+        duration += seconds
+        numeric_values.append(value)
+
+    if not numeric_values:
+        return None
+
+    return {
+        "mean": weighted_sum / duration if duration else numeric_values[-1],
+        "min": min(numeric_values),
+        "max": max(numeric_values),
+    }
+
+
+def _compile_total(session, statistic_id, start, values):
+    """Compile the last reading and the growing sum of a meter.
+
+    A reading lower than the previous one means the meter was reset,
+    the sum then grows by the new reading.
+    """
+    numeric_values = [value for value, _ in values if value is not None]
+    if not numeric_values:
+        return None
+
+    previous = (
+        session.query(StatisticsShortTerm.state, StatisticsShortTerm.sum)
+        .filter(StatisticsShortTerm.statistic_id == statistic_id)
+        .filter(StatisticsShortTerm.start < start)
+        .order_by(StatisticsShortTerm.start.desc())
+        .first()
+    )
+    if previous is None or previous.state is None:
+        last, total = numeric_values[0], 0.0
+    else:
+        last, total = previous.state, previous.sum or 0.0
+
+    for value in numeric_values:
+        total += value - last if value >= last else value
+        last = value
+
+    return {"state": last, "sum": total}
+
+
+def _compile_hourly(session, start, end):
+    """Compile the hourly statistics from the five minute statistics."""
+    short_term = (
+        session.query(StatisticsShortTerm)
+        .filter(StatisticsShortTerm.start >= start)
+        .filter(StatisticsShortTerm.start < end)
+        .order_by(StatisticsShortTerm.statistic_id, StatisticsShortTerm.start)
+    )
+
+    rows_by_statistic_id = {}
+    for row in short_term:
+        rows_by_statistic_id.setdefault(row.statistic_id, []).append(row)
+
+    result = {}
+    for statistic_id, rows in rows_by_statistic_id.items():
+        means = [row.mean for row in rows if row.mean is not None]
+        if means:
+            result[statistic_id] = {
+                "mean": sum(means) / len(means),
+                "min": min(row.min for row in rows if row.min is not None),
+                "max": max(row.max for row in rows if row.max is not None),
+            }
+        else:
+            result[statistic_id] = {"state": rows[-1].state, "sum": rows[-1].sum}
+
+    return result
@@ -0,0 +1,174 @@
+"""Drop the insignificant state changes of noisy entities before recording."""
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+import voluptuous as vol
+
+from homeassistant.const import (
+    CONF_DOMAINS,
+    CONF_ENTITIES,
+    EVENT_HOMEASSISTANT_STOP,
+    EVENT_STATE_CHANGED,
+)
+from homeassistant.core import Event, HomeAssistant, State, callback
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.entityfilter import CONF_ENTITY_GLOBS, generate_filter
+from homeassistant.helpers.significant_change import (
+    SignificantlyChangedChecker,
+    create_checker,
+)
+
+from .const import DOMAIN
+
+CONF_MIN_INTERVAL = "min_interval"
+CONF_DEADBAND = "deadband"
+CONF_SIGNIFICANT_CHANGE = "significant_change"
+
+THROTTLE_SCHEMA = vol.All(
+    {
+        vol.Optional(CONF_DOMAINS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(CONF_ENTITIES): cv.entity_ids,
+        vol.Optional(CONF_ENTITY_GLOBS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(CONF_MIN_INTERVAL): cv.time_period,
+        vol.Optional(CONF_DEADBAND): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_SIGNIFICANT_CHANGE): cv.boolean,
+    },
+    cv.has_at_least_one_key(CONF_DOMAINS, CONF_ENTITIES, CONF_ENTITY_GLOBS),
+    cv.has_at_least_one_key(CONF_MIN_INTERVAL, CONF_DEADBAND, CONF_SIGNIFICANT_CHANGE),
+)
+
+
+class ThrottleRule:
+    """The conditions a state change of matching entities must pass."""
+
+    def __init__(
+        self,
+        matches: Callable[[str], bool],
+        min_interval: Optional[timedelta],
+        deadband: Optional[float],
+        significant_change: bool,
+    ) -> None:
+        """Initialize the rule."""
+        self.matches = matches
+        self.min_interval = min_interval
+        self.deadband = deadband
+        self.significant_change = significant_change
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ThrottleRule":
+        """Create a rule from its configuration."""
+        return cls(
+            generate_filter(
+                config.get(CONF_DOMAINS, []),
+                config.get(CONF_ENTITIES, []),
+                [],
+                [],
+                config.get(CONF_ENTITY_GLOBS, []),
+            ),
+            config.get(CONF_MIN_INTERVAL),
+            config.get(CONF_DEADBAND),
+            config.get(CONF_SIGNIFICANT_CHANGE, False),
+        )
+
+
+class RecorderThrottle:
+    """Decide which state changes of throttled entities are recorded.
+
+    A dropped state change is held back instead of being forgotten. It is
+    recorded right before the next recorded change of the entity, so the
+    last value before each gap is kept.
+    """
+
+    def __init__(self, hass: HomeAssistant, rules: List[ThrottleRule]) -> None:
+        """Initialize the throttle."""
+        self.hass = hass
+        self.rules = rules
+        self.dropped_events = 0
+        self._entity_rules: Dict[str, Optional[ThrottleRule]] = {}
+        self._last_recorded: Dict[str, State] = {}
+        self._held: Dict[str, Event] = {}
+        self._checker: Optional[SignificantlyChangedChecker] = None
+
+    async def async_setup(self) -> None:
+        """Set up the significant change checker if a rule uses it."""
+        if any(rule.significant_change for rule in self.rules):
+            self._checker = await create_checker(self.hass, DOMAIN)
+
+    @callback
+    def async_filter(self, event: Event) -> List[Event]:
+        """Return the events to record in place of event."""
+        if event.event_type == EVENT_HOMEASSISTANT_STOP:
+            # Record the held back changes before shutting down
+            held = list(self._held.values())
+            self._held.clear()
+            return [*held, event]
+
+        if event.event_type != EVENT_STATE_CHANGED:
+            return [event]
+
+        entity_id = event.data["entity_id"]
+        rule = self._rule(entity_id)
+        if rule is None:
+            return [event]
+
+        new_state = event.data.get("new_state")
+        if new_state is None:
+            # Removed entities start over when they come back
+            self._last_recorded.pop(entity_id, None)
+            return self._release(entity_id, event)
+
+        last_state = self._last_recorded.get(entity_id)
+        if last_state is not None and not self._is_significant(
+            rule, last_state, new_state
+        ):
+            self.dropped_events += 1
+            self._held[entity_id] = event
+            return []
+
+        self._last_recorded[entity_id] = new_state
+        if self._checker is not None:
+            # Compare the next change to the recorded state
+            self._checker.last_approved_entities[entity_id] = new_state
+        return self._release(entity_id, event)
+
+    def _release(self, entity_id: str, event: Event) -> List[Event]:
+        """Return the held back event of entity_id followed by event."""
+        held = self._held.pop(entity_id, None)
+        if held is None:
+            return [event]
+        return [held, event]
+
+    def _rule(self, entity_id: str) -> Optional[ThrottleRule]:
+        """Return the first rule matching entity_id."""
+        if entity_id not in self._entity_rules:
+            self._entity_rules[entity_id] = next(
+                (rule for rule in self.rules if rule.matches(entity_id)), None
+            )
+        return self._entity_rules[entity_id]
+
+    def _is_significant(
+        self, rule: ThrottleRule, last_state: State, new_state: State
+    ) -> bool:
+        """Return if new_state differs enough from the last recorded state."""
+        if (
+            rule.min_interval is not None
+            and new_state.last_updated - last_state.last_updated < rule.min_interval
+        ):
+            return False
+
+        if rule.deadband is not None and last_state.attributes == new_state.attributes:
+            if last_state.state == new_state.state:
+                return False
+            try:
+                if (
+                    abs(float(new_state.state) - float(last_state.state))
+                    < rule.deadband
+                ):
+                    return False
+            except ValueError:
+                pass
+
+        if rule.significant_change and self._checker is not None:
+            return self._checker.async_is_significant_change(new_state)
+
+        return True
@@ -1,12 +1,18 @@
 """SQLAlchemy util functions."""
+from collections import OrderedDict, deque
 from contextlib import contextmanager
 from datetime import timedelta
 import logging
 import os
+import queue
+import threading
 import time
+from typing import Any, Awaitable, Callable, TypeVar
 
 from sqlalchemy.exc import OperationalError, SQLAlchemyError
 
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
 import homeassistant.util.dt as dt_util
 
 from .const import CONF_DB_INTEGRITY_CHECK, DATA_INSTANCE, SQLITE_URL_PREFIX
@@ -14,6 +20,8 @@ from .models import ALL_TABLES, process_timestamp
 
 _LOGGER = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 RETRIES = 3
 QUERY_RETRY_WAIT = 0.1
 SQLITE3_POSTFIXES = ["", "-wal", "-shm"]
@@ -25,10 +33,15 @@ MAX_RESTART_TIME = timedelta(minutes=10)
 
 
 @contextmanager
-def session_scope(*, hass=None, session=None):
-    """Provide a transactional scope around a series of operations."""
+def session_scope(*, hass=None, session=None, read_only=False):
+    """Provide a transactional scope around a series of operations.
+
+    With read_only the session of hass reads from the read connections of
+    the recorder, run it with async_add_read_job.
+    """
     if session is None and hass is not None:
-        session = hass.data[DATA_INSTANCE].get_session()
+        instance = hass.data[DATA_INSTANCE]
+        session = instance.get_read_session() if read_only else instance.get_session()
 
     if session is None:
         raise RuntimeError("Session required")
@@ -48,6 +61,28 @@ def session_scope(*, hass=None, session=None):
         session.close()
 
 
+@callback
+def async_add_read_job(
+    hass: HomeAssistant, target: Callable[..., T], *args: Any
+) -> Awaitable[T]:
+    """Run a database read in the read executor of the recorder.
+
+    The read executor limits how many reads run at once so they neither
+    stall the event loop nor compete with the recorder for the database.
+    Raises HomeAssistantError once the recorder has shut down.
+    """
+    instance = hass.data.get(DATA_INSTANCE)
+    if instance is None:
+        return hass.async_add_executor_job(target, *args)
+    if not instance.read_executor_closed:
+        try:
+            return hass.loop.run_in_executor(instance.read_executor, target, *args)
+        except RuntimeError:
+            # The recorder thread shut the executor down in the meantime
+            pass
+    raise HomeAssistantError("The recorder is not running")
+
+
 def commit(session, work):
     """Commit & retry work: Either a model or in a function."""
     for _ in range(0, RETRIES):
@@ -110,6 +145,102 @@ def execute(qry, to_native=False, validate_entity_ids=True):
             time.sleep(QUERY_RETRY_WAIT)
 
 
+class RecorderQueue:
+    """The events and tasks waiting for the recorder thread.
+
+    Works like queue.SimpleQueue, but the oldest queued event can be
+    dropped without moving the tasks queued around it.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the queue."""
+        self._items: deque = deque()
+        self._not_empty = threading.Condition()
+
+    def put(self, item: Any) -> None:
+        """Put an item at the end of the queue."""
+        with self._not_empty:
+            self._items.append(item)
+            self._not_empty.notify()
+
+    def get(self) -> Any:
+        """Remove and return the first item, waiting until there is one."""
+        with self._not_empty:
+            while not self._items:
+                self._not_empty.wait()
+            return self._items.popleft()
+
+    def get_nowait(self) -> Any:
+        """Remove and return the first item or raise queue.Empty."""
+        with self._not_empty:
+            if not self._items:
+                raise queue.Empty
+            return self._items.popleft()
+
+    def drop_oldest_event(self) -> bool:
+        """Remove the oldest queued event, return False if there is none."""
+        with self._not_empty:
+            for index, item in enumerate(self._items):
+                if isinstance(item, Event):
+                    del self._items[index]
+                    return True
+        return False
+
+    def qsize(self) -> int:
+        """Return the number of items in the queue."""
+        return len(self._items)
+
+    def empty(self) -> bool:
+        """Return True if the queue is empty."""
+        return not self._items
+
+
+class LRUCache:
+    """A minimal mapping that evicts the least recently used keys.
+
+    Only used from the recorder thread so no locking is done.
+    """
+
+    def __init__(self, size: int) -> None:
+        """Initialize the cache."""
+        self._size = size
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        """Return the value for key and mark it as recently used."""
+        if key not in self._data:
+            return default
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def __setitem__(self, key, value) -> None:
+        """Set the value for key and evict the oldest key if full."""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self._size:
+            self._data.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        """Return if key is in the cache without marking it as used."""
+        return key in self._data
+
+    def __len__(self) -> int:
+        """Return the number of keys in the cache."""
+        return len(self._data)
+
+    def items(self):
+        """Return a view of the cached items."""
+        return self._data.items()
+
+    def pop(self, key, default=None):
+        """Remove key and return its value."""
+        return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        """Remove all keys."""
+        self._data.clear()
+
+
 def validate_or_move_away_sqlite_database(dburl: str, db_integrity_check: bool) -> bool:
     """Ensure that the database is valid or move it away."""
     dbpath = dburl[len(SQLITE_URL_PREFIX) :]
@@ -5,8 +5,10 @@ import statistics
 
 import voluptuous as vol
 
-from homeassistant.components.recorder.models import States
-from homeassistant.components.recorder.util import execute, session_scope
+from homeassistant.components.recorder.queries import (
+    async_get_last_states,
+    async_get_numeric_states,
+)
 from homeassistant.components.sensor import PLATFORM_SCHEMA
 from homeassistant.const import (
     ATTR_UNIT_OF_MEASUREMENT,
@@ -315,9 +317,8 @@ class StatisticsSensor(Entity):
     async def _async_initialize_from_database(self):
         """Initialize the list of states from the database.
 
-        The query will get the list of states in DESCENDING order so that we
-        can limit the result to self._sample_size. Afterwards reverse the
-        list so that we get it in the right order again.
+        The last self._sampling_size states are read in the read executor of
+        the recorder.
 
         If MaxAge is provided then query will restrict to entries younger then
         current datetime - MaxAge.
@@ -325,29 +326,31 @@ class StatisticsSensor(Entity):
 
         _LOGGER.debug("%s: initializing values from the database", self.entity_id)
 
-        with session_scope(hass=self.hass) as session:
-            query = session.query(States).filter(
-                States.entity_id == self._entity_id.lower()
-            )
-
-            if self._max_age is not None:
-                records_older_then = dt_util.utcnow() - self._max_age
-                _LOGGER.debug(
-                    "%s: retrieve records not older then %s",
-                    self.entity_id,
-                    records_older_then,
-                )
-                query = query.filter(States.last_updated >= records_older_then)
-            else:
-                _LOGGER.debug("%s: retrieving all records", self.entity_id)
-
-            query = query.order_by(States.last_updated.desc()).limit(
-                self._sampling_size
+        records_older_then = None
+        if self._max_age is not None:
+            records_older_then = dt_util.utcnow() - self._max_age
+            _LOGGER.debug(
+                "%s: retrieve records not older then %s",
+                self.entity_id,
+                records_older_then,
             )
-            states = execute(query, to_native=True, validate_entity_ids=False)
-
-        for state in reversed(states):
-            self._add_state_to_queue(state)
+        else:
+            _LOGGER.debug("%s: retrieving all records", self.entity_id)
+
+        if self.is_binary:
+            for state in await async_get_last_states(
+                self.hass, self._entity_id, self._sampling_size, records_older_then
+            ):
+                self._add_state_to_queue(state)
+        else:
+            for last_updated, numeric_state in await async_get_numeric_states(
+                self.hass,
+                self._entity_id,
+                records_older_then,
+                number_of_states=self._sampling_size,
+            ):
+                self.states.append(numeric_state)
+                self.ages.append(last_updated)
 
         self.async_schedule_update_ha_state(True)
 
@@ -23,7 +23,7 @@ import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entity import async_generate_entity_id
 from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.reload import async_setup_reload_service
-from homeassistant.helpers.template import result_as_boolean
+from homeassistant.helpers.template import async_precompile, result_as_boolean
 
 from .const import CONF_AVAILABILITY_TEMPLATE, DOMAIN, PLATFORMS
 from .template_entity import TemplateEntity
@@ -99,6 +99,7 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
     """Set up the template binary sensors."""
 
     await async_setup_reload_service(hass, DOMAIN, PLATFORMS)
+    await async_precompile(hass, config[CONF_SENSORS])
     async_add_entities(await _async_create_entities(hass, config))
 
 
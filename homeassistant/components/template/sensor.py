@@ -25,6 +25,7 @@ from homeassistant.exceptions import TemplateError
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entity import Entity, async_generate_entity_id
 from homeassistant.helpers.reload import async_setup_reload_service
+from homeassistant.helpers.template import async_precompile
 
 from .const import CONF_AVAILABILITY_TEMPLATE, DOMAIN, PLATFORMS
 from .template_entity import TemplateEntity
@@ -98,6 +99,7 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
     """Set up the template sensors."""
 
     await async_setup_reload_service(hass, DOMAIN, PLATFORMS)
+    await async_precompile(hass, config[CONF_SENSORS])
     async_add_entities(await _async_create_entities(hass, config))
 
 
@@ -14,7 +14,11 @@ from homeassistant.exceptions import (
     Unauthorized,
 )
 from homeassistant.helpers import config_validation as cv, entity
-from homeassistant.helpers.event import TrackTemplate, async_track_template_result
+from homeassistant.helpers.event import (
+    TrackTemplate,
+    async_track_state_change_event,
+    async_track_template_result,
+)
 from homeassistant.helpers.service import async_get_all_descriptions
 from homeassistant.helpers.template import Template
 from homeassistant.loader import IntegrationNotFound, async_get_integration
@@ -28,12 +32,14 @@ from . import const, decorators, messages
 def async_register_commands(hass, async_reg):
     """Register commands."""
     async_reg(hass, handle_subscribe_events)
+    async_reg(hass, handle_subscribe_entities)
     async_reg(hass, handle_unsubscribe_events)
     async_reg(hass, handle_call_service)
     async_reg(hass, handle_get_states)
     async_reg(hass, handle_get_services)
     async_reg(hass, handle_get_config)
     async_reg(hass, handle_ping)
+    async_reg(hass, handle_supported_features)
     async_reg(hass, handle_render_template)
     async_reg(hass, handle_manifest_list)
     async_reg(hass, handle_manifest_get)
@@ -75,7 +81,12 @@ def handle_subscribe_events(hass, connection, msg):
             ):
                 return
 
-            connection.send_message(messages.cached_event_message(msg["id"], event))
+            # A newer state of the entity supersedes this one if the client
+            # is behind
+            connection.send_message(
+                messages.cached_event_message(msg["id"], event),
+                collapse_key=(msg["id"], event.data["entity_id"]),
+            )
 
     else:
 
@@ -94,6 +105,73 @@ def handle_subscribe_events(hass, connection, msg):
     connection.send_message(messages.result_message(msg["id"]))
 
 
+@callback
+@decorators.websocket_command(
+    {
+        vol.Required("type"): "subscribe_entities",
+        vol.Optional("entity_ids"): cv.entity_ids,
+    }
+)
+def handle_subscribe_entities(hass, connection, msg):
+    """Handle subscribe entities command.
+
+    Sends the compressed states of the entities once, followed by only
+    what changed for each state change.
+    """
+    entity_ids = msg.get("entity_ids")
+    entity_perm = connection.user.permissions.check_entity
+
+    @callback
+    def forward_entity_changes(event):
+        """Forward the state changes of entities to websocket."""
+        if not entity_perm(event.data["entity_id"], POLICY_READ):
+            return
+
+        connection.send_message(messages.cached_state_diff_message(msg["id"], event))
+
+    if entity_ids is None:
+        connection.subscriptions[msg["id"]] = hass.bus.async_listen(
+            EVENT_STATE_CHANGED, forward_entity_changes
+        )
+        states = hass.states.async_all()
+    else:
+        connection.subscriptions[msg["id"]] = async_track_state_change_event(
+            hass, entity_ids, forward_entity_changes
+        )
+        states = [
+            state
+            for state in (hass.states.get(entity_id) for entity_id in entity_ids)
+            if state is not None
+        ]
+
+    connection.send_message(messages.result_message(msg["id"]))
+    connection.send_message(
+        messages.event_message(
+            msg["id"],
+            {
+                messages.ENTITY_EVENT_ADD: {
+                    state.entity_id: messages.compressed_state_dict_add(state)
+                    for state in states
+                    if entity_perm(state.entity_id, POLICY_READ)
+                }
+            },
+        )
+    )
+
+
+@callback
+@decorators.websocket_command(
+    {
+        vol.Required("type"): "supported_features",
+        vol.Required("features"): {str: int},
+    }
+)
+def handle_supported_features(hass, connection, msg):
+    """Handle setting the protocol features the client supports."""
+    connection.supported_features = msg["features"]
+    connection.send_result(msg["id"])
+
+
 @callback
 @decorators.websocket_command(
     {
@@ -186,7 +264,17 @@ def handle_get_states(hass, connection, msg):
             if entity_perm(state.entity_id, "read")
         ]
 
-    connection.send_message(messages.result_message(msg["id"], states))
+    try:
+        states_json = "[" + ",".join(state.as_json() for state in states) + "]"
+    except (ValueError, TypeError):
+        connection.send_message(
+            messages.invalid_json_message(
+                msg["id"], messages.result_message(msg["id"], states)
+            )
+        )
+        return
+
+    connection.send_message(messages.result_message_json(msg["id"], states_json))
 
 
 @decorators.websocket_command({vol.Required("type"): "get_services"})
@@ -28,6 +28,8 @@ class ActiveConnection:
 
         self.subscriptions: Dict[Hashable, Callable[[], Any]] = {}
         self.last_id = 0
+        # Optional protocol features the client announced it supports
+        self.supported_features: Dict[str, Any] = {}
 
     def context(self, msg):
         """Return a context."""
@@ -2,7 +2,7 @@
 import asyncio
 from contextlib import suppress
 import logging
-from typing import Optional
+from typing import Hashable, Optional
 
 from aiohttp import WSMsgType, web
 import async_timeout
@@ -11,11 +11,14 @@ from homeassistant.components.http import HomeAssistantView
 from homeassistant.const import EVENT_HOMEASSISTANT_STOP
 from homeassistant.core import callback
 from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.json import json_loads
 
 from .auth import AuthPhase, auth_required_message
 from .const import (
     CANCELLATION_ERRORS,
     DATA_CONNECTIONS,
+    FEATURE_COALESCE_MESSAGES,
+    MAX_COALESCED_MSG,
     MAX_PENDING_MSG,
     PENDING_MSG_PEAK,
     PENDING_MSG_PEAK_TIME,
@@ -50,6 +53,17 @@ class WebSocketAdapter(logging.LoggerAdapter):
         return f'[{self.extra["connid"]}] {msg}', kwargs
 
 
+class CollapsibleMessage:
+    """A queued message that a newer message with the same key can replace."""
+
+    __slots__ = ["key", "message"]
+
+    def __init__(self, key, message):
+        """Initialize the message."""
+        self.key = key
+        self.message = message
+
+
 class WebSocketHandler:
     """Handle an active websocket client connection."""
 
@@ -63,36 +77,87 @@ class WebSocketHandler:
         self._writer_task = None
         self._logger = WebSocketAdapter(_WS_LOGGER, {"connid": id(self)})
         self._peak_checker_unsub = None
+        self._connection = None
+        self._collapsible = {}
 
     async def _writer(self):
-        """Write outgoing messages."""
+        """Write outgoing messages.
+
+        Clients that support it get the messages that queued up while the
+        previous frame was written as one JSON array.
+        """
         # Exceptions if Socket disconnected or cancelled by connection handler
         with suppress(RuntimeError, ConnectionResetError, *CANCELLATION_ERRORS):
             while not self.wsock.closed:
-                message = await self._to_write.get()
-                if message is None:
+                messages = [await self._to_write.get()]
+                if self._coalesce_messages:
+                    while len(messages) < MAX_COALESCED_MSG:
+                        try:
+                            messages.append(self._to_write.get_nowait())
+                        except asyncio.QueueEmpty:
+                            break
+
+                stop = None in messages
+                if stop:
+                    messages = messages[: messages.index(None)]
+
+                if len(messages) == 1:
+                    await self.wsock.send_str(self._message_to_text(messages[0]))
+                elif messages:
+                    await self.wsock.send_str(
+                        "[" + ",".join(map(self._message_to_text, messages)) + "]"
+                    )
+
+                if stop:
                     break
 
-                self._logger.debug("Sending %s", message)
-
-                if not isinstance(message, str):
-                    message = message_to_json(message)
-
-                await self.wsock.send_str(message)
-
         # Clean up the peaker checker when we shut down the writer
         if self._peak_checker_unsub:
             self._peak_checker_unsub()
             self._peak_checker_unsub = None
 
+    @property
+    def _coalesce_messages(self):
+        """Return if the client accepts several messages in one frame."""
+        return self._connection is not None and bool(
+            self._connection.supported_features.get(FEATURE_COALESCE_MESSAGES)
+        )
+
+    def _message_to_text(self, message):
+        """Return the JSON text of a queued message."""
+        if isinstance(message, CollapsibleMessage):
+            if self._collapsible.get(message.key) is message:
+                del self._collapsible[message.key]
+            message = message.message
+
+        self._logger.debug("Sending %s", message)
+
+        if not isinstance(message, str):
+            message = message_to_json(message)
+
+        return message
+
     @callback
-    def _send_message(self, message):
+    def _send_message(self, message, collapse_key: Optional[Hashable] = None):
         """Send a message to the client.
 
+        Messages with a collapse_key, like the state of an entity, replace
+        the still queued message with the same key while the client falls
+        behind instead of growing the queue.
+
         Closes connection if the client is not reading the messages.
 
         Async friendly.
         """
+        if collapse_key is not None:
+            queued = self._collapsible.get(collapse_key)
+            if queued is not None and self._to_write.qsize() >= PENDING_MSG_PEAK:
+                queued.message = message
+                return
+            message = self._collapsible[collapse_key] = CollapsibleMessage(
+                collapse_key, message
+            )
+
         try:
             self._to_write.put_nowait(message)
         except asyncio.QueueFull:
@@ -178,13 +243,13 @@ class WebSocketHandler:
                 raise Disconnect
 
             try:
-                msg_data = msg.json()
+                msg_data = msg.json(loads=json_loads)
             except ValueError as err:
                 disconnect_warn = "Received invalid JSON."
                 raise Disconnect from err
 
             self._logger.debug("Received %s", msg_data)
-            connection = await auth.async_handle(msg_data)
+            connection = self._connection = await auth.async_handle(msg_data)
             self.hass.data[DATA_CONNECTIONS] = (
                 self.hass.data.get(DATA_CONNECTIONS, 0) + 1
             )
@@ -204,7 +269,7 @@ class WebSocketHandler:
                     break
 
                 try:
-                    msg_data = msg.json()
+                    msg_data = msg.json(loads=json_loads)
                 except ValueError:
                     disconnect_warn = "Received invalid JSON."
                     break
@@ -6,8 +6,9 @@ from typing import Any, Dict
 
 import voluptuous as vol
 
-from homeassistant.core import Event
+from homeassistant.core import Event, State
 from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.json import json_dumps_strict
 from homeassistant.util.json import (
     find_paths_unserializable_data,
     format_unserializable_data,
@@ -31,12 +32,34 @@ BASE_COMMAND_MESSAGE_SCHEMA = vol.Schema({vol.Required("id"): cv.positive_int})
 IDEN_TEMPLATE = "__IDEN__"
 IDEN_JSON_TEMPLATE = '"__IDEN__"'
 
+# Keys of the compressed entity events of subscribe_entities
+ENTITY_EVENT_ADD = "a"
+ENTITY_EVENT_REMOVE = "r"
+ENTITY_EVENT_CHANGE = "c"
+
+COMPRESSED_STATE_STATE = "s"
+COMPRESSED_STATE_ATTRIBUTES = "a"
+COMPRESSED_STATE_CONTEXT = "c"
+COMPRESSED_STATE_LAST_CHANGED = "lc"
+COMPRESSED_STATE_LAST_UPDATED = "lu"
+
+STATE_DIFF_ADDITIONS = "+"
+STATE_DIFF_REMOVALS = "-"
+
 
 def result_message(iden: int, result: Any = None) -> Dict:
     """Return a success result message."""
     return {"id": iden, "type": const.TYPE_RESULT, "success": True, "result": result}
 
 
+def result_message_json(iden: int, result_json: str) -> str:
+    """Return a success result message with an already serialized result."""
+    return (
+        f'{{"id":{iden},"type":"{const.TYPE_RESULT}","success":true,'
+        f'"result":{result_json}}}'
+    )
+
+
 def error_message(iden: int, code: str, message: str) -> Dict:
     """Return an error result message."""
     return {
@@ -71,7 +94,94 @@ def _cached_event_message(event: Event) -> str:
     The IDEN_TEMPLATE is used which will be replaced
     with the actual iden in cached_event_message
     """
-    return message_to_json(event_message(IDEN_TEMPLATE, event))
+    try:
+        return (
+            f'{{"id":{IDEN_JSON_TEMPLATE},"type":"event",'
+            f'"event":{event.as_json()}}}'
+        )
+    except (ValueError, TypeError):
+        # Logs where the unserializable data is
+        return message_to_json(event_message(IDEN_TEMPLATE, event))
+
+
+def compressed_state_dict_add(state: State) -> Dict[str, Any]:
+    """Return the compressed representation of a state.
+
+    Timestamps are epoch seconds and last_updated is left out when it
+    equals last_changed.
+    """
+    compressed: Dict[str, Any] = {
+        COMPRESSED_STATE_STATE: state.state,
+        COMPRESSED_STATE_ATTRIBUTES: state.attributes,
+        COMPRESSED_STATE_CONTEXT: state.context.id,
+        COMPRESSED_STATE_LAST_CHANGED: state.last_changed.timestamp(),
+    }
+    if state.last_changed != state.last_updated:
+        compressed[COMPRESSED_STATE_LAST_UPDATED] = state.last_updated.timestamp()
+    return compressed
+
+
+def cached_state_diff_message(iden: int, event: Event) -> str:
+    """Return a subscribe_entities message for a state_changed event.
+
+    Serialize to json once per event, like cached_event_message.
+    """
+    return _cached_state_diff_message(event).replace(IDEN_JSON_TEMPLATE, str(iden), 1)
+
+
+@lru_cache(maxsize=128)
+def _cached_state_diff_message(event: Event) -> str:
+    """Cache and serialize the state diff of the event to json."""
+    return message_to_json(event_message(IDEN_TEMPLATE, _state_diff_event(event)))
+
+
+def _state_diff_event(event: Event) -> Dict[str, Any]:
+    """Return the compressed entity event of a state_changed event."""
+    new_state = event.data["new_state"]
+    if new_state is None:
+        return {ENTITY_EVENT_REMOVE: [event.data["entity_id"]]}
+
+    old_state = event.data["old_state"]
+    if old_state is None:
+        return {
+            ENTITY_EVENT_ADD: {
+                new_state.entity_id: compressed_state_dict_add(new_state)
+            }
+        }
+
+    return {
+        ENTITY_EVENT_CHANGE: {new_state.entity_id: _state_diff(old_state, new_state)}
+    }
+
+
+def _state_diff(old_state: State, new_state: State) -> Dict[str, Any]:
+    """Return what changed between two states of an entity."""
+    additions: Dict[str, Any] = {COMPRESSED_STATE_CONTEXT: new_state.context.id}
+    diff = {STATE_DIFF_ADDITIONS: additions}
+
+    if old_state.state != new_state.state:
+        additions[COMPRESSED_STATE_STATE] = new_state.state
+    if old_state.last_changed != new_state.last_changed:
+        additions[COMPRESSED_STATE_LAST_CHANGED] = new_state.last_changed.timestamp()
+    elif old_state.last_updated != new_state.last_updated:
+        additions[COMPRESSED_STATE_LAST_UPDATED] = new_state.last_updated.timestamp()
+
+    old_attributes = old_state.attributes
+    new_attributes = new_state.attributes
+    # Shared by the state machine when the attributes did not change
+    if old_attributes is not new_attributes and old_attributes != new_attributes:
+        changed = {
+            key: value
+            for key, value in new_attributes.items()
+            if key not in old_attributes or old_attributes[key] != value
+        }
+        if changed:
+            additions[COMPRESSED_STATE_ATTRIBUTES] = changed
+        removed = [key for key in old_attributes if key not in new_attributes]
+        if removed:
+            diff[STATE_DIFF_REMOVALS] = {COMPRESSED_STATE_ATTRIBUTES: removed}
+
+    return diff
 
 
 def message_to_json(message: Any) -> str:
@@ -79,14 +189,17 @@ def message_to_json(message: Any) -> str:
     try:
         return const.JSON_DUMP(message)
     except (ValueError, TypeError):
-        _LOGGER.error(
-            "Unable to serialize to JSON. Bad data found at %s",
-            format_unserializable_data(
-                find_paths_unserializable_data(message, dump=const.JSON_DUMP)
-            ),
-        )
-        return const.JSON_DUMP(
-            error_message(
-                message["id"], const.ERR_UNKNOWN_ERROR, "Invalid JSON in response"
-            )
-        )
+        return invalid_json_message(message["id"], message)
+
+
+def invalid_json_message(iden: int, bad_data: Any) -> str:
+    """Log where bad_data cannot be serialized and return the error message."""
+    _LOGGER.error(
+        "Unable to serialize to JSON. Bad data found at %s",
+        format_unserializable_data(
+            find_paths_unserializable_data(bad_data, dump=json_dumps_strict)
+        ),
+    )
+    return const.JSON_DUMP(
+        error_message(iden, const.ERR_UNKNOWN_ERROR, "Invalid JSON in response")
+    )
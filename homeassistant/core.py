@@ -13,6 +13,7 @@ import logging
 import os
 import pathlib
 import re
+import sys
 import threading
 from time import monotonic
 from types import MappingProxyType
@@ -40,12 +41,15 @@ import yarl
 
 from homeassistant import block_async_io, loader, util
 from homeassistant.const import (
+    ATTR_DEVICE_CLASS,
     ATTR_DOMAIN,
     ATTR_FRIENDLY_NAME,
+    ATTR_ICON,
     ATTR_NOW,
     ATTR_SECONDS,
     ATTR_SERVICE,
     ATTR_SERVICE_DATA,
+    ATTR_UNIT_OF_MEASUREMENT,
     CONF_UNIT_SYSTEM_IMPERIAL,
     EVENT_CALL_SERVICE,
     EVENT_CORE_CONFIG_UPDATE,
@@ -70,6 +74,7 @@ from homeassistant.exceptions import (
     ServiceNotFound,
     Unauthorized,
 )
+from homeassistant.helpers.json import json_dumps, json_dumps_strict
 from homeassistant.util import location, network
 from homeassistant.util.async_ import fire_coroutine_threadsafe, run_callback_threadsafe
 import homeassistant.util.dt as dt_util
@@ -114,6 +119,15 @@ TIMEOUT_EVENT_START = 15
 
 _LOGGER = logging.getLogger(__name__)
 
+# Attributes whose string values are interned, they repeat across entities
+# and across the states of an entity
+INTERNED_ATTRIBUTE_VALUES = {
+    ATTR_DEVICE_CLASS,
+    ATTR_FRIENDLY_NAME,
+    ATTR_ICON,
+    ATTR_UNIT_OF_MEASUREMENT,
+}
+
 
 def split_entity_id(entity_id: str) -> List[str]:
     """Split a state entity ID into domain and object ID."""
@@ -590,7 +604,7 @@ class EventOrigin(enum.Enum):
 class Event:
     """Representation of an event within the bus."""
 
-    __slots__ = ["event_type", "data", "origin", "time_fired", "context"]
+    __slots__ = ["event_type", "data", "origin", "time_fired", "context", "_as_json"]
 
     def __init__(
         self,
@@ -606,6 +620,7 @@ class Event:
         self.origin = origin
         self.time_fired = time_fired or dt_util.utcnow()
         self.context: Context = context or Context()
+        self._as_json: Optional[str] = None
 
     def __hash__(self) -> int:
         """Make hashable."""
@@ -625,6 +640,25 @@ class Event:
             "context": self.context.as_dict(),
         }
 
+    def as_json(self) -> str:
+        """Return the JSON representation of this Event.
+
+        The result is cached and the cached JSON of states in the data is
+        reused, so an event sent to many consumers is encoded once.
+        Raises ValueError or TypeError if the event cannot be encoded.
+
+        Async friendly.
+        """
+        if self._as_json is None:
+            self._as_json = (
+                f'{{"event_type":{json_dumps(self.event_type)},'
+                f'"data":{_json_object(self.data)},'
+                f'"origin":{json_dumps(str(self.origin.value))},'
+                f'"time_fired":{json_dumps(self.time_fired.isoformat())},'
+                f'"context":{json_dumps(self.context.as_dict())}}}'
+            )
+        return self._as_json
+
     def __repr__(self) -> str:
         """Return the representation."""
         # pylint: disable=maybe-no-member
@@ -651,6 +685,8 @@ class EventBus:
     def __init__(self, hass: HomeAssistant) -> None:
         """Initialize a new event bus."""
         self._listeners: Dict[str, List[HassJob]] = {}
+        # event_type -> data key -> data value -> listeners
+        self._keyed_listeners: Dict[str, Dict[str, Dict[Any, List[HassJob]]]] = {}
         self._hass = hass
 
     @callback
@@ -659,7 +695,12 @@ class EventBus:
 
         This method must be run in the event loop.
         """
-        return {key: len(self._listeners[key]) for key in self._listeners}
+        listeners = {key: len(self._listeners[key]) for key in self._listeners}
+        for event_type, keyed in self._keyed_listeners.items():
+            listeners[event_type] = listeners.get(event_type, 0) + sum(
+                len(jobs) for by_value in keyed.values() for jobs in by_value.values()
+            )
+        return listeners
 
     @property
     def listeners(self) -> Dict[str, int]:
@@ -698,6 +739,23 @@ class EventBus:
         if match_all_listeners is not None and event_type != EVENT_HOMEASSISTANT_CLOSE:
             listeners = match_all_listeners + listeners
 
+        if event_data and self._keyed_listeners:
+            keyed_by_type = [self._keyed_listeners.get(event_type)]
+            if event_type != EVENT_HOMEASSISTANT_CLOSE:
+                keyed_by_type.append(self._keyed_listeners.get(MATCH_ALL))
+            for keyed in keyed_by_type:
+                if keyed is None:
+                    continue
+                # Only the listeners of the fired data values are looked up
+                for data_key, by_value in keyed.items():
+                    try:
+                        keyed_listeners = by_value.get(event_data.get(data_key))
+                    except TypeError:
+                        # Unhashable values never match a keyed listener
+                        continue
+                    if keyed_listeners is not None:
+                        listeners = listeners + keyed_listeners
+
         event = Event(event_type, event_data, origin, time_fired, context)
 
         if event_type != EVENT_TIME_CHANGED:
@@ -746,6 +804,31 @@ class EventBus:
 
         return remove_listener
 
+    @callback
+    def async_listen_keyed(
+        self, event_type: str, data_key: str, data_value: Any, listener: Callable
+    ) -> CALLBACK_TYPE:
+        """Listen for events of a specific type with a specific data value.
+
+        The listener is only called for events of event_type whose data
+        has data_value at data_key, e.g. the state_changed events of a
+        single entity_id. Like async_listen, ``MATCH_ALL`` as event_type
+        matches events of all types. Matching listeners are found with a dict lookup
+        instead of having every listener filter the events itself.
+
+        This method must be run in the event loop.
+        """
+        hassjob = HassJob(listener)
+        self._keyed_listeners.setdefault(event_type, {}).setdefault(
+            data_key, {}
+        ).setdefault(data_value, []).append(hassjob)
+
+        def remove_listener() -> None:
+            """Remove the listener."""
+            self._async_remove_keyed_listener(event_type, data_key, data_value, hassjob)
+
+        return remove_listener
+
     def listen_once(self, event_type: str, listener: Callable) -> CALLBACK_TYPE:
         """Listen once for event of a specific type.
 
@@ -814,6 +897,29 @@ class EventBus:
             # ValueError if listener did not exist within event_type
             _LOGGER.exception("Unable to remove unknown job listener %s", hassjob)
 
+    @callback
+    def _async_remove_keyed_listener(
+        self, event_type: str, data_key: str, data_value: Any, hassjob: HassJob
+    ) -> None:
+        """Remove a keyed listener.
+
+        This method must be run in the event loop.
+        """
+        try:
+            keyed = self._keyed_listeners[event_type]
+            by_value = keyed[data_key]
+            by_value[data_value].remove(hassjob)
+
+            # delete the emptied levels of the index
+            if not by_value[data_value]:
+                by_value.pop(data_value)
+                if not by_value:
+                    keyed.pop(data_key)
+                    if not keyed:
+                        self._keyed_listeners.pop(event_type)
+        except (KeyError, ValueError):
+            _LOGGER.exception("Unable to remove unknown job listener %s", hassjob)
+
 
 class State:
     """Object to represent a state within the state machine.
@@ -838,6 +944,8 @@ class State:
         "domain",
         "object_id",
         "_as_dict",
+        "_as_json",
+        "_attributes_json",
     ]
 
     def __init__(
@@ -867,12 +975,18 @@ class State:
 
         self.entity_id = entity_id.lower()
         self.state = state
-        self.attributes = MappingProxyType(attributes or {})
+        if isinstance(attributes, MappingProxyType):
+            # Immutable already, states with equal attributes share the mapping
+            self.attributes = attributes
+        else:
+            self.attributes = MappingProxyType(attributes or {})
         self.last_updated = last_updated or dt_util.utcnow()
         self.last_changed = last_changed or self.last_updated
         self.context = context or Context()
         self.domain, self.object_id = split_entity_id(self.entity_id)
         self._as_dict: Optional[Dict[str, Collection[Any]]] = None
+        self._as_json: Optional[str] = None
+        self._attributes_json: Optional[str] = None
 
     @property
     def name(self) -> str:
@@ -905,6 +1019,36 @@ class State:
             }
         return self._as_dict
 
+    def as_json(self) -> str:
+        """Return the JSON representation of the State.
+
+        The result is cached, consumers splice it into their messages
+        instead of encoding the state again.
+        Raises ValueError or TypeError if the state cannot be encoded.
+
+        Async friendly.
+        """
+        if self._as_json is None:
+            as_dict = self.as_dict()
+            self._as_json = (
+                f'{{"entity_id":{json_dumps(self.entity_id)},'
+                f'"state":{json_dumps(self.state)},'
+                f'"attributes":{self.attributes_as_json()},'
+                f'"last_changed":{json_dumps(as_dict["last_changed"])},'
+                f'"last_updated":{json_dumps(as_dict["last_updated"])},'
+                f'"context":{json_dumps(as_dict["context"])}}}'
+            )
+        return self._as_json
+
+    def attributes_as_json(self) -> str:
+        """Return the JSON representation of the attributes.
+
+        Async friendly.
+        """
+        if self._attributes_json is None:
+            self._attributes_json = json_dumps_strict(dict(self.attributes))
+        return self._attributes_json
+
     @classmethod
     def from_dict(cls, json_dict: Dict) -> Any:
         """Initialize a state from a dict.
@@ -959,12 +1103,50 @@ class State:
         )
 
 
+def _json_object(data: Dict[str, Any]) -> str:
+    """Encode data as a JSON object, reusing the cached JSON of states."""
+    if not any(isinstance(value, State) for value in data.values()) or not all(
+        isinstance(key, str) for key in data
+    ):
+        return json_dumps_strict(data)
+
+    members = ",".join(
+        f"{json_dumps(key)}:"
+        + (value.as_json() if isinstance(value, State) else json_dumps_strict(value))
+        for key, value in data.items()
+    )
+    return f"{{{members}}}"
+
+
+def _intern_attributes(attributes: Mapping[str, Any]) -> Dict[str, Any]:
+    """Return a copy of attributes with interned keys and common values."""
+    interned: Dict[Any, Any] = {}
+    for key, value in attributes.items():
+        # sys.intern only accepts exact str instances
+        if type(key) is str:  # noqa: E721
+            key = sys.intern(key)
+            if key in INTERNED_ATTRIBUTE_VALUES and type(value) is str:  # noqa: E721
+                value = sys.intern(value)
+        interned[key] = value
+    return interned
+
+
+def _filter_domains(domain_filter: Union[str, Iterable]) -> Iterable[str]:
+    """Return the lower case domains of a domain filter, each once."""
+    if isinstance(domain_filter, str):
+        return (domain_filter.lower(),)
+    return dict.fromkeys(domain.lower() for domain in domain_filter)
+
+
 class StateMachine:
     """Helper class that tracks the state of different entities."""
 
     def __init__(self, bus: EventBus, loop: asyncio.events.AbstractEventLoop) -> None:
         """Initialize state machine."""
         self._states: Dict[str, State] = {}
+        # domain -> entity_id -> state, kept in step with _states so domain
+        # filtered lookups do not scan every state
+        self._domain_index: Dict[str, Dict[str, State]] = {}
         self._reservations: Set[str] = set()
         self._bus = bus
         self._loop = loop
@@ -987,13 +1169,10 @@ class StateMachine:
         if domain_filter is None:
             return list(self._states)
 
-        if isinstance(domain_filter, str):
-            domain_filter = (domain_filter.lower(),)
-
         return [
-            state.entity_id
-            for state in self._states.values()
-            if state.domain in domain_filter
+            entity_id
+            for domain in _filter_domains(domain_filter)
+            for entity_id in self._domain_index.get(domain, ())
         ]
 
     @callback
@@ -1007,11 +1186,9 @@ class StateMachine:
         if domain_filter is None:
             return len(self._states)
 
-        if isinstance(domain_filter, str):
-            domain_filter = (domain_filter.lower(),)
-
-        return len(
-            [None for state in self._states.values() if state.domain in domain_filter]
+        return sum(
+            len(self._domain_index.get(domain, ()))
+            for domain in _filter_domains(domain_filter)
         )
 
     def all(self, domain_filter: Optional[Union[str, Iterable]] = None) -> List[State]:
@@ -1031,11 +1208,10 @@ class StateMachine:
         if domain_filter is None:
             return list(self._states.values())
 
-        if isinstance(domain_filter, str):
-            domain_filter = (domain_filter.lower(),)
-
         return [
-            state for state in self._states.values() if state.domain in domain_filter
+            state
+            for domain in _filter_domains(domain_filter)
+            for state in self._domain_index.get(domain, {}).values()
         ]
 
     def get(self, entity_id: str) -> Optional[State]:
@@ -1079,6 +1255,11 @@ class StateMachine:
         if old_state is None:
             return False
 
+        domain_states = self._domain_index[old_state.domain]
+        del domain_states[entity_id]
+        if not domain_states:
+            del self._domain_index[old_state.domain]
+
         self._bus.async_fire(
             EVENT_STATE_CHANGED,
             {"entity_id": entity_id, "old_state": old_state, "new_state": None},
@@ -1163,12 +1344,20 @@ class StateMachine:
             last_changed = None
         else:
             same_state = old_state.state == new_state and not force_update
-            same_attr = old_state.attributes == MappingProxyType(attributes)
+            same_attr = (
+                old_state.attributes is attributes or old_state.attributes == attributes
+            )
             last_changed = old_state.last_changed if same_state else None
 
         if same_state and same_attr:
             return
 
+        if old_state is not None and same_attr:
+            # Share the mapping so consumers can compare attributes by identity
+            attributes = old_state.attributes
+        else:
+            attributes = MappingProxyType(_intern_attributes(attributes))
+
         if context is None:
             context = Context()
 
@@ -1184,6 +1373,7 @@ class StateMachine:
             old_state is None,
         )
         self._states[entity_id] = state
+        self._domain_index.setdefault(state.domain, {})[entity_id] = state
         self._bus.async_fire(
             EVENT_STATE_CHANGED,
             {"entity_id": entity_id, "old_state": old_state, "new_state": state},
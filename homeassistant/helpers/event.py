@@ -4,6 +4,8 @@ import copy
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import functools as ft
+import heapq
+import itertools
 import logging
 import time
 from typing import (
@@ -62,6 +64,8 @@ TRACK_STATE_REMOVED_DOMAIN_LISTENER = "track_state_removed_domain_listener"
 TRACK_ENTITY_REGISTRY_UPDATED_CALLBACKS = "track_entity_registry_updated_callbacks"
 TRACK_ENTITY_REGISTRY_UPDATED_LISTENER = "track_entity_registry_updated_listener"
 
+TRACK_POINT_IN_TIME_SCHEDULER = "track_point_in_time_scheduler"
+
 _ALL_LISTENER = "all"
 _DOMAINS_LISTENER = "domains"
 _ENTITIES_LISTENER = "entities"
@@ -116,6 +120,18 @@ class TrackTemplateResult:
     result: Any
 
 
+@dataclass
+class TemplateRenderStats:
+    """Class for the render statistics of a tracked template.
+
+    total_time and last_time are in seconds.
+    """
+
+    count: int = 0
+    total_time: float = 0.0
+    last_time: float = 0.0
+
+
 def threaded_listener_factory(async_factory: Callable[..., Any]) -> CALLBACK_TYPE:
     """Convert an async event helper to a threaded one."""
 
@@ -730,6 +746,53 @@ def async_track_template(
 track_template = threaded_listener_factory(async_track_template)
 
 
+class _RerenderIndex:
+    """Index of tracked templates by the state changes that re-render them.
+
+    The candidates of an event are a superset, _event_triggers_rerender
+    still decides for each of them.
+    """
+
+    def __init__(
+        self, track_templates: List[TrackTemplate], infos: Dict[Template, RenderInfo]
+    ):
+        """Index the templates by their last RenderInfo."""
+        self._all: Set[int] = set()
+        self._entities: Dict[str, Set[int]] = {}
+        self._domains: Dict[str, Set[int]] = {}
+        self._lifecycle_all: Set[int] = set()
+        self._lifecycle_domains: Dict[str, Set[int]] = {}
+
+        for idx, track_template_ in enumerate(track_templates):
+            info = infos[track_template_.template]
+            if info.all_states or info.exception or info.is_static:
+                self._all.add(idx)
+                continue
+            for entity_id in info.entities:
+                self._entities.setdefault(entity_id, set()).add(idx)
+            for domain in info.domains:
+                self._domains.setdefault(domain, set()).add(idx)
+            if info.all_states_lifecycle:
+                self._lifecycle_all.add(idx)
+            for domain in info.domains_lifecycle:
+                self._lifecycle_domains.setdefault(domain, set()).add(idx)
+
+    @callback
+    def candidates(self, event: Event) -> List[int]:
+        """Return the indexes of the templates the event may re-render."""
+        entity_id = event.data[ATTR_ENTITY_ID]
+        domain = split_entity_id(entity_id)[0]
+        candidates = set(self._all)
+        candidates.update(self._entities.get(entity_id, ()))
+        candidates.update(self._domains.get(domain, ()))
+
+        if event.data.get("new_state") is None or event.data.get("old_state") is None:
+            candidates.update(self._lifecycle_all)
+            candidates.update(self._lifecycle_domains.get(domain, ()))
+
+        return sorted(candidates)
+
+
 class _TrackTemplateResultInfo:
     """Handle removal / refresh of tracker."""
 
@@ -745,9 +808,11 @@ class _TrackTemplateResultInfo:
 
         for track_template_ in track_templates:
             track_template_.template.hass = hass
-        self._track_templates = track_templates
+        self._track_templates = list(track_templates)
 
         self._last_result: Dict[Template, Union[str, TemplateError]] = {}
+        self._render_stats: Dict[Template, TemplateRenderStats] = {}
+        self._rerender_index: Optional[_RerenderIndex] = None
 
         self._rate_limit = KeyedRateLimit(hass)
         self._info: Dict[Template, RenderInfo] = {}
@@ -758,8 +823,7 @@ class _TrackTemplateResultInfo:
         """Activation of template tracking."""
         for track_template_ in self._track_templates:
             template = track_template_.template
-            variables = track_template_.variables
-            self._info[template] = info = template.async_render_to_info(variables)
+            self._info[template] = info = self._render_to_info(track_template_)
 
             if info.exception:
                 if raise_on_template_error:
@@ -770,6 +834,7 @@ class _TrackTemplateResultInfo:
                     exc_info=info.exception,
                 )
 
+        self._rerender_index = _RerenderIndex(self._track_templates, self._info)
         self._track_state_changes = async_track_state_change_filtered(
             self.hass, _render_infos_to_track_states(self._info.values()), self._refresh
         )
@@ -789,6 +854,26 @@ class _TrackTemplateResultInfo:
             "time": bool(self._time_listeners),
         }
 
+    @property
+    def render_stats(self) -> Dict[Template, TemplateRenderStats]:
+        """How often and how long each template was rendered."""
+        return self._render_stats
+
+    def _render_to_info(self, track_template_: TrackTemplate) -> RenderInfo:
+        """Render a template and record how long it took."""
+        template = track_template_.template
+        start = time.perf_counter()
+        info = template.async_render_to_info(track_template_.variables)
+        elapsed = time.perf_counter() - start
+
+        stats = self._render_stats.get(template)
+        if stats is None:
+            stats = self._render_stats[template] = TemplateRenderStats()
+        stats.count += 1
+        stats.total_time += elapsed
+        stats.last_time = elapsed
+        return info
+
     @callback
     def _setup_time_listener(self, template: Template, has_time: bool) -> None:
         if not has_time:
@@ -877,9 +962,7 @@ class _TrackTemplateResultInfo:
             )
 
         self._rate_limit.async_triggered(template, now)
-        self._info[template] = info = template.async_render_to_info(
-            track_template_.variables
-        )
+        self._info[template] = info = self._render_to_info(track_template_)
 
         try:
             result: Union[str, TemplateError] = info.result()
@@ -910,7 +993,8 @@ class _TrackTemplateResultInfo:
         to be considered.
 
         track_templates is an optional list of TrackTemplate objects
-        to refresh.  If not provided, all tracked templates will be
+        to refresh.  If not provided, the tracked templates the event
+        can re-render, or all of them without an event, will be
         considered.
 
         replayed is True if the event is being replayed because the
@@ -920,7 +1004,16 @@ class _TrackTemplateResultInfo:
         info_changed = False
         now = event.time_fired if not replayed and event else dt_util.utcnow()
 
-        for track_template_ in track_templates or self._track_templates:
+        if not track_templates:
+            if event and self._rerender_index:
+                track_templates = [
+                    self._track_templates[idx]
+                    for idx in self._rerender_index.candidates(event)
+                ]
+            else:
+                track_templates = self._track_templates
+
+        for track_template_ in track_templates:
             update = self._render_template_if_ready(track_template_, now, event)
             if not update:
                 continue
@@ -934,6 +1027,7 @@ class _TrackTemplateResultInfo:
                 updates.append(update)
 
         if info_changed:
+            self._rerender_index = _RerenderIndex(self._track_templates, self._info)
             assert self._track_state_changes
             self._track_state_changes.async_update_listeners(
                 _render_infos_to_track_states(
@@ -1117,6 +1211,123 @@ def async_track_point_in_time(
 track_point_in_time = threaded_listener_factory(async_track_point_in_time)
 
 
+class _ScheduledJob:
+    """A job waiting for its point in time."""
+
+    __slots__ = ("job", "point_in_time", "cancelled")
+
+    def __init__(self, job: HassJob, point_in_time: datetime) -> None:
+        """Initialize the scheduled job."""
+        self.job = job
+        self.point_in_time = point_in_time
+        self.cancelled = False
+
+
+class _PointInTimeScheduler:
+    """Run the point in time listeners of hass from a single loop timer.
+
+    The jobs are kept in a heap ordered by their point in time and only the
+    earliest one has a timer armed in the event loop. Jobs due at the same
+    time are run by the same wake up.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the scheduler."""
+        self.hass = hass
+        self._heap: List[Tuple[float, int, _ScheduledJob]] = []
+        self._sequence = itertools.count()
+        self._cancelled = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_when: Optional[float] = None
+
+    @callback
+    def async_schedule(
+        self, job: HassJob, utc_point_in_time: datetime
+    ) -> _ScheduledJob:
+        """Schedule job to run at utc_point_in_time."""
+        scheduled = _ScheduledJob(job, utc_point_in_time)
+        heapq.heappush(
+            self._heap,
+            (utc_point_in_time.timestamp(), next(self._sequence), scheduled),
+        )
+        self._async_arm()
+        return scheduled
+
+    @callback
+    def async_cancel(self, scheduled: _ScheduledJob) -> None:
+        """Cancel a scheduled job that did not run yet."""
+        if scheduled.cancelled:
+            return
+        scheduled.cancelled = True
+        self._cancelled += 1
+
+        if self._cancelled > len(self._heap) // 2:
+            # Drop the cancelled jobs instead of waiting for them to come up
+            self._heap = [item for item in self._heap if not item[2].cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+        self._async_arm()
+
+    @callback
+    def _async_arm(self, now: Optional[float] = None) -> None:
+        """Arm the loop timer for the earliest job.
+
+        now is the current timestamp, it defaults to the wall clock.
+        """
+        heap = self._heap
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+            self._cancelled -= 1
+
+        if not heap:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = self._timer_when = None
+            return
+
+        when = heap[0][0]
+        if self._timer is not None:
+            if self._timer_when == when:
+                return
+            self._timer.cancel()
+
+        if now is None:
+            now = time.time()
+        self._timer_when = when
+        self._timer = self.hass.loop.call_later(when - now, self._async_run)
+
+    @callback
+    def _async_run(self) -> None:
+        """Run the jobs that are due."""
+        self._timer = self._timer_when = None
+
+        # Depending on the available clock support (including timer hardware
+        # and the OS kernel) it can happen that we fire a little bit too early
+        # as measured by utcnow(). That is bad when callbacks have assumptions
+        # about the current time. Thus, jobs that are not due yet stay for
+        # the rearmed timer.
+        now = time_tracker_utcnow().timestamp()
+        heap = self._heap
+        due = []
+        while heap and heap[0][0] <= now:
+            scheduled = heapq.heappop(heap)[2]
+            if scheduled.cancelled:
+                self._cancelled -= 1
+                continue
+            # Mark it done, cancelling it is a no-op from now on
+            scheduled.cancelled = True
+            due.append(scheduled)
+
+        self._async_arm(now)
+
+        for scheduled in due:
+            try:
+                self.hass.async_run_hass_job(scheduled.job, scheduled.point_in_time)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error running job %s", scheduled.job)
+
+
 @callback
 @bind_hass
 def async_track_point_in_utc_time(
@@ -1132,37 +1343,20 @@ def async_track_point_in_utc_time(
     # having to figure out how to call the action every time its called.
     job = action if isinstance(action, HassJob) else HassJob(action)
 
-    cancel_callback: Optional[asyncio.TimerHandle] = None
-
-    @callback
-    def run_action() -> None:
-        """Call the action."""
-        nonlocal cancel_callback
-
-        now = time_tracker_utcnow()
-
-        # Depending on the available clock support (including timer hardware
-        # and the OS kernel) it can happen that we fire a little bit too early
-        # as measured by utcnow(). That is bad when callbacks have assumptions
-        # about the current time. Thus, we rearm the timer for the remaining
-        # time.
-        delta = (utc_point_in_time - now).total_seconds()
-        if delta > 0:
-            _LOGGER.debug("Called %f seconds too early, rearming", delta)
-
-            cancel_callback = hass.loop.call_later(delta, run_action)
-            return
-
-        hass.async_run_hass_job(job, utc_point_in_time)
+    scheduler: Optional[_PointInTimeScheduler] = hass.data.get(
+        TRACK_POINT_IN_TIME_SCHEDULER
+    )
+    if scheduler is None:
+        scheduler = hass.data[TRACK_POINT_IN_TIME_SCHEDULER] = _PointInTimeScheduler(
+            hass
+        )
 
-    delta = utc_point_in_time.timestamp() - time.time()
-    cancel_callback = hass.loop.call_later(delta, run_action)
+    scheduled = scheduler.async_schedule(job, utc_point_in_time)
 
     @callback
     def unsub_point_in_time_listener() -> None:
-        """Cancel the call_later."""
-        assert cancel_callback is not None
-        cancel_callback.cancel()
+        """Cancel the scheduled job."""
+        scheduler.async_cancel(scheduled)  # type: ignore[union-attr]
 
     return unsub_point_in_time_listener
 
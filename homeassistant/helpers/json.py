@@ -1,8 +1,21 @@
-"""Helpers to help with encoding Home Assistant objects in JSON."""
+"""Helpers to help with encoding Home Assistant objects in JSON.
+
+json_dumps and json_loads are the central JSON facade. They use orjson when
+it is installed and fall back to the standard library otherwise. Both
+encode compact JSON without spaces after the separators and write NaN and
+infinity as null, json_dumps_strict rejects them instead.
+"""
 from datetime import datetime
 import json
+import math
+from types import MappingProxyType
 from typing import Any
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class JSONEncoder(json.JSONEncoder):
     """JSONEncoder that supports Home Assistant objects."""
@@ -16,7 +29,103 @@ class JSONEncoder(json.JSONEncoder):
             return o.isoformat()
         if isinstance(o, set):
             return list(o)
+        if isinstance(o, MappingProxyType):
+            return dict(o)
         if hasattr(o, "as_dict"):
             return o.as_dict()
 
         return json.JSONEncoder.default(self, o)
+
+
+def json_encoder_default(obj: Any) -> Any:
+    """Convert the Home Assistant objects orjson does not support natively."""
+    if isinstance(obj, set):
+        return list(obj)
+    if isinstance(obj, MappingProxyType):
+        return dict(obj)
+    if hasattr(obj, "as_dict"):
+        return obj.as_dict()
+    raise TypeError
+
+
+def json_dumps_pretty(obj: Any) -> str:
+    """Encode obj as JSON indented by 4 spaces, the format of .storage files."""
+    return json.dumps(obj, indent=4, cls=JSONEncoder)
+
+
+def raise_on_non_finite(obj: Any) -> None:
+    """Raise ValueError if obj holds NaN or infinity, like json.dumps does."""
+    if isinstance(obj, float):
+        if not math.isfinite(obj):
+            raise ValueError("Out of range float values are not JSON compliant")
+    elif isinstance(obj, (dict, MappingProxyType)):
+        for value in obj.values():
+            raise_on_non_finite(value)
+    elif isinstance(obj, (list, tuple, set)):
+        for value in obj:
+            raise_on_non_finite(value)
+    elif hasattr(obj, "as_dict"):
+        raise_on_non_finite(obj.as_dict())
+
+
+def json_dumps_strict(obj: Any) -> str:
+    """Encode obj as compact JSON, raise ValueError for NaN and infinity.
+
+    obj is only walked when its JSON holds a null, use it for values of the
+    integrations that are encoded once, like the attributes of a state.
+    """
+    encoded = json_dumps(obj)
+    if "null" in encoded:
+        raise_on_non_finite(obj)
+    return encoded
+
+
+def _finite_or_none(obj: Any) -> Any:
+    """Return obj with NaN and infinity replaced by None."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, (dict, MappingProxyType)):
+        return {key: _finite_or_none(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple, set)):
+        return [_finite_or_none(value) for value in obj]
+    if hasattr(obj, "as_dict"):
+        return _finite_or_none(obj.as_dict())
+    return obj
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def json_dumps(obj: Any) -> str:
+        """Encode obj as compact JSON."""
+        return orjson.dumps(
+            obj, option=_ORJSON_OPTIONS, default=json_encoder_default
+        ).decode("utf-8")
+
+    def json_loads(obj: Any) -> Any:
+        """Decode JSON.
+
+        Rows written by older versions may hold NaN or infinity, which only
+        the standard library accepts.
+        """
+        try:
+            return orjson.loads(obj)
+        except orjson.JSONDecodeError:
+            return json.loads(obj)
+
+
+else:
+
+    def json_dumps(obj: Any) -> str:
+        """Encode obj as compact JSON."""
+        try:
+            return json.dumps(
+                obj, cls=JSONEncoder, allow_nan=False, separators=(",", ":")
+            )
+        except ValueError as err:
+            if "Out of range float" not in str(err):
+                raise
+        # Write NaN and infinity as null like orjson
+        return json.dumps(_finite_or_none(obj), cls=JSONEncoder, separators=(",", ":"))
+
+    json_loads = json.loads
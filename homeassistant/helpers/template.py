@@ -2,21 +2,36 @@
 from ast import literal_eval
 import asyncio
 import base64
+from collections import OrderedDict
 import collections.abc
 from datetime import datetime, timedelta
-from functools import partial, wraps
+from functools import lru_cache, partial, wraps
 import json
 import logging
 import math
+import operator
 from operator import attrgetter
 import random
 import re
-from typing import Any, Dict, Generator, Iterable, Optional, Type, Union, cast
+import threading
+from types import CodeType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 from urllib.parse import urlencode as urllib_urlencode
-import weakref
 
 import jinja2
-from jinja2 import contextfilter, contextfunction
+from jinja2 import contextfilter, contextfunction, nodes
 from jinja2.sandbox import ImmutableSandboxedEnvironment
 from jinja2.utils import Namespace  # type: ignore
 import voluptuous as vol
@@ -69,6 +84,56 @@ _COLLECTABLE_STATE_ATTRIBUTES = {
 ALL_STATES_RATE_LIMIT = timedelta(minutes=1)
 DOMAIN_STATES_RATE_LIMIT = timedelta(seconds=1)
 
+# Compiled code shared by all templates with the same source
+COMPILED_CODE_CACHE_SIZE = 1024
+_COMPILED_CODE_CACHE: "OrderedDict[Tuple[Type[TemplateEnvironment], str], CodeType]" = (
+    OrderedDict()
+)
+_COMPILED_CODE_CACHE_LOCK = threading.Lock()
+
+
+@bind_hass
+async def async_precompile(hass: HomeAssistantType, obj: Any) -> None:
+    """Attach hass to all templates in obj and compile them in the executor.
+
+    Templates that fail to compile are left alone, rendering them reports
+    the error.
+    """
+    attach(hass, obj)
+    templates = [tpl for tpl in _iter_templates(obj) if not tpl.is_static]
+    if not templates:
+        return
+    # Create the environment in the event loop
+    templates[0]._env  # pylint: disable=pointless-statement, protected-access
+    await hass.async_add_executor_job(_compile_templates, templates)
+
+
+def _iter_templates(obj: Any) -> Generator["Template", None, None]:
+    """Recursively yield all template instances in list and dict."""
+    if isinstance(obj, list):
+        for child in obj:
+            yield from _iter_templates(child)
+    elif isinstance(obj, collections.abc.Mapping):
+        for child_key, child_value in obj.items():
+            yield from _iter_templates(child_key)
+            yield from _iter_templates(child_value)
+    elif isinstance(obj, Template):
+        yield obj
+
+
+def _compile_templates(templates: List["Template"]) -> None:
+    """Compile the templates.
+
+    This method must be run in the executor.
+    """
+    for tpl in templates:
+        if tpl._compiled is not None:  # pylint: disable=protected-access
+            continue
+        try:
+            tpl._ensure_compiled()  # pylint: disable=protected-access
+        except TemplateError:
+            pass
+
 
 @bind_hass
 def attach(hass: HomeAssistantType, obj: Any) -> None:
@@ -279,6 +344,7 @@ class Template:
         "is_static",
         "_compiled_code",
         "_compiled",
+        "_fast_render",
     )
 
     def __init__(self, template, hass=None):
@@ -289,6 +355,7 @@ class Template:
         self.template: str = template.strip()
         self._compiled_code = None
         self._compiled: Optional[Template] = None
+        self._fast_render: Optional[Callable[[HomeAssistantType], str]] = None
         self.hass = hass
         self.is_static = not is_template_string(template)
 
@@ -350,7 +417,12 @@ class Template:
             kwargs.update(variables)
 
         try:
-            render_result = compiled.render(kwargs)
+            if self._fast_render is not None and kwargs.keys().isdisjoint(
+                _FAST_PATH_FUNCTIONS
+            ):
+                render_result = self._fast_render(self.hass)
+            else:
+                render_result = compiled.render(kwargs)
         except Exception as err:  # pylint: disable=broad-except
             raise TemplateError(err) from err
 
@@ -531,6 +603,7 @@ class Template:
             Template,
             jinja2.Template.from_code(env, self._compiled_code, env.globals, None),
         )
+        self._fast_render = _fast_render_func(self.template)
 
         return self._compiled
 
@@ -1299,7 +1372,6 @@ class TemplateEnvironment(ImmutableSandboxedEnvironment):
         """Initialise template environment."""
         super().__init__()
         self.hass = hass
-        self.template_cache = weakref.WeakValueDictionary()
         self.filters["round"] = forgiving_round
         self.filters["multiply"] = multiply
         self.filters["log"] = logarithm
@@ -1406,12 +1478,249 @@ class TemplateEnvironment(ImmutableSandboxedEnvironment):
             # any instance of this.
             return super().compile(source, name, filename, raw, defer_init)
 
-        cached = self.template_cache.get(source)
+        # The compiled code does not depend on hass, environments of
+        # the same type share it.
+        key = (type(self), source)
+        with _COMPILED_CODE_CACHE_LOCK:
+            cached = _COMPILED_CODE_CACHE.get(key)
+            if cached is not None:
+                _COMPILED_CODE_CACHE.move_to_end(key)
+                return cached
+
+        cached = super().compile(source)
 
-        if cached is None:
-            cached = self.template_cache[source] = super().compile(source)
+        with _COMPILED_CODE_CACHE_LOCK:
+            _COMPILED_CODE_CACHE[key] = cached
+            if len(_COMPILED_CODE_CACHE) > COMPILED_CODE_CACHE_SIZE:
+                _COMPILED_CODE_CACHE.popitem(last=False)
 
         return cached
 
 
 _NO_HASS_ENV = TemplateEnvironment(None)  # type: ignore[no-untyped-call]
+
+
+# Simple templates are rendered by evaluating their expression directly
+# instead of running the Jinja sandbox. _fast_render_func compiles a
+# template built from the subset below into a function of hass, all
+# other templates are rendered by Jinja.
+
+
+class _NoFastPath(Exception):
+    """The template uses a feature the fast path does not support."""
+
+
+def _fast_states(hass: HomeAssistantType, entity_id: str) -> str:
+    """Return the state of entity_id like states(entity_id)."""
+    state = hass.states.get(entity_id)
+    if state is None:
+        _collect_state(hass, entity_id)
+        return STATE_UNKNOWN
+    _collect_state(hass, state.entity_id)
+    return state.state
+
+
+def _fast_state_attr(hass: HomeAssistantType, entity_id: str, name: str) -> Any:
+    """Return an attribute of entity_id like state_attr(entity_id, name)."""
+    state = hass.states.get(entity_id)
+    if state is None:
+        _collect_state(hass, entity_id)
+        return None
+    _collect_state(hass, state.entity_id)
+    return state.attributes.get(name)
+
+
+def _fast_is_state(hass: HomeAssistantType, entity_id: str, value: Any) -> bool:
+    """Test the state of entity_id like is_state(entity_id, value)."""
+    state = hass.states.get(entity_id)
+    if state is None:
+        _collect_state(hass, entity_id)
+        return False
+    _collect_state(hass, state.entity_id)
+    return state.state == value
+
+
+def _fast_is_state_attr(
+    hass: HomeAssistantType, entity_id: str, name: str, value: Any
+) -> bool:
+    """Test an attribute like is_state_attr(entity_id, name, value)."""
+    attr = _fast_state_attr(hass, entity_id, name)
+    return attr is not None and attr == value
+
+
+# Global function name: (implementation, number of arguments)
+_FAST_PATH_FUNCTIONS: Dict[str, Tuple[Callable[..., Any], int]] = {
+    "states": (_fast_states, 1),
+    "state_attr": (_fast_state_attr, 2),
+    "is_state": (_fast_is_state, 2),
+    "is_state_attr": (_fast_is_state_attr, 3),
+}
+
+_FAST_PATH_FILTERS = {"abs", "float", "int", "lower", "multiply", "round", "upper"}
+
+_FAST_PATH_BINOPS: Dict[Type[nodes.BinExpr], Callable[[Any, Any], Any]] = {
+    nodes.Add: operator.add,
+    nodes.Sub: operator.sub,
+    nodes.Mul: operator.mul,
+    nodes.Div: operator.truediv,
+    nodes.FloorDiv: operator.floordiv,
+    nodes.Mod: operator.mod,
+}
+
+_FAST_PATH_COMPARE_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gteq": operator.ge,
+    "lt": operator.lt,
+    "lteq": operator.le,
+    "in": lambda left, right: left in right,
+    "notin": lambda left, right: left not in right,
+}
+
+
+@lru_cache(maxsize=COMPILED_CODE_CACHE_SIZE)
+def _fast_render_func(source: str) -> Optional[Callable[[HomeAssistantType], str]]:
+    """Return a function rendering source or None if Jinja must render it."""
+    try:
+        tree = _NO_HASS_ENV.parse(source)
+    except jinja2.TemplateSyntaxError:
+        return None
+
+    if len(tree.body) != 1 or not isinstance(tree.body[0], nodes.Output):
+        return None
+
+    try:
+        parts = [_fast_path_compile(node) for node in tree.body[0].nodes]
+    except _NoFastPath:
+        return None
+
+    if len(parts) == 1:
+        part = parts[0]
+        return lambda hass: str(part(hass))
+    return lambda hass: "".join([str(part(hass)) for part in parts])
+
+
+def _fast_path_compile(node: nodes.Node) -> Callable[[HomeAssistantType], Any]:
+    """Compile an expression node to a function of hass."""
+    # pylint: disable=too-many-return-statements
+    if isinstance(node, nodes.TemplateData):
+        data = node.data
+        return lambda hass: data
+
+    if isinstance(node, nodes.Const):
+        value = node.value
+        return lambda hass: value
+
+    if isinstance(node, (nodes.List, nodes.Tuple)):
+        items = [_fast_path_compile(item) for item in node.items]
+        container = list if isinstance(node, nodes.List) else tuple
+        return lambda hass: container([item(hass) for item in items])
+
+    if isinstance(node, nodes.BinExpr) and type(node) in _FAST_PATH_BINOPS:
+        binop = _FAST_PATH_BINOPS[type(node)]
+        left = _fast_path_compile(node.left)
+        right = _fast_path_compile(node.right)
+        return lambda hass: binop(left(hass), right(hass))
+
+    if isinstance(node, nodes.And):
+        left = _fast_path_compile(node.left)
+        right = _fast_path_compile(node.right)
+        return lambda hass: left(hass) and right(hass)
+
+    if isinstance(node, nodes.Or):
+        left = _fast_path_compile(node.left)
+        right = _fast_path_compile(node.right)
+        return lambda hass: left(hass) or right(hass)
+
+    if isinstance(node, nodes.Not):
+        expr = _fast_path_compile(node.node)
+        return lambda hass: not expr(hass)
+
+    if isinstance(node, nodes.Neg):
+        expr = _fast_path_compile(node.node)
+        return lambda hass: -expr(hass)
+
+    if isinstance(node, nodes.Compare):
+        return _fast_path_compile_compare(node)
+
+    if isinstance(node, nodes.Call):
+        return _fast_path_compile_call(node)
+
+    if isinstance(node, nodes.Filter):
+        return _fast_path_compile_filter(node)
+
+    raise _NoFastPath
+
+
+def _fast_path_compile_compare(
+    node: nodes.Compare,
+) -> Callable[[HomeAssistantType], Any]:
+    """Compile a chain of comparisons."""
+    first = _fast_path_compile(node.expr)
+    operands = []
+    for operand in node.ops:
+        if operand.op not in _FAST_PATH_COMPARE_OPS:
+            raise _NoFastPath
+        operands.append(
+            (_FAST_PATH_COMPARE_OPS[operand.op], _fast_path_compile(operand.expr))
+        )
+
+    def compare(hass: HomeAssistantType) -> bool:
+        left = first(hass)
+        for compare_op, expr in operands:
+            right = expr(hass)
+            if not compare_op(left, right):
+                return False
+            left = right
+        return True
+
+    return compare
+
+
+def _fast_path_compile_call(node: nodes.Call) -> Callable[[HomeAssistantType], Any]:
+    """Compile a call of one of the fast path functions."""
+    if (
+        not isinstance(node.node, nodes.Name)
+        or node.node.name not in _FAST_PATH_FUNCTIONS
+        or node.kwargs
+        or node.dyn_args
+        or node.dyn_kwargs
+    ):
+        raise _NoFastPath
+
+    func, arg_count = _FAST_PATH_FUNCTIONS[node.node.name]
+    if len(node.args) != arg_count:
+        raise _NoFastPath
+    args = [_fast_path_compile(arg) for arg in node.args]
+    return lambda hass: func(hass, *[arg(hass) for arg in args])
+
+
+def _fast_path_compile_filter(
+    node: nodes.Filter,
+) -> Callable[[HomeAssistantType], Any]:
+    """Compile a filter with the filter function of the Jinja environment."""
+    if (
+        node.name not in _FAST_PATH_FILTERS
+        or node.node is None
+        or node.dyn_args
+        or node.dyn_kwargs
+    ):
+        raise _NoFastPath
+
+    func = _NO_HASS_ENV.filters[node.name]
+    if (
+        getattr(func, "contextfilter", False)
+        or getattr(func, "evalcontextfilter", False)
+        or getattr(func, "environmentfilter", False)
+    ):
+        raise _NoFastPath
+
+    expr = _fast_path_compile(node.node)
+    args = [_fast_path_compile(arg) for arg in node.args]
+    kwargs = [(kwarg.key, _fast_path_compile(kwarg.value)) for kwarg in node.kwargs]
+    return lambda hass: func(
+        expr(hass),
+        *[arg(hass) for arg in args],
+        **{key: value(hass) for key, value in kwargs},
+    )
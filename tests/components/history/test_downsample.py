@@ -0,0 +1,47 @@
+"""Tests for the downsampling of history series."""
+import pytest
+
+from homeassistant.components.history.downsample import (
+    largest_triangle_three_buckets,
+    min_max_buckets,
+)
+
+
+def test_largest_triangle_three_buckets():
+    """Test the peaks of a series are kept."""
+    values = [0, 1, 0, 1, 9, 1, 0, 1, 0, -9, 0, 1, 0]
+    points = [(float(time), float(value)) for time, value in enumerate(values)]
+
+    kept = largest_triangle_three_buckets(points, 5)
+
+    assert len(kept) == 5
+    assert kept[0] == 0
+    assert kept[-1] == len(points) - 1
+    assert kept == sorted(kept)
+    assert 4 in kept
+    assert 9 in kept
+
+
+@pytest.mark.parametrize("threshold", [2, 13, 100])
+def test_largest_triangle_three_buckets_keeps_all(threshold):
+    """Test all points are kept when there are not more than the threshold."""
+    points = [(float(time), float(time % 3)) for time in range(13)]
+    assert largest_triangle_three_buckets(points, threshold) == list(range(13))
+
+
+def test_min_max_buckets():
+    """Test the lowest and highest point of each bucket are kept."""
+    points = [
+        (0.0, 5.0),
+        (1.0, 2.0),
+        (2.0, 8.0),
+        (3.0, 4.0),
+        (10.0, 1.0),
+        (11.0, 6.0),
+        (12.0, 3.0),
+        (25.0, 7.0),
+        (26.0, 7.0),
+    ]
+
+    assert min_max_buckets(points, 10) == [0, 1, 2, 4, 5, 7, 8]
+    assert min_max_buckets(points[:2], 10) == [0, 1]
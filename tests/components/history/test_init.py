@@ -1008,3 +1008,214 @@ async def test_entity_ids_limit_via_api_with_skip_initial_state(hass, hass_clien
     assert len(response_json) == 2
     assert response_json[0][0]["entity_id"] == "light.kitchen"
     assert response_json[1][0]["entity_id"] == "light.cow"
+
+
+async def test_stream_history_via_api(hass, hass_client):
+    """Test streaming the history in columns."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {"history": {}})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    start = dt_util.utcnow()
+    hass.states.async_set("light.kitchen", "on", {"brightness": 100})
+    hass.states.async_set("sensor.power", "1", {"unit_of_measurement": "W"})
+    await hass.async_block_till_done()
+    hass.states.async_set("light.kitchen", "off", {"brightness": 100})
+    hass.states.async_set("sensor.power", "2", {"unit_of_measurement": "W"})
+    await hass.async_block_till_done()
+    hass.states.async_set("light.kitchen", "on", {"brightness": 50})
+    hass.states.async_set("sensor.power", "3", {"unit_of_measurement": "W"})
+    await hass.async_block_till_done()
+
+    await hass.async_add_executor_job(trigger_db_commit, hass)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    client = await hass_client()
+    with patch.object(history, "HISTORY_STREAM_CHUNK_SIZE", 2):
+        response = await client.get(
+            f"/api/history/stream/{start.isoformat()}?filter_entity_id=light.kitchen,sensor.power"
+        )
+        assert response.status == 200
+        assert response.headers["Content-Type"] == history.CONTENT_TYPE_NDJSON
+        chunks = [json.loads(line) for line in (await response.text()).splitlines()]
+
+    light_states = hass.states.async_all("light")
+    assert [chunk["entity_id"] for chunk in chunks] == [
+        "light.kitchen",
+        "light.kitchen",
+        "sensor.power",
+        "sensor.power",
+    ]
+    assert chunks[0]["s"] == ["on", "off"]
+    assert chunks[0]["a"] == [[0, {"brightness": 100}]]
+    assert chunks[1]["s"] == ["on"]
+    assert chunks[1]["t"] == [light_states[0].last_updated.timestamp()]
+    assert chunks[1]["a"] == [[0, {"brightness": 50}]]
+    assert chunks[2]["s"] == ["1", "2"]
+    assert chunks[3]["s"] == ["3"]
+    assert chunks[3]["a"] == [[0, {"unit_of_measurement": "W"}]]
+
+    response = await client.get(
+        f"/api/history/stream/{start.isoformat()}?filter_entity_id=sensor.power&format=json"
+    )
+    assert response.status == 200
+    assert await response.json() == [
+        {
+            "entity_id": "sensor.power",
+            "t": chunks[2]["t"] + chunks[3]["t"],
+            "s": ["1", "2", "3"],
+            "a": [[0, {"unit_of_measurement": "W"}]],
+        }
+    ]
+
+
+async def test_stream_history_includes_start_time_state(hass, hass_client):
+    """Test the stream starts with the states at the start time."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {"history": {}})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    hass.states.async_set("light.kitchen", "on")
+    hass.states.async_set("light.cow", "on")
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(trigger_db_commit, hass)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    start = dt_util.utcnow()
+    hass.states.async_set("light.cow", "off")
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(trigger_db_commit, hass)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    client = await hass_client()
+    response = await client.get(
+        f"/api/history/stream/{start.isoformat()}?filter_entity_id=light.kitchen,light.cow"
+    )
+    assert response.status == 200
+    chunks = [json.loads(line) for line in (await response.text()).splitlines()]
+    assert [(chunk["entity_id"], chunk["s"]) for chunk in chunks] == [
+        ("light.cow", ["on", "off"]),
+        ("light.kitchen", ["on"]),
+    ]
+    assert chunks[0]["t"][0] == start.timestamp()
+    assert chunks[1]["t"] == [start.timestamp()]
+
+    response = await client.get(
+        f"/api/history/stream/{dt_util.utcnow().isoformat()}?filter_entity_id=light.kitchen&skip_initial_state"
+    )
+    assert response.status == 200
+    assert await response.text() == ""
+
+
+async def test_downsample_history_via_api(hass, hass_client):
+    """Test reducing the numeric history of an entity."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {"history": {}})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    start = dt_util.utcnow()
+    values = ["1", "2", "30", "2", "unavailable", "1", "2", "-40", "2", "1", "3"]
+    for value in values:
+        hass.states.async_set("sensor.power", value)
+        await hass.async_block_till_done()
+    await hass.async_add_executor_job(trigger_db_commit, hass)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    client = await hass_client()
+    url = f"/api/history/period/{start.isoformat()}?filter_entity_id=sensor.power&minimal_response"
+    response = await client.get(url)
+    assert response.status == 200
+    assert [state["state"] for state in (await response.json())[0]] == values
+
+    response = await client.get(f"{url}&max_points=5")
+    assert response.status == 200
+    assert [state["state"] for state in (await response.json())[0]] == [
+        "1",
+        "30",
+        "2",
+        "unavailable",
+        "-40",
+        "3",
+    ]
+
+    response = await client.get(
+        f"/api/history/stream/{start.isoformat()}?filter_entity_id=sensor.power&max_points=5"
+    )
+    assert response.status == 200
+    assert json.loads(await response.text())["s"] == [
+        "1",
+        "30",
+        "2",
+        "unavailable",
+        "-40",
+        "3",
+    ]
+
+    for query in ("max_points=2", "max_points=x", "bucket_width=0", "bucket_width=x"):
+        response = await client.get(f"{url}&{query}")
+        assert response.status == 400
+
+    response = await client.get(f"{url}&max_points=5&bucket_width=60")
+    assert response.status == 400
+
+
+async def test_history_cache(hass):
+    """Test the history of recent states is read from the history cache."""
+    await hass.async_add_executor_job(
+        init_recorder_component, hass, {"history_cache": {"max_states": 4}}
+    )
+    await async_setup_component(hass, "history", {"history": {}})
+    instance = hass.data[recorder.DATA_INSTANCE]
+    await hass.async_add_executor_job(instance.block_till_done)
+
+    start = dt_util.utcnow()
+    for value in ("1", "2", "3"):
+        hass.states.async_set("sensor.power", value)
+        await hass.async_block_till_done()
+    hass.states.async_set("light.kitchen", "on")
+    hass.states.async_set("light.kitchen", "on", {"brightness": 100})
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(trigger_db_commit, hass)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(instance.block_till_done)
+
+    def get_history():
+        return {
+            "significant": history.get_significant_states(
+                hass, start, entity_ids=["sensor.power", "light.kitchen"]
+            ),
+            "changes": history.state_changes_during_period(
+                hass, start, entity_id="sensor.power"
+            ),
+            "last": history.get_last_state_changes(hass, 2, "sensor.power"),
+            "all_last": history.get_last_state_changes(hass, 3, "sensor.power"),
+            "initial": history.get_significant_states(
+                hass, dt_util.utcnow(), entity_ids=["light.kitchen"]
+            ),
+        }
+
+    # sensor.power 1 was evicted and is read from the database
+    assert [
+        state.state for state in instance.history_cache.states(["sensor.power"])
+    ] == ["2", "3"]
+    with patch.object(
+        history, "_significant_states_query", wraps=history._significant_states_query
+    ) as query:
+        cached = await hass.async_add_executor_job(get_history)
+    assert query.call_count == 1
+
+    instance.history_cache = None
+    uncached = await hass.async_add_executor_job(get_history)
+
+    assert cached == uncached
+    assert [state.state for state in cached["significant"]["sensor.power"]] == [
+        "1",
+        "2",
+        "3",
+    ]
+    assert [state.state for state in cached["last"]["sensor.power"]] == ["2", "3"]
+    assert cached["initial"]["light.kitchen"][0].attributes == {"brightness": 100}
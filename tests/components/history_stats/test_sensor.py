@@ -258,6 +258,74 @@ class TestHistoryStatsSensor(unittest.TestCase):
         assert sensor3.state == 2
         assert sensor4.state == 50
 
+    def test_measure_incrementally(self):
+        """Test the state changes are counted without querying the history."""
+        start_time = dt_util.utcnow().replace(microsecond=0) - timedelta(hours=1)
+        t0 = start_time + timedelta(minutes=20)
+        t1 = dt_util.utcnow() - timedelta(minutes=10)
+
+        fake_states = {
+            "binary_sensor.test_id": [
+                ha.State("binary_sensor.test_id", "on", last_changed=t0)
+            ]
+        }
+        start = Template(f"{{{{ {start_time.timestamp()} }}}}", self.hass)
+        end = Template("{{ now() }}", self.hass)
+
+        sensor1 = HistoryStatsSensor(
+            self.hass, "binary_sensor.test_id", ["on"], start, end, None, "time", "Test"
+        )
+
+        with patch(
+            "homeassistant.components.history.state_changes_during_period",
+            return_value=fake_states,
+        ) as state_changes, patch(
+            "homeassistant.components.history.get_state", return_value=None
+        ):
+            sensor1.update()
+            assert sensor1.state == pytest.approx(2 / 3, abs=0.01)
+            assert sensor1.count == 1
+
+            sensor1._async_record_state_change(
+                ha.State("binary_sensor.test_id", "off", None, t1, t1), t1
+            )
+            # Attribute changes are ignored
+            sensor1._async_record_state_change(
+                ha.State(
+                    "binary_sensor.test_id",
+                    "on",
+                    last_changed=t0,
+                    last_updated=t1 + timedelta(minutes=1),
+                ),
+                t1,
+            )
+            sensor1.update()
+            assert sensor1.state == 0.5
+            assert sensor1.count == 1
+
+            sensor1._async_record_state_change(None, t1 + timedelta(minutes=2))
+            sensor1._async_record_state_change(
+                ha.State(
+                    "binary_sensor.test_id",
+                    "on",
+                    None,
+                    t1 + timedelta(minutes=5),
+                    t1 + timedelta(minutes=5),
+                ),
+                t1 + timedelta(minutes=5),
+            )
+            sensor1.update()
+            assert sensor1.state == pytest.approx(0.5 + 5 / 60, abs=0.01)
+            assert sensor1.count == 2
+            assert state_changes.call_count == 1
+
+            # The period moved, the history is queried again
+            sensor1._start = Template(f"{{{{ {t0.timestamp()} }}}}", self.hass)
+            sensor1.update()
+            assert state_changes.call_count == 2
+            assert sensor1.state == pytest.approx(2 / 3, abs=0.01)
+            assert sensor1.count == 1
+
     def test_wrong_date(self):
         """Test when start or end value is not a timestamp or a date."""
         good = Template("{{ now() }}", self.hass)
@@ -218,6 +218,36 @@ async def test_if_fires_on_event_with_nested_data(hass, calls):
     assert len(calls) == 1
 
 
+async def test_if_fires_on_any_event_with_data(hass, calls):
+    """Test the firing of a trigger on all event types with data."""
+    assert await async_setup_component(
+        hass,
+        automation.DOMAIN,
+        {
+            automation.DOMAIN: {
+                "trigger": {
+                    "platform": "event",
+                    "event_type": "*",
+                    "event_data": {"some_attr": "some_value"},
+                },
+                "action": {"service": "test.automation"},
+            }
+        },
+    )
+
+    hass.bus.async_fire("test_event", {"some_attr": "some_value"})
+    await hass.async_block_till_done()
+    assert len(calls) == 1
+
+    hass.bus.async_fire("other_event", {"some_attr": "some_value"})
+    await hass.async_block_till_done()
+    assert len(calls) == 2
+
+    hass.bus.async_fire("test_event", {"some_attr": "some_other_value"})
+    await hass.async_block_till_done()
+    assert len(calls) == 2
+
+
 async def test_if_not_fires_if_event_data_not_matches(hass, calls):
     """Test firing of event if no data match."""
     assert await async_setup_component(
@@ -1801,6 +1801,53 @@ async def test_empty_config(hass, hass_client):
     _assert_entry(entries[1], name="blu", entity_id=entity_id)
 
 
+async def test_logbook_entity_filter_compact_and_spaced_rows(hass, hass_client):
+    """Test the entity filter matches event data with and without spaces.
+
+    The recorder writes compact JSON, older rows have a space after the colon.
+    """
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "logbook", {})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    hass.bus.async_fire(
+        logbook.EVENT_LOGBOOK_ENTRY,
+        {ATTR_NAME: "Compact", logbook.ATTR_MESSAGE: "on", ATTR_ENTITY_ID: "switch.a"},
+    )
+    await _async_commit_and_wait(hass)
+    with patch(
+        "homeassistant.components.recorder.models.json_dumps",
+        lambda obj: json.dumps(obj, cls=JSONEncoder),
+    ):
+        hass.bus.async_fire(
+            logbook.EVENT_LOGBOOK_ENTRY,
+            {
+                ATTR_NAME: "Spaced",
+                logbook.ATTR_MESSAGE: "on",
+                ATTR_ENTITY_ID: "switch.a",
+            },
+        )
+        await _async_commit_and_wait(hass)
+
+    client = await hass_client()
+    start = dt_util.utcnow().date()
+    start_date = datetime(start.year, start.month, start.day) - timedelta(hours=24)
+    end_time = start + timedelta(hours=48)
+    response = await client.get(
+        f"/api/logbook/{start_date.isoformat()}?end_time={end_time}&entity=switch.a"
+    )
+    assert response.status == 200
+    assert [entry["name"] for entry in await response.json()] == ["Compact", "Spaced"]
+
+    for data in (
+        '{"entity_id":"switch.a","domain":"switch","icon":"mdi:a"}',
+        '{"entity_id": "switch.a", "domain": "switch", "icon": "mdi:a"}',
+    ):
+        assert logbook.ENTITY_ID_JSON_EXTRACT.search(data).group(1) == "switch.a"
+        assert logbook.DOMAIN_JSON_EXTRACT.search(data).group(1) == "switch"
+        assert logbook.ICON_JSON_EXTRACT.search(data).group(1) == "mdi:a"
+
+
 async def _async_fetch_logbook(client):
 
     # Today time 00:00:00
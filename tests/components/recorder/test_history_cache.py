@@ -0,0 +1,130 @@
+"""The tests for the recorder history cache."""
+from datetime import timedelta
+
+import pytest
+import voluptuous as vol
+
+from homeassistant.components.recorder.history_cache import (
+    HISTORY_CACHE_SCHEMA,
+    CachedState,
+    HistoryCache,
+)
+from homeassistant.components.recorder.models import parse_numeric_state
+import homeassistant.util.dt as dt_util
+
+START = 1614600000
+
+
+def _state(entity_id, state, seconds):
+    """Return a cached state updated seconds after start."""
+    return CachedState(
+        entity_id.split(".")[0],
+        entity_id,
+        state,
+        parse_numeric_state(state),
+        "{}",
+        START,
+        START + seconds,
+    )
+
+
+def _cache(window=timedelta(hours=1), max_states=100):
+    """Return a cache recording since start."""
+    cache = HistoryCache(window, max_states)
+    cache.reset(dt_util.utc_from_timestamp(START))
+    return cache
+
+
+def test_schema():
+    """Test the defaults and limits of the configuration."""
+    config = HISTORY_CACHE_SCHEMA({})
+    assert config == {"window": timedelta(hours=6), "max_states": 100000}
+    with pytest.raises(vol.Invalid):
+        HISTORY_CACHE_SCHEMA({"max_states": 0})
+
+
+def test_states_ordered_by_entity_and_time():
+    """Test the cached states of several entities."""
+    cache = _cache()
+    cache.add(_state("sensor.b", "1", 1))
+    cache.add(_state("sensor.a", "2", 2))
+    cache.add(_state("sensor.b", "3", 3))
+
+    assert [state.state for state in cache.states(["sensor.b", "sensor.a"])] == [
+        "2",
+        "1",
+        "3",
+    ]
+    assert cache.states(["sensor.c"]) == []
+    assert cache.covered_from(["sensor.a", "sensor.c"]) == START
+
+
+def test_evict_outside_window():
+    """Test states older than the window are evicted."""
+    cache = _cache(window=timedelta(seconds=10))
+    cache.add(_state("sensor.a", "1", 1))
+    cache.add(_state("sensor.b", "2", 5))
+    cache.add(_state("sensor.a", "3", 12))
+
+    assert [state.state for state in cache.states(["sensor.a", "sensor.b"])] == [
+        "3",
+        "2",
+    ]
+    assert cache.covered_from(["sensor.b"]) == START
+    assert cache.covered_from(["sensor.a"]) == pytest.approx(START + 1, abs=1e-5)
+    assert cache.covered_from(["sensor.a"]) > START + 1
+    assert cache.covered_from(["sensor.a", "sensor.b"]) > START + 1
+
+
+def test_evict_over_max_states():
+    """Test the oldest states are evicted when there are too many."""
+    cache = _cache(max_states=2)
+    for seconds in range(4):
+        cache.add(_state("sensor.a", str(seconds), seconds))
+
+    assert [state.state for state in cache.states(["sensor.a"])] == ["2", "3"]
+    assert START + 1 < cache.covered_from(["sensor.a"]) < START + 2
+
+
+def test_state_before():
+    """Test the state at a point in time is only known when it is covered."""
+    cache = _cache(max_states=2)
+    cache.add(_state("sensor.a", "1", 1))
+    cache.add(_state("sensor.a", "2", 2))
+
+    def state_before(seconds):
+        state = cache.state_before(
+            "sensor.a", dt_util.utc_from_timestamp(START + seconds)
+        )
+        return state and state.state
+
+    assert state_before(1) is None
+    assert state_before(1.5) == "1"
+    assert state_before(3) == "2"
+    assert cache.state_before("sensor.b", dt_util.utc_from_timestamp(START + 3)) is None
+
+    cache.add(_state("sensor.a", "3", 3))
+    # The state before 1.5 was evicted
+    assert state_before(1.5) is None
+    assert state_before(2.5) == "2"
+
+
+def test_evict_before():
+    """Test a purge stops covering the purged states."""
+    cache = _cache()
+    cache.add(_state("sensor.a", "1", 1))
+    cache.add(_state("sensor.b", "2", 2))
+    cache.add(_state("sensor.a", "3", 3))
+
+    cache.evict_before(dt_util.utc_from_timestamp(START + 2))
+
+    assert [state.state for state in cache.states(["sensor.a", "sensor.b"])] == [
+        "3",
+        "2",
+    ]
+    assert cache.covered_from(["sensor.b"]) == START + 2
+    assert cache.covered_from(["sensor.c"]) == START + 2
+
+    cache.reset(dt_util.utc_from_timestamp(START + 5))
+    assert cache.states(["sensor.a", "sensor.b"]) == []
+    assert cache.covered_from(["sensor.a"]) == START + 5
@@ -1,29 +1,52 @@
 """The tests for the Recorder component."""
 # pylint: disable=protected-access
 from datetime import datetime, timedelta
+import math
 from unittest.mock import patch
 
+import pytest
+from sqlalchemy import event as sqlalchemy_event
 from sqlalchemy.exc import OperationalError
 
 from homeassistant.components.recorder import (
+    BACKLOG_POLICY_DROP_OLDEST,
+    BACKLOG_POLICY_PAUSE,
     CONFIG_SCHEMA,
+    DEFAULT_MAX_BACKLOG,
     DOMAIN,
+    PurgeTask,
     Recorder,
     run_information,
     run_information_from_instance,
     run_information_with_session,
 )
 from homeassistant.components.recorder.const import DATA_INSTANCE
-from homeassistant.components.recorder.models import Events, RecorderRuns, States
+from homeassistant.components.recorder.models import (
+    EventData,
+    Events,
+    EventTypes,
+    RecorderRuns,
+    StateAttributes,
+    States,
+)
 from homeassistant.components.recorder.util import session_scope
-from homeassistant.const import MATCH_ALL, STATE_LOCKED, STATE_UNLOCKED
-from homeassistant.core import Context, callback
-from homeassistant.setup import async_setup_component
+from homeassistant.const import (
+    EVENT_STATE_CHANGED,
+    MATCH_ALL,
+    STATE_LOCKED,
+    STATE_UNLOCKED,
+)
+from homeassistant.core import Context, Event, callback
+from homeassistant.setup import async_setup_component, setup_component
 from homeassistant.util import dt as dt_util
 
 from .common import wait_recording_done
 
-from tests.common import fire_time_changed, get_test_home_assistant
+from tests.common import (
+    async_init_recorder_component,
+    fire_time_changed,
+    get_test_home_assistant,
+)
 
 
 def test_saving_state(hass, hass_recorder):
@@ -47,6 +70,74 @@ def test_saving_state(hass, hass_recorder):
     assert state == _state_empty_context(hass, entity_id)
 
 
+def test_saving_state_with_nan_attribute(hass, hass_recorder):
+    """Test a state with NaN attributes and rows holding NaN are restored."""
+    hass = hass_recorder()
+
+    hass.states.set("test.nan", "on", {"value": float("nan"), "other": 1})
+    hass.bus.fire("test_event", {"value": float("inf")})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        db_state = session.query(States).filter(States.entity_id == "test.nan").one()
+        assert db_state.to_native().attributes == {"value": None, "other": 1}
+        db_event = session.query(Events).join(EventTypes)
+        db_event = db_event.filter(EventTypes.event_type == "test_event").one()
+        assert db_event.to_native().data == {"value": None}
+
+        # Written by older versions
+        db_state.state_attributes.shared_attrs = '{"value": NaN}'
+        assert math.isnan(db_state.to_native().attributes["value"])
+
+
+def test_saving_states_shares_attributes(hass, hass_recorder):
+    """Test states with the same attributes share one attributes row."""
+    hass = hass_recorder()
+
+    attributes = {"test_attr": 5, "test_attr_10": "nice"}
+    hass.states.set("test.one", "on", attributes)
+    hass.states.set("test.two", "on", attributes)
+    hass.states.set("test.one", "off", attributes)
+    wait_recording_done(hass)
+    # Served from the cache of recently written attributes
+    hass.states.set("test.two", "off", attributes)
+    hass.states.set("test.two", "off", {"test_attr": 6})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        db_states = list(session.query(States))
+        assert len(db_states) == 5
+        assert len({db_state.attributes_id for db_state in db_states}) == 2
+        assert all(db_state.attributes is None for db_state in db_states)
+        assert session.query(StateAttributes).count() == 2
+        assert db_states[0].to_native().attributes == attributes
+        assert db_states[4].to_native().attributes == {"test_attr": 6}
+
+
+def test_saving_states_serializes_shared_attributes_once(hass, hass_recorder):
+    """Test attributes shared with the previous state are not serialized."""
+    hass = hass_recorder()
+
+    attributes = {"test_attr": 5}
+    with patch(
+        "homeassistant.components.recorder.StateAttributes.from_event",
+        wraps=StateAttributes.from_event,
+    ) as from_event:
+        hass.states.set("test.one", "on", attributes)
+        hass.states.set("test.one", "off", attributes)
+        hass.states.set("test.one", "on", {"test_attr": 6})
+        wait_recording_done(hass)
+
+    assert from_event.call_count == 2
+    with session_scope(hass=hass) as session:
+        db_states = list(session.query(States))
+        assert [db_state.to_native().attributes for db_state in db_states] == [
+            attributes,
+            attributes,
+            {"test_attr": 6},
+        ]
+
+
 def test_saving_state_with_exception(hass, hass_recorder, caplog):
     """Test saving and restoring a state."""
     hass = hass_recorder()
@@ -85,6 +176,115 @@ def test_saving_state_with_exception(hass, hass_recorder, caplog):
     assert "Error saving events" not in caplog.text
 
 
+def test_saving_states_in_batches(hass, hass_recorder):
+    """Test states committed together are inserted with executemany."""
+    hass = hass_recorder()
+    engine = hass.data[DATA_INSTANCE].engine
+    inserts = []
+
+    def _record_insert(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO states "):
+            inserts.append(executemany)
+
+    sqlalchemy_event.listen(engine, "before_cursor_execute", _record_insert)
+    for idx in range(10):
+        hass.states.set(f"test.batch_{idx}", "on", {"idx": idx})
+    wait_recording_done(hass)
+    sqlalchemy_event.remove(engine, "before_cursor_execute", _record_insert)
+
+    assert inserts == [True]
+    with session_scope(hass=hass) as session:
+        state_ids = [
+            state_id
+            for (state_id,) in session.query(States.state_id).order_by(States.state_id)
+        ]
+        entity_ids = [
+            entity_id
+            for (entity_id,) in session.query(States.entity_id).order_by(
+                States.state_id
+            )
+        ]
+    assert state_ids == list(range(1, 11))
+    assert entity_ids == [f"test.batch_{idx}" for idx in range(10)]
+
+
+def test_next_ids_tracked_in_memory(hass, hass_recorder):
+    """Test the next ids are only read from the database once."""
+    hass = hass_recorder()
+    wait_recording_done(hass)
+    engine = hass.data[DATA_INSTANCE].engine
+    max_queries = []
+
+    def _record_max(conn, cursor, statement, parameters, context, executemany):
+        if "max(states.state_id)" in statement:
+            max_queries.append(statement)
+
+    hass.data[DATA_INSTANCE]._next_ids.clear()
+    sqlalchemy_event.listen(engine, "before_cursor_execute", _record_max)
+    for idx in range(3):
+        hass.states.set("test.tracked", str(idx))
+        wait_recording_done(hass)
+    sqlalchemy_event.remove(engine, "before_cursor_execute", _record_max)
+
+    assert len(max_queries) == 1
+    with session_scope(hass=hass) as session:
+        states = session.query(States).filter(States.entity_id == "test.tracked")
+        state_ids = [state.state_id for state in states.order_by(States.state_id)]
+        old_state_ids = [state.old_state_id for state in states]
+    assert old_state_ids[1:] == state_ids[:-1]
+
+
+def test_rollback_forgets_uncommitted_ids(hass, hass_recorder, caplog):
+    """Test a failed commit does not leave ids of rows that were not written."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    hass.states.set("test.rollback", "on")
+    wait_recording_done(hass)
+
+    with patch.object(instance.event_session, "commit", side_effect=ValueError("Boom")):
+        hass.states.set("test.rollback", "off")
+        wait_recording_done(hass)
+
+    assert "Error saving events" in caplog.text
+    assert "test.rollback" not in instance._old_states
+    assert instance._next_ids == {}
+
+    hass.states.set("test.rollback", "on")
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = (
+            session.query(States)
+            .filter(States.entity_id == "test.rollback")
+            .order_by(States.state_id)
+        )
+        assert [(state.state, state.old_state_id) for state in states] == [
+            ("on", None),
+            ("on", None),
+        ]
+
+
+def test_saving_commits_when_too_many_events_pending(hass, hass_recorder):
+    """Test the recorder commits early when many events are waiting."""
+    hass = hass_recorder()
+    wait_recording_done(hass)
+
+    with patch("homeassistant.components.recorder.MAX_PENDING_EVENTS", 2), patch.object(
+        hass.data[DATA_INSTANCE],
+        "_commit_event_session_or_retry",
+        wraps=hass.data[DATA_INSTANCE]._commit_event_session_or_retry,
+    ) as commit_mock:
+        hass.data[DATA_INSTANCE].commit_interval = 1000
+        for idx in range(4):
+            hass.bus.fire("test_event", {"idx": idx})
+        wait_recording_done(hass)
+
+    assert commit_mock.call_count == 2
+    with session_scope(hass=hass) as session:
+        db_events = session.query(Events).join(Events.event_type_rel)
+        assert db_events.filter(EventTypes.event_type == "test_event").count() == 4
+
+
 def test_saving_event(hass, hass_recorder):
     """Test saving and restoring an event."""
     hass = hass_recorder()
@@ -112,7 +312,11 @@ def test_saving_event(hass, hass_recorder):
     hass.data[DATA_INSTANCE].block_till_done()
 
     with session_scope(hass=hass) as session:
-        db_events = list(session.query(Events).filter_by(event_type=event_type))
+        db_events = list(
+            session.query(Events)
+            .join(EventTypes)
+            .filter(EventTypes.event_type == event_type)
+        )
         assert len(db_events) == 1
         db_event = db_events[0].to_native()
 
@@ -126,6 +330,47 @@ def test_saving_event(hass, hass_recorder):
     )
 
 
+def test_saving_events_shares_types_and_data(hass, hass_recorder):
+    """Test events share event types and event data rows."""
+    hass = hass_recorder()
+
+    hass.bus.fire("test_event", {"test_attr": 5})
+    hass.bus.fire("test_event", {"test_attr": 5})
+    hass.bus.fire("test_event")
+    wait_recording_done(hass)
+    # Served from the cache of recently written types and data
+    hass.bus.fire("test_event", {"test_attr": 5})
+    hass.bus.fire("test_event", {"test_attr": 6})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        db_events = list(
+            session.query(Events)
+            .join(EventTypes)
+            .filter(EventTypes.event_type == "test_event")
+        )
+        assert len(db_events) == 5
+        assert len({db_event.event_type_id for db_event in db_events}) == 1
+        assert all(db_event.event_type is None for db_event in db_events)
+        assert all(db_event.event_data is None for db_event in db_events)
+        assert db_events[2].data_id is None
+        assert len({db_event.data_id for db_event in db_events}) == 3
+        assert (
+            session.query(EventTypes)
+            .filter(EventTypes.event_type == "test_event")
+            .count()
+            == 1
+        )
+        assert session.query(EventData).count() >= 2
+        assert [db_event.to_native().data for db_event in db_events] == [
+            {"test_attr": 5},
+            {"test_attr": 5},
+            {},
+            {"test_attr": 5},
+            {"test_attr": 6},
+        ]
+
+
 def _add_entities(hass, entity_ids):
     """Add entities."""
     attributes = {"test_attr": 5, "test_attr_10": "nice"}
@@ -318,20 +563,173 @@ def test_recorder_setup_failure():
             hass,
             auto_purge=True,
             keep_days=7,
+            keep_days_domains={},
+            keep_days_entities={},
             commit_interval=1,
             uri="sqlite://",
             db_max_retries=10,
             db_retry_wait=3,
+            db_read_concurrency=1,
             entity_filter=CONFIG_SCHEMA({DOMAIN: {}}),
             exclude_t=[],
             db_integrity_check=False,
+            max_backlog=DEFAULT_MAX_BACKLOG,
+            backlog_policy=BACKLOG_POLICY_DROP_OLDEST,
+            backlog_critical_domains=[],
+            throttle=None,
+            history_cache=None,
         )
         rec.start()
         rec.join()
 
+    assert rec.read_executor_closed
     hass.stop()
 
 
+def _backlog_recorder(hass, policy, critical_domains=()):
+    """Return a recorder that is not started with a backlog of 2."""
+    return Recorder(
+        hass,
+        auto_purge=True,
+        keep_days=7,
+        keep_days_domains={},
+        keep_days_entities={},
+        commit_interval=1,
+        uri="sqlite://",
+        db_max_retries=10,
+        db_retry_wait=3,
+        db_read_concurrency=1,
+        entity_filter=CONFIG_SCHEMA({DOMAIN: {}}),
+        exclude_t=[],
+        db_integrity_check=False,
+        max_backlog=2,
+        backlog_policy=policy,
+        backlog_critical_domains=list(critical_domains),
+        throttle=None,
+        history_cache=None,
+    )
+
+
+def _drain(rec):
+    """Return everything waiting in the recorder queue."""
+    items = []
+    while not rec.queue.empty():
+        items.append(rec.queue.get_nowait())
+    return items
+
+
+async def test_backlog_drop_oldest(caplog):
+    """Test the oldest events are dropped when the backlog is full."""
+    rec = _backlog_recorder(None, BACKLOG_POLICY_DROP_OLDEST)
+    events = [Event("test_event", {"idx": idx}) for idx in range(4)]
+    purge_task = PurgeTask(7, False)
+
+    rec.queue.put(purge_task)
+    for event in events:
+        rec.event_listener(event)
+
+    assert rec.backlog_exceeded
+    assert rec.dropped_events == 3
+    assert rec.backlog == 2
+    assert "The recorder backlog reached 2 events" in caplog.text
+    assert _drain(rec) == [purge_task, events[3]]
+
+    rec.event_listener(events[0])
+    assert not rec.backlog_exceeded
+    assert rec.backlog_info()["dropped_events"] == 3
+    assert _drain(rec) == [events[0]]
+
+
+async def test_backlog_drop_oldest_keeps_task_order():
+    """Test dropping events does not move the tasks behind later events."""
+    rec = _backlog_recorder(None, BACKLOG_POLICY_DROP_OLDEST)
+    events = [Event("test_event", {"idx": idx}) for idx in range(3)]
+
+    rec.queue.put(None)
+    rec.queue.put(events[0])
+    rec.queue.put(events[1])
+    rec.event_listener(events[2])
+
+    assert rec.dropped_events == 1
+    assert _drain(rec) == [None, events[1], events[2]]
+
+
+async def test_backlog_pause_non_critical_domains():
+    """Test only critical domains are queued when the backlog is full."""
+    rec = _backlog_recorder(None, BACKLOG_POLICY_PAUSE, ["lock"])
+    filler = [Event("test_event"), Event("test_event")]
+    lock_event = Event(EVENT_STATE_CHANGED, {"entity_id": "lock.front_door"})
+    light_event = Event(EVENT_STATE_CHANGED, {"entity_id": "light.kitchen"})
+    other_event = Event("call_service", {"domain": "light"})
+
+    for event in (*filler, lock_event, light_event, other_event):
+        rec.event_listener(event)
+
+    assert rec.backlog_exceeded
+    assert rec.dropped_events == 1
+    assert _drain(rec) == [*filler, lock_event, other_event]
+
+
+async def test_backlog_pause_limit():
+    """Test the pause policy drops the oldest events past its limit."""
+    rec = _backlog_recorder(None, BACKLOG_POLICY_PAUSE)
+    events = [Event("test_event", {"idx": idx}) for idx in range(6)]
+    purge_task = PurgeTask(7, False)
+
+    rec.queue.put(purge_task)
+    for event in events:
+        rec.event_listener(event)
+
+    assert rec.backlog == 4
+    assert rec.dropped_events == 3
+    assert _drain(rec) == [purge_task, *events[3:]]
+
+
+async def test_backlog_drop_oldest_only_tasks():
+    """Test a new event is dropped when only tasks are queued."""
+    rec = _backlog_recorder(None, BACKLOG_POLICY_DROP_OLDEST)
+    tasks = [PurgeTask(7, False), None]
+
+    for task in tasks:
+        rec.queue.put(task)
+    rec.event_listener(Event("test_event"))
+
+    assert rec.dropped_events == 1
+    assert _drain(rec) == tasks
+
+
+def test_backlog_metrics(hass_recorder):
+    """Test the recorder reports its metrics after a commit."""
+    hass = hass_recorder()
+
+    hass.states.set("test.metrics", "on")
+    wait_recording_done(hass)
+
+    info = hass.data[DATA_INSTANCE].backlog_info()
+    assert info["backlog"] == 0
+    assert info["max_backlog"] == DEFAULT_MAX_BACKLOG
+    assert info["backlog_exceeded"] is False
+    assert info["backlog_policy"] == BACKLOG_POLICY_DROP_OLDEST
+    assert info["dropped_events"] == 0
+    assert info["event_lag"] >= 0
+    assert info["commit_latency"] >= 0
+    assert info["rows_per_commit"] >= 2
+
+
+async def test_websocket_backlog_info(hass, hass_ws_client):
+    """Test the websocket command returns the backlog metrics."""
+    await async_init_recorder_component(hass)
+    client = await hass_ws_client(hass)
+
+    await client.send_json({"id": 5, "type": "recorder/backlog_info"})
+    msg = await client.receive_json()
+
+    assert msg["success"]
+    assert msg["result"]["backlog"] >= 0
+    assert msg["result"]["max_backlog"] == DEFAULT_MAX_BACKLOG
+    assert msg["result"]["backlog_policy"] == BACKLOG_POLICY_DROP_OLDEST
+
+
 async def test_defaults_set(hass):
     """Test the config defaults are set."""
     recorder_config = None
@@ -488,3 +886,27 @@ def test_run_information(hass_recorder):
 
 class CannotSerializeMe:
     """A class that the JSONEncoder cannot serialize."""
+
+
+def test_read_connection(tmpdir):
+    """Test a file database is read through query only connections."""
+    hass = get_test_home_assistant()
+    db_url = f"sqlite:///{tmpdir.mkdir('test_read_connection')}/home-assistant_v2.db"
+    setup_component(
+        hass, DOMAIN, {DOMAIN: {"db_url": db_url, "db_read_concurrency": 1}}
+    )
+    hass.start()
+    wait_recording_done(hass)
+    instance = hass.data[DATA_INSTANCE]
+
+    hass.states.set("light.kitchen", "on")
+    wait_recording_done(hass)
+
+    assert instance.read_engine is not instance.engine
+    with session_scope(hass=hass, read_only=True) as session:
+        assert session.query(States.state).one() == ("on",)
+        assert session.execute("PRAGMA journal_mode").scalar() == "wal"
+        with pytest.raises(OperationalError):
+            session.execute("DELETE FROM states")
+
+    hass.stop()
@@ -1,5 +1,6 @@
 """The tests for the Recorder component."""
 # pylint: disable=protected-access
+from datetime import datetime, timezone
 from unittest.mock import call, patch
 
 import pytest
@@ -60,12 +61,173 @@ async def test_schema_migrate(hass):
         assert setup_run.called
 
 
+def test_move_states_attributes_to_shared_table():
+    """Test existing state attributes are moved to the state_attributes table."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    engine.execute(
+        models.States.__table__.insert(),
+        [
+            {
+                "entity_id": "light.kitchen",
+                "state": "on",
+                "attributes": '{"friendly_name": "Kitchen"}',
+            },
+            {
+                "entity_id": "light.kitchen",
+                "state": "off",
+                "attributes": '{"friendly_name":"Kitchen"}',
+            },
+            {"entity_id": "light.hall", "state": "on", "attributes": "{}"},
+        ],
+    )
+
+    with patch.object(migration, "MIGRATION_BATCH_SIZE", 2):
+        migration._move_states_attributes_to_shared_table(engine)
+
+    states = engine.execute(
+        "SELECT attributes, attributes_id FROM states ORDER BY state_id"
+    ).fetchall()
+    shared_attrs = dict(
+        engine.execute(
+            "SELECT attributes_id, shared_attrs FROM state_attributes"
+        ).fetchall()
+    )
+    assert len(shared_attrs) == 2
+    assert [row[0] for row in states] == [None, None, None]
+    assert states[0][1] == states[1][1]
+    assert shared_attrs[states[0][1]] == '{"friendly_name":"Kitchen"}'
+    assert shared_attrs[states[2][1]] == "{}"
+
+
+def test_set_numeric_states():
+    """Test the numeric state of existing numeric states is set."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    engine.execute(
+        models.States.__table__.insert(),
+        [
+            {"entity_id": "sensor.power", "state": "10.5"},
+            {"entity_id": "sensor.power", "state": "unavailable"},
+            {"entity_id": "sensor.power", "state": "nan"},
+            {"entity_id": "sensor.power", "state": "-3"},
+            {"entity_id": "light.kitchen", "state": "on"},
+        ],
+    )
+
+    with patch.object(migration, "MIGRATION_BATCH_SIZE", 2):
+        migration._set_numeric_states(engine)
+
+    numeric_states = [
+        row[0]
+        for row in engine.execute(
+            "SELECT numeric_state FROM states ORDER BY state_id"
+        ).fetchall()
+    ]
+    assert numeric_states == [10.5, None, None, -3.0, None]
+
+
+def test_set_states_timestamps():
+    """Test the epoch timestamps of existing states are set."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    changed = datetime(2021, 3, 1, 12, 0, tzinfo=timezone.utc)
+    updated = datetime(2021, 3, 1, 12, 30, tzinfo=timezone.utc)
+    engine.execute(
+        models.States.__table__.insert(),
+        [
+            {
+                "entity_id": "sensor.power",
+                "last_changed": changed,
+                "last_updated": changed,
+            },
+            {
+                "entity_id": "sensor.power",
+                "last_changed": changed,
+                "last_updated": updated,
+            },
+            {
+                "entity_id": "sensor.power",
+                "last_changed": updated,
+                "last_updated": updated,
+            },
+        ],
+    )
+
+    with patch.object(migration, "MIGRATION_BATCH_SIZE", 2):
+        migration._set_states_timestamps(engine)
+
+    timestamps = engine.execute(
+        "SELECT last_changed_ts, last_updated_ts FROM states ORDER BY state_id"
+    ).fetchall()
+    assert [tuple(row) for row in timestamps] == [
+        (changed.timestamp(), changed.timestamp()),
+        (changed.timestamp(), updated.timestamp()),
+        (updated.timestamp(), updated.timestamp()),
+    ]
+
+
+def test_move_events_data_to_shared_tables():
+    """Test existing event types and data are moved to the shared tables."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    engine.execute(
+        models.Events.__table__.insert(),
+        [
+            {"event_type": "call_service", "event_data": '{"entity_id": "light.a"}'},
+            {"event_type": "call_service", "event_data": '{"entity_id":"light.a"}'},
+            {"event_type": "state_changed", "event_data": "{}"},
+        ],
+    )
+
+    with patch.object(migration, "MIGRATION_BATCH_SIZE", 2):
+        migration._move_events_data_to_shared_tables(engine)
+
+    events = engine.execute(
+        "SELECT event_type, event_data, event_type_id, data_id "
+        "FROM events ORDER BY event_id"
+    ).fetchall()
+    event_types = dict(
+        engine.execute("SELECT event_type_id, event_type FROM event_types").fetchall()
+    )
+    shared_data = dict(
+        engine.execute("SELECT data_id, shared_data FROM event_data").fetchall()
+    )
+    assert [row[:2] for row in events] == [(None, None)] * 3
+    assert [event_types[row[2]] for row in events] == [
+        "call_service",
+        "call_service",
+        "state_changed",
+    ]
+    assert events[0][3] == events[1][3]
+    assert shared_data == {events[0][3]: '{"entity_id":"light.a"}'}
+    assert events[2][3] is None
+
+
 def test_invalid_update():
     """Test that an invalid new version raises an exception."""
     with pytest.raises(ValueError):
         migration._apply_update(None, -1, 0)
 
 
+def test_modify_columns():
+    """Test the column types are only changed on MySQL."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    migration._apply_update(engine, 17, 16)
+
+    with patch.object(engine.dialect, "name", "mysql"), patch.object(
+        engine, "execute"
+    ) as execute:
+        migration._modify_columns(
+            engine, "statistics", ["sum DOUBLE PRECISION", "max DOUBLE PRECISION"]
+        )
+    assert str(execute.call_args[0][0]) == (
+        "ALTER TABLE statistics MODIFY sum DOUBLE PRECISION, "
+        "MODIFY max DOUBLE PRECISION"
+    )
+
+
 def test_forgiving_add_column():
     """Test that add column will continue if column exists."""
     engine = create_engine("sqlite://", poolclass=StaticPool)
@@ -8,8 +8,11 @@ from sqlalchemy.orm import scoped_session, sessionmaker
 
 from homeassistant.components.recorder.models import (
     Base,
+    EventData,
     Events,
+    EventTypes,
     RecorderRuns,
+    StateAttributes,
     States,
     process_timestamp,
     process_timestamp_to_utc_isoformat,
@@ -24,7 +27,20 @@ import homeassistant.util.dt as dt_util
 def test_from_event_to_db_event():
     """Test converting event to db event."""
     event = ha.Event("test_event", {"some_data": 15})
-    assert event == Events.from_event(event).to_native()
+    db_event = Events.from_event(event)
+    db_event.event_type_rel = EventTypes(event_type=event.event_type)
+    db_event.event_data_rel = EventData.from_event(event)
+    assert event == db_event.to_native()
+
+
+def test_from_event_to_db_event_data():
+    """Test converting event to db event data."""
+    event = ha.Event("test_event", {"some_data": 15})
+    dbevent_data = EventData.from_event(event)
+    assert dbevent_data.to_native() == {"some_data": 15}
+    assert dbevent_data.hash == EventData.hash_shared_data(dbevent_data.shared_data)
+
+    assert EventData.from_event(ha.Event("test_event")) is None
 
 
 def test_from_event_to_db_state():
@@ -41,6 +57,69 @@ def test_from_event_to_db_state():
     assert state == States.from_event(event).to_native()
 
 
+def test_from_event_to_db_state_numeric_state():
+    """Test numeric states are also stored as a number."""
+    for state, numeric_state in (
+        ("18", 18.0),
+        ("-0.5", -0.5),
+        ("on", None),
+        ("nan", None),
+        ("inf", None),
+    ):
+        event = ha.Event(
+            EVENT_STATE_CHANGED,
+            {
+                "entity_id": "sensor.test",
+                "old_state": None,
+                "new_state": ha.State("sensor.test", state),
+            },
+        )
+        assert States.from_event(event).numeric_state == numeric_state
+
+    removed = ha.Event(
+        EVENT_STATE_CHANGED, {"entity_id": "sensor.test", "new_state": None}
+    )
+    assert States.from_event(removed).numeric_state is None
+
+
+def test_from_event_to_db_state_timestamps():
+    """Test the timestamps are also stored as epoch floats."""
+    state = ha.State("sensor.test", "on")
+    event = ha.Event(
+        EVENT_STATE_CHANGED,
+        {"entity_id": "sensor.test", "old_state": None, "new_state": state},
+    )
+    dbstate = States.from_event(event)
+    assert dbstate.last_changed_ts == state.last_changed.timestamp()
+    assert dbstate.last_updated_ts == state.last_updated.timestamp()
+
+    removed = ha.Event(
+        EVENT_STATE_CHANGED, {"entity_id": "sensor.test", "new_state": None}
+    )
+    dbstate = States.from_event(removed)
+    assert dbstate.last_updated_ts == removed.time_fired.timestamp()
+
+
+def test_from_event_to_db_state_attributes():
+    """Test converting event to db state attributes."""
+    attrs = {"this_attr": True}
+    state = ha.State("sensor.temperature", "18", attrs)
+    event = ha.Event(
+        EVENT_STATE_CHANGED,
+        {"entity_id": "sensor.temperature", "old_state": None, "new_state": state},
+        context=state.context,
+    )
+    dbstate_attributes = StateAttributes.from_event(event)
+    assert dbstate_attributes.to_native() == attrs
+    assert dbstate_attributes.hash == StateAttributes.hash_shared_attrs(
+        dbstate_attributes.shared_attrs
+    )
+
+    dbstate = States.from_event(event)
+    dbstate.state_attributes = dbstate_attributes
+    assert dbstate.to_native().attributes == attrs
+
+
 def test_from_event_to_delete_state():
     """Test converting deleting state event to db state."""
     event = ha.Event(
@@ -210,9 +289,18 @@ async def test_event_to_db_model():
     event = ha.Event(
         "state_changed", {"some": "attr"}, ha.EventOrigin.local, dt_util.utcnow()
     )
-    native = Events.from_event(event).to_native()
-    assert native == event
+    db_event = Events.from_event(event)
+    db_event.event_type_rel = EventTypes(event_type=event.event_type)
+    db_event.event_data_rel = EventData.from_event(event)
+    assert db_event.to_native() == event
 
-    native = Events.from_event(event, event_data="{}").to_native()
+    # Events without shared data have no data
+    db_event.event_data_rel = None
     event.data = {}
-    assert native == event
+    assert db_event.to_native() == event
+
+    # Events recorded before the shared tables were added
+    db_event = Events.from_event(event)
+    db_event.event_type = event.event_type
+    db_event.event_data = "{}"
+    assert db_event.to_native() == event
@@ -5,7 +5,14 @@ from unittest.mock import patch
 
 from homeassistant.components import recorder
 from homeassistant.components.recorder.const import DATA_INSTANCE
-from homeassistant.components.recorder.models import Events, RecorderRuns, States
+from homeassistant.components.recorder.models import (
+    EventData,
+    Events,
+    EventTypes,
+    RecorderRuns,
+    StateAttributes,
+    States,
+)
 from homeassistant.components.recorder.purge import purge_old_data
 from homeassistant.components.recorder.util import session_scope
 from homeassistant.util import dt as dt_util
@@ -13,6 +20,7 @@ from homeassistant.util import dt as dt_util
 from .common import wait_recording_done
 
 
+@patch("homeassistant.components.recorder.purge.MAX_ROWS_TO_PURGE", 2)
 def test_purge_old_states(hass, hass_recorder):
     """Test deleting old states."""
     hass = hass_recorder()
@@ -37,6 +45,37 @@ def test_purge_old_states(hass, hass_recorder):
         assert states.count() == 2
 
 
+@patch("homeassistant.components.recorder.purge.MAX_ROWS_TO_PURGE", 2)
+def test_purge_old_states_attributes(hass, hass_recorder):
+    """Test deleting old states removes attributes no state uses anymore."""
+    hass = hass_recorder()
+    _add_test_states_with_shared_attributes(hass)
+
+    with session_scope(hass=hass) as session:
+        states = session.query(States)
+        state_attributes = session.query(StateAttributes)
+        assert states.count() == 6
+        assert state_attributes.count() == 2
+
+        finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+        assert not finished
+        assert states.count() == 4
+        assert state_attributes.count() == 1
+
+        finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+        assert not finished
+        assert states.count() == 2
+        # Still used by the states that are kept
+        assert state_attributes.count() == 1
+
+        finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+        assert finished
+        assert states.count() == 2
+        assert state_attributes.count() == 1
+        assert states.first().to_native().attributes == {"shared": True}
+
+
+@patch("homeassistant.components.recorder.purge.MAX_ROWS_TO_PURGE", 2)
 def test_purge_old_events(hass, hass_recorder):
     """Test deleting old events."""
     hass = hass_recorder()
@@ -61,6 +100,129 @@ def test_purge_old_events(hass, hass_recorder):
         assert events.count() == 2
 
 
+@patch("homeassistant.components.recorder.purge.MAX_ROWS_TO_PURGE", 2)
+def test_purge_old_events_data(hass, hass_recorder):
+    """Test deleting old events removes event data no event uses anymore."""
+    hass = hass_recorder()
+    _add_test_events_with_shared_data(hass)
+
+    with session_scope(hass=hass) as session:
+        events = session.query(Events).filter(Events.event_type_id.isnot(None))
+        event_data = session.query(EventData)
+        assert events.count() == 6
+        assert event_data.count() == 2
+
+        finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+        assert not finished
+        assert events.count() == 4
+        assert event_data.count() == 1
+
+        finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+        assert not finished
+        assert events.count() == 2
+        # Still used by the events that are kept
+        assert event_data.count() == 1
+
+        finished = purge_old_data(hass.data[DATA_INSTANCE], 4, repack=False)
+        assert finished
+        assert events.count() == 2
+        assert events.first().to_native().data == {"shared": True}
+
+
+def test_purge_with_retention_rules(hass, hass_recorder):
+    """Test entity and domain retention rules override purge_keep_days."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    instance.keep_days_domains = {"sensor": 2}
+    instance.keep_days_entities = {"sensor.keep": 30, "light.noisy": 1}
+    _add_test_states_for_retention(hass)
+
+    with session_scope(hass=hass) as session:
+        assert purge_old_data(instance, 10, repack=False)
+
+        remaining = {
+            (entity_id, days)
+            for entity_id, days in session.query(States.entity_id, States.state)
+        }
+        assert remaining == {
+            ("sensor.power", "0"),
+            ("sensor.keep", "0"),
+            ("sensor.keep", "5"),
+            ("sensor.keep", "20"),
+            ("light.kitchen", "0"),
+            ("light.kitchen", "5"),
+            ("light.noisy", "0"),
+        }
+
+        # The events of the states that are kept longer are kept as well
+        one_day_ago = dt_util.utcnow() - timedelta(days=1)
+        old_event_ids = {
+            event_id
+            for (event_id,) in session.query(Events.event_id).filter(
+                Events.time_fired < one_day_ago
+            )
+        }
+        assert old_event_ids == {
+            event_id
+            for (event_id,) in session.query(States.event_id).filter(
+                States.last_updated < one_day_ago
+            )
+        }
+        assert len(old_event_ids) == 3
+
+
+@patch("homeassistant.components.recorder.purge.MAX_ROWS_TO_PURGE", 2)
+def test_purge_in_chunks(hass, hass_recorder):
+    """Test the purge deletes in chunks and keeps the newest states."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    _add_test_states_for_retention(hass)
+
+    with session_scope(hass=hass) as session:
+        runs = 1
+        while not purge_old_data(instance, 4, repack=False):
+            runs += 1
+        assert runs > 2
+        assert {state for (state,) in session.query(States.state)} == {"0"}
+
+
+def _add_test_states_for_retention(hass):
+    """Add states of 0, 5 and 20 days ago with their events to the db."""
+    now = dt_util.utcnow()
+
+    hass.block_till_done()
+    instance = hass.data[DATA_INSTANCE]
+    instance.block_till_done()
+    wait_recording_done(hass)
+
+    with recorder.session_scope(hass=hass) as session:
+        for entity_id in (
+            "sensor.power",
+            "sensor.keep",
+            "light.kitchen",
+            "light.noisy",
+        ):
+            for days in (0, 5, 20):
+                timestamp = now - timedelta(days=days)
+                event = Events(
+                    origin="LOCAL",
+                    time_fired=timestamp,
+                    event_type_rel=EventTypes(event_type="state_changed"),
+                )
+                session.add(event)
+                session.add(
+                    States(
+                        entity_id=entity_id,
+                        domain=entity_id.split(".")[0],
+                        state=str(days),
+                        last_changed=timestamp,
+                        last_updated=timestamp,
+                        created=timestamp,
+                        event=event,
+                    )
+                )
+
+
 def test_purge_old_recorder_runs(hass, hass_recorder):
     """Test deleting old recorder runs keeps current run."""
     hass = hass_recorder()
@@ -138,7 +300,7 @@ def test_purge_method(hass, hass_recorder):
             hass.data[DATA_INSTANCE].block_till_done()
             wait_recording_done(hass)
             assert (
-                mock_logger.debug.mock_calls[5][1][0]
+                mock_logger.debug.mock_calls[2][1][0]
                 == "Vacuuming SQL DB to free space"
             )
 
@@ -180,6 +342,44 @@ def _add_test_states(hass):
             )
 
 
+def _add_test_states_with_shared_attributes(hass):
+    """Add multiple states sharing attributes to the db for testing."""
+    now = datetime.now()
+    five_days_ago = now - timedelta(days=5)
+    eleven_days_ago = now - timedelta(days=11)
+
+    hass.block_till_done()
+    hass.data[DATA_INSTANCE].block_till_done()
+    wait_recording_done(hass)
+
+    with recorder.session_scope(hass=hass) as session:
+        old_attributes = StateAttributes(shared_attrs=json.dumps({"old": True}))
+        shared_attributes = StateAttributes(shared_attrs=json.dumps({"shared": True}))
+        for event_id in range(6):
+            if event_id < 2:
+                timestamp = eleven_days_ago
+                state_attributes = old_attributes
+            elif event_id < 4:
+                timestamp = five_days_ago
+                state_attributes = shared_attributes
+            else:
+                timestamp = now
+                state_attributes = shared_attributes
+
+            session.add(
+                States(
+                    entity_id="test.recorder2",
+                    domain="sensor",
+                    state="on",
+                    state_attributes=state_attributes,
+                    last_changed=timestamp,
+                    last_updated=timestamp,
+                    created=timestamp,
+                    event_id=event_id + 1000,
+                )
+            )
+
+
 def _add_test_events(hass):
     """Add a few events for testing."""
     now = datetime.now()
@@ -214,6 +414,44 @@ def _add_test_events(hass):
             )
 
 
+def _add_test_events_with_shared_data(hass):
+    """Add a few events sharing data for testing."""
+    now = datetime.now()
+    five_days_ago = now - timedelta(days=5)
+    eleven_days_ago = now - timedelta(days=11)
+
+    hass.block_till_done()
+    hass.data[DATA_INSTANCE].block_till_done()
+    wait_recording_done(hass)
+
+    with recorder.session_scope(hass=hass) as session:
+        session.query(Events).delete()
+        session.query(EventData).delete()
+        event_type = EventTypes(event_type="EVENT_TEST_SHARED")
+        old_data = EventData(shared_data=json.dumps({"old": True}))
+        shared_data = EventData(shared_data=json.dumps({"shared": True}))
+        for event_id in range(6):
+            if event_id < 2:
+                timestamp = eleven_days_ago
+                event_data = old_data
+            elif event_id < 4:
+                timestamp = five_days_ago
+                event_data = shared_data
+            else:
+                timestamp = now
+                event_data = shared_data
+
+            session.add(
+                Events(
+                    event_type_rel=event_type,
+                    event_data_rel=event_data,
+                    origin="LOCAL",
+                    created=timestamp,
+                    time_fired=timestamp,
+                )
+            )
+
+
 def _add_test_recorder_runs(hass):
     """Add a few recorder_runs for testing."""
     now = datetime.now()
@@ -0,0 +1,100 @@
+"""The tests for the typed reads of the recorded states."""
+from datetime import timedelta
+import threading
+from unittest.mock import patch
+
+from homeassistant.components.recorder import queries
+import homeassistant.util.dt as dt_util
+
+from .common import wait_recording_done
+
+from tests.common import async_init_recorder_component
+
+
+def _set_state(hass, when, entity_id, state):
+    """Set a state as if it changed at when."""
+    with patch("homeassistant.core.dt_util.utcnow", return_value=when):
+        hass.states.set(entity_id, state, force_update=True)
+    wait_recording_done(hass)
+
+
+def _record_states(hass):
+    """Record the states of two sensors and return when they started."""
+    start = dt_util.utcnow() - timedelta(hours=1)
+    for minutes, state in enumerate(["10", "unavailable", "30", "20"]):
+        _set_state(hass, start + timedelta(minutes=minutes), "sensor.power", state)
+    _set_state(hass, start, "sensor.other", "100")
+    return start
+
+
+def test_get_last_states(hass_recorder):
+    """Test reading the last states of an entity."""
+    hass = hass_recorder()
+    start = _record_states(hass)
+
+    states = queries.get_last_states(hass, "sensor.Power", 3)
+    assert [state.state for state in states] == ["unavailable", "30", "20"]
+    assert states[0].last_updated == start + timedelta(minutes=1)
+
+    states = queries.get_last_states(
+        hass, "sensor.power", 3, start + timedelta(minutes=2)
+    )
+    assert [state.state for state in states] == ["30", "20"]
+
+
+def test_get_numeric_states(hass_recorder):
+    """Test reading the numeric states of an entity."""
+    hass = hass_recorder()
+    start = _record_states(hass)
+
+    assert queries.get_numeric_states(hass, "sensor.power") == [
+        (start, 10.0),
+        (start + timedelta(minutes=2), 30.0),
+        (start + timedelta(minutes=3), 20.0),
+    ]
+    assert queries.get_numeric_states(
+        hass, "sensor.power", start, start + timedelta(minutes=3)
+    ) == [(start, 10.0), (start + timedelta(minutes=2), 30.0)]
+    assert queries.get_numeric_states(hass, "sensor.power", number_of_states=1) == [
+        (start + timedelta(minutes=3), 20.0)
+    ]
+
+
+def test_get_numeric_aggregates(hass_recorder):
+    """Test aggregating the numeric states of an entity."""
+    hass = hass_recorder()
+    start = _record_states(hass)
+
+    assert queries.get_numeric_aggregates(hass, "sensor.power", start) == {
+        "min": 10.0,
+        "max": 30.0,
+        "mean": 20.0,
+        "count": 3,
+    }
+    assert queries.get_numeric_aggregates(
+        hass, "sensor.power", start + timedelta(minutes=2), start + timedelta(minutes=3)
+    ) == {"min": 30.0, "max": 30.0, "mean": 30.0, "count": 1}
+    assert (
+        queries.get_numeric_aggregates(hass, "sensor.power", dt_util.utcnow()) is None
+    )
+
+
+async def test_reads_run_in_read_executor(hass):
+    """Test the async reads run in the read executor of the recorder."""
+    await async_init_recorder_component(hass)
+
+    with patch.object(
+        queries,
+        "get_last_states",
+        side_effect=lambda *args: threading.current_thread().name,
+    ):
+        thread_name = await queries.async_get_last_states(hass, "sensor.power", 1)
+
+    assert thread_name.startswith("RecorderRead")
+    assert await queries.async_get_numeric_states(hass, "sensor.power") == []
+    assert (
+        await queries.async_get_numeric_aggregates(
+            hass, "sensor.power", dt_util.utcnow()
+        )
+        is None
+    )
@@ -0,0 +1,23 @@
+"""The tests for the recorder backlog sensor."""
+from homeassistant.components.recorder import DEFAULT_MAX_BACKLOG
+from homeassistant.setup import async_setup_component
+
+from tests.common import async_init_recorder_component
+
+
+async def test_backlog_sensor(hass):
+    """Test the sensor reports the backlog metrics."""
+    await async_init_recorder_component(hass)
+    assert await async_setup_component(
+        hass, "sensor", {"sensor": {"platform": "recorder"}}
+    )
+    await hass.async_block_till_done()
+
+    state = hass.states.get("sensor.recorder_backlog")
+    assert state is not None
+    assert int(state.state) >= 0
+    assert state.attributes["unit_of_measurement"] == "events"
+    assert state.attributes["max_backlog"] == DEFAULT_MAX_BACKLOG
+    assert state.attributes["backlog_policy"] == "drop_oldest"
+    assert state.attributes["dropped_events"] == 0
+    assert "backlog" not in state.attributes
@@ -0,0 +1,311 @@
+"""The tests for the recorder statistics."""
+from datetime import timedelta
+from unittest.mock import patch
+
+from homeassistant.components.recorder import purge, statistics
+from homeassistant.components.recorder.const import DATA_INSTANCE
+from homeassistant.components.recorder.models import (
+    States,
+    Statistics,
+    StatisticsShortTerm,
+)
+from homeassistant.components.recorder.util import session_scope
+from homeassistant.setup import async_setup_component
+import homeassistant.util.dt as dt_util
+
+from .common import wait_recording_done
+
+from tests.common import async_init_recorder_component
+
+TEMPERATURE_ATTRIBUTES = {"unit_of_measurement": "°C"}
+ENERGY_ATTRIBUTES = {"unit_of_measurement": "kWh", "device_class": "energy"}
+
+
+def _set_state(hass, when, entity_id, state, attributes):
+    """Set a state as if it changed at when."""
+    with patch("homeassistant.core.dt_util.utcnow", return_value=when):
+        hass.states.set(entity_id, state, attributes, force_update=True)
+    wait_recording_done(hass)
+
+
+def test_get_start_time():
+    """Test the start of the last completed five minute period."""
+    now = dt_util.utc_from_timestamp(1614600000 + 7 * 60 + 12)
+    with patch(
+        "homeassistant.components.recorder.statistics.dt_util.utcnow",
+        return_value=now,
+    ):
+        start = statistics.get_start_time()
+
+    assert start == dt_util.utc_from_timestamp(1614600000)
+
+
+def test_compile_measurement(hass_recorder):
+    """Test the time weighted mean, min and max of a measurement."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    start = dt_util.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(
+        hours=1
+    )
+
+    _set_state(
+        hass,
+        start - timedelta(minutes=1),
+        "sensor.temperature",
+        "10",
+        TEMPERATURE_ATTRIBUTES,
+    )
+    _set_state(
+        hass,
+        start + timedelta(minutes=1),
+        "sensor.temperature",
+        "unavailable",
+        TEMPERATURE_ATTRIBUTES,
+    )
+    _set_state(
+        hass,
+        start + timedelta(minutes=2),
+        "sensor.temperature",
+        "20",
+        TEMPERATURE_ATTRIBUTES,
+    )
+    _set_state(hass, start, "sensor.no_unit", "5", {})
+    _set_state(hass, start, "light.kitchen", "5", TEMPERATURE_ATTRIBUTES)
+
+    statistics.compile_statistics(instance, start)
+    stats = statistics.statistics_during_period(
+        hass, start, period=statistics.PERIOD_5MINUTE
+    )
+
+    assert list(stats) == ["sensor.temperature"]
+    assert stats["sensor.temperature"] == [
+        {
+            "statistic_id": "sensor.temperature",
+            "start": start,
+            "mean": 17.5,
+            "min": 10.0,
+            "max": 20.0,
+            "state": None,
+            "sum": None,
+        }
+    ]
+
+    # Compiling the same period again does not duplicate the rows
+    statistics.compile_statistics(instance, start)
+    with session_scope(hass=hass) as session:
+        assert session.query(StatisticsShortTerm).count() == 1
+
+
+def test_compile_carries_states_forward(hass_recorder):
+    """Test the states at the end of a period start the next one."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    start = dt_util.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(
+        hours=1
+    )
+    second_start = start + statistics.SHORT_TERM_PERIOD
+
+    _set_state(
+        hass,
+        start - timedelta(days=instance.keep_days, minutes=1),
+        "sensor.purged",
+        "5",
+        TEMPERATURE_ATTRIBUTES,
+    )
+    _set_state(
+        hass,
+        start - timedelta(minutes=1),
+        "sensor.temperature",
+        "10",
+        TEMPERATURE_ATTRIBUTES,
+    )
+    statistics.compile_statistics(instance, start)
+    assert instance.statistics_end == second_start
+    assert list(instance.statistics_states) == ["sensor.temperature"]
+
+    with patch.object(
+        statistics, "_get_initial_states", side_effect=AssertionError
+    ) as get_initial_states:
+        statistics.compile_statistics(instance, second_start)
+    assert not get_initial_states.called
+
+    stats = statistics.statistics_during_period(
+        hass, start, period=statistics.PERIOD_5MINUTE
+    )
+    # States older than the purge horizon are not looked up
+    assert list(stats) == ["sensor.temperature"]
+    assert [row["mean"] for row in stats["sensor.temperature"]] == [10.0, 10.0]
+
+
+def test_compile_skips_invalid_attributes(hass_recorder, caplog):
+    """Test an entity with attributes that cannot be parsed is skipped."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    start = dt_util.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(
+        hours=1
+    )
+
+    _set_state(hass, start, "sensor.temperature", "10", TEMPERATURE_ATTRIBUTES)
+    _set_state(hass, start, "sensor.broken", "5", {"unit_of_measurement": "W"})
+    with session_scope(hass=hass) as session:
+        db_state = (
+            session.query(States).filter(States.entity_id == "sensor.broken").one()
+        )
+        db_state.state_attributes.shared_attrs = "{broken"
+
+    statistics.compile_statistics(instance, start)
+    stats = statistics.statistics_during_period(
+        hass, start, period=statistics.PERIOD_5MINUTE
+    )
+
+    assert list(stats) == ["sensor.temperature"]
+    assert "Error parsing the attributes of sensor.broken" in caplog.text
+
+
+def test_compile_total(hass_recorder):
+    """Test the sum of a meter is kept across resets."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    start = dt_util.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(
+        hours=1
+    )
+    second_start = start + statistics.SHORT_TERM_PERIOD
+
+    _set_state(hass, start, "sensor.energy", "100", ENERGY_ATTRIBUTES)
+    _set_state(
+        hass, start + timedelta(minutes=1), "sensor.energy", "110", ENERGY_ATTRIBUTES
+    )
+    statistics.compile_statistics(instance, start)
+
+    _set_state(
+        hass,
+        second_start + timedelta(minutes=1),
+        "sensor.energy",
+        "5",
+        ENERGY_ATTRIBUTES,
+    )
+    _set_state(
+        hass,
+        second_start + timedelta(minutes=2),
+        "sensor.energy",
+        "8",
+        ENERGY_ATTRIBUTES,
+    )
+    statistics.compile_statistics(instance, second_start)
+
+    stats = statistics.statistics_during_period(
+        hass, start, statistic_ids=["sensor.energy"], period=statistics.PERIOD_5MINUTE
+    )
+    assert [(row["state"], row["sum"]) for row in stats["sensor.energy"]] == [
+        (110.0, 10.0),
+        (8.0, 18.0),
+    ]
+
+
+def test_compile_hourly(hass_recorder):
+    """Test the hourly statistics are compiled from the five minute ones."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    hour_start = dt_util.utcnow().replace(
+        minute=0, second=0, microsecond=0
+    ) - timedelta(hours=2)
+
+    for idx in range(12):
+        start = hour_start + idx * statistics.SHORT_TERM_PERIOD
+        _set_state(hass, start, "sensor.temperature", str(idx), TEMPERATURE_ATTRIBUTES)
+        _set_state(hass, start, "sensor.energy", str(idx * 10), ENERGY_ATTRIBUTES)
+        statistics.compile_statistics(instance, start)
+
+    stats = statistics.statistics_during_period(hass, hour_start)
+    assert stats == {
+        "sensor.energy": [
+            {
+                "statistic_id": "sensor.energy",
+                "start": hour_start,
+                "mean": None,
+                "min": None,
+                "max": None,
+                "state": 110.0,
+                "sum": 110.0,
+            }
+        ],
+        "sensor.temperature": [
+            {
+                "statistic_id": "sensor.temperature",
+                "start": hour_start,
+                "mean": 5.5,
+                "min": 0.0,
+                "max": 11.0,
+                "state": None,
+                "sum": None,
+            }
+        ],
+    }
+
+
+def test_purge_short_term_statistics(hass_recorder):
+    """Test only the hourly statistics are kept beyond purge_keep_days."""
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    old = dt_util.utcnow() - timedelta(days=20)
+
+    with session_scope(hass=hass) as session:
+        stats = {"mean": 1.0, "min": 1.0, "max": 1.0}
+        session.add(StatisticsShortTerm.from_stats("sensor.test", old, stats))
+        session.add(Statistics.from_stats("sensor.test", old, stats))
+
+    assert purge.purge_old_data(instance, 10, repack=False)
+
+    with session_scope(hass=hass) as session:
+        assert session.query(StatisticsShortTerm).count() == 0
+        assert session.query(Statistics).count() == 1
+
+
+async def test_websocket_statistics_during_period(hass, hass_ws_client):
+    """Test the websocket command returns the statistics."""
+    await async_init_recorder_component(hass)
+    await async_setup_component(hass, "websocket_api", {})
+    start = dt_util.utcnow() - timedelta(hours=1)
+    stats = {"mean": 1.0, "min": 0.0, "max": 2.0}
+
+    def _add_statistics():
+        with session_scope(hass=hass) as session:
+            session.add(Statistics.from_stats("sensor.test", start, stats))
+
+    await hass.async_add_executor_job(_add_statistics)
+    client = await hass_ws_client(hass)
+
+    await client.send_json(
+        {
+            "id": 1,
+            "type": "recorder/statistics_during_period",
+            "start_time": (start - timedelta(minutes=1)).isoformat(),
+            "statistic_ids": ["sensor.test"],
+        }
+    )
+    msg = await client.receive_json()
+    assert msg["success"]
+    assert msg["result"] == {
+        "sensor.test": [
+            {
+                "statistic_id": "sensor.test",
+                "start": start.isoformat(),
+                "mean": 1.0,
+                "min": 0.0,
+                "max": 2.0,
+                "state": None,
+                "sum": None,
+            }
+        ]
+    }
+
+    await client.send_json(
+        {
+            "id": 2,
+            "type": "recorder/statistics_during_period",
+            "start_time": "not a time",
+        }
+    )
+    msg = await client.receive_json()
+    assert not msg["success"]
+    assert msg["error"]["code"] == "invalid_start_time"
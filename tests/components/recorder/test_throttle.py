@@ -0,0 +1,125 @@
+"""The tests for the recorder write throttle."""
+import pytest
+import voluptuous as vol
+
+from homeassistant.components.recorder.models import States
+from homeassistant.components.recorder.throttle import (
+    THROTTLE_SCHEMA,
+    RecorderThrottle,
+    ThrottleRule,
+)
+from homeassistant.components.recorder.util import session_scope
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, EVENT_STATE_CHANGED
+from homeassistant.core import Event, State
+from homeassistant.setup import async_setup_component
+import homeassistant.util.dt as dt_util
+
+from .common import wait_recording_done
+
+
+def _state_changed(entity_id, state, attributes=None, seconds=0):
+    """Return a state_changed event for a state updated seconds after start."""
+    when = dt_util.utc_from_timestamp(1614600000 + seconds)
+    new_state = State(entity_id, state, attributes, when, when)
+    return Event(EVENT_STATE_CHANGED, {"entity_id": entity_id, "new_state": new_state})
+
+
+def _throttle(hass, **config):
+    """Return a throttle with a single rule."""
+    return RecorderThrottle(hass, [ThrottleRule.from_config(THROTTLE_SCHEMA(config))])
+
+
+def test_schema():
+    """Test a rule needs entities to match and a condition."""
+    with pytest.raises(vol.Invalid):
+        THROTTLE_SCHEMA({"domains": "sensor"})
+    with pytest.raises(vol.Invalid):
+        THROTTLE_SCHEMA({"deadband": 1})
+
+    THROTTLE_SCHEMA({"entity_globs": "sensor.power_*", "min_interval": 10})
+
+
+async def test_deadband(hass):
+    """Test changes within the deadband are held back."""
+    throttle = _throttle(hass, domains="sensor", deadband=1)
+    first = _state_changed("sensor.power", "100")
+    small = _state_changed("sensor.power", "100.5")
+    smaller = _state_changed("sensor.power", "100.8")
+    large = _state_changed("sensor.power", "102")
+    unmatched = _state_changed("light.kitchen", "on")
+
+    assert throttle.async_filter(first) == [first]
+    assert throttle.async_filter(small) == []
+    assert throttle.async_filter(smaller) == []
+    assert throttle.async_filter(unmatched) == [unmatched]
+    # The last value before the gap is recorded with the next change
+    assert throttle.async_filter(large) == [smaller, large]
+    assert throttle.dropped_events == 2
+
+    attributes_changed = _state_changed("sensor.power", "102", {"phase": 2})
+    assert throttle.async_filter(attributes_changed) == [attributes_changed]
+
+
+async def test_min_interval(hass):
+    """Test changes within the minimum interval are held back."""
+    throttle = _throttle(hass, entities="sensor.power", min_interval=10)
+    events = [
+        _state_changed("sensor.power", str(idx), seconds=idx) for idx in range(12)
+    ]
+
+    recorded = []
+    for event in events:
+        recorded.extend(throttle.async_filter(event))
+
+    assert recorded == [events[0], events[9], events[10]]
+
+
+async def test_significant_change(hass):
+    """Test the significant change platforms decide what is recorded."""
+    assert await async_setup_component(hass, "sensor", {})
+    throttle = _throttle(hass, domains="sensor", significant_change=True)
+    await throttle.async_setup()
+    attributes = {"device_class": "temperature", "unit_of_measurement": "°C"}
+    first = _state_changed("sensor.temperature", "20", attributes)
+    small = _state_changed("sensor.temperature", "20.2", attributes)
+    large = _state_changed("sensor.temperature", "21", attributes)
+
+    assert throttle.async_filter(first) == [first]
+    assert throttle.async_filter(small) == []
+    assert throttle.async_filter(large) == [small, large]
+
+
+async def test_removal_and_stop_release_held_changes(hass):
+    """Test removing an entity or stopping records the held back change."""
+    throttle = _throttle(hass, domains="sensor", deadband=1)
+    held = _state_changed("sensor.power", "100.5")
+    removed = Event(
+        EVENT_STATE_CHANGED, {"entity_id": "sensor.power", "new_state": None}
+    )
+    stop = Event(EVENT_HOMEASSISTANT_STOP)
+
+    throttle.async_filter(_state_changed("sensor.power", "100"))
+    assert throttle.async_filter(held) == []
+    assert throttle.async_filter(removed) == [held, removed]
+
+    throttle.async_filter(_state_changed("sensor.power", "100"))
+    assert throttle.async_filter(held) == []
+    assert throttle.async_filter(stop) == [held, stop]
+
+
+def test_recorder_throttle(hass_recorder):
+    """Test the recorder only records the significant changes."""
+    hass = hass_recorder({"throttle": [{"domains": "sensor", "deadband": 5}]})
+
+    for value in ("10", "11", "12", "20", "21"):
+        hass.states.set("sensor.power", value)
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = [
+            state
+            for (state,) in session.query(States.state)
+            .filter(States.entity_id == "sensor.power")
+            .order_by(States.state_id)
+        ]
+    assert states == ["10", "12", "20"]
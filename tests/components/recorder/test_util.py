@@ -1,6 +1,7 @@
 """Test util methods."""
 from datetime import timedelta
 import os
+import queue
 import sqlite3
 from unittest.mock import MagicMock, patch
 
@@ -8,11 +9,17 @@ import pytest
 
 from homeassistant.components.recorder import util
 from homeassistant.components.recorder.const import DATA_INSTANCE, SQLITE_URL_PREFIX
+from homeassistant.core import Event
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.util import dt as dt_util
 
 from .common import wait_recording_done
 
-from tests.common import get_test_home_assistant, init_recorder_component
+from tests.common import (
+    async_init_recorder_component,
+    get_test_home_assistant,
+    init_recorder_component,
+)
 
 
 @pytest.fixture
@@ -215,3 +222,56 @@ def _corrupt_db_file(test_db_file):
     f = open(test_db_file, "a")
     f.write("I am a corrupt db")
     f.close()
+
+
+def test_lru_cache():
+    """Test the lru cache evicts the least recently used keys."""
+    cache = util.LRUCache(2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+    cache["c"] = 3
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+    assert cache.pop("a") == 1
+    assert "a" not in cache
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_recorder_queue():
+    """Test the recorder queue drops the oldest event in place."""
+    recorder_queue = util.RecorderQueue()
+    events = [Event("test_event"), Event("test_event")]
+    for item in ("task", events[0], "other_task", events[1]):
+        recorder_queue.put(item)
+
+    assert recorder_queue.drop_oldest_event()
+    assert recorder_queue.qsize() == 3
+    assert recorder_queue.get() == "task"
+    assert recorder_queue.get_nowait() == "other_task"
+    assert recorder_queue.get() is events[1]
+    assert recorder_queue.empty()
+    assert not recorder_queue.drop_oldest_event()
+    with pytest.raises(queue.Empty):
+        recorder_queue.get_nowait()
+
+
+async def test_add_read_job_recorder_closed(hass):
+    """Test reads fail cleanly once the recorder shut down its executor."""
+    await async_init_recorder_component(hass)
+    instance = hass.data[DATA_INSTANCE]
+
+    assert await util.async_add_read_job(hass, lambda: "read") == "read"
+
+    instance._shutdown_read_executor()
+    with pytest.raises(HomeAssistantError):
+        await util.async_add_read_job(hass, lambda: "read")
+
+    instance.read_executor_closed = False
+    with pytest.raises(HomeAssistantError):
+        await util.async_add_read_job(hass, lambda: "read")
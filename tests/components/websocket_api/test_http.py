@@ -80,3 +80,43 @@ async def test_non_json_message(hass, websocket_client, caplog):
         f"Unable to serialize to JSON. Bad data found at $.result[0](state: test_domain.entity).attributes.bad={bad_data}(<class 'object'>"
         in caplog.text
     )
+
+
+async def test_coalesce_messages(hass, websocket_client):
+    """Test queued messages are written as one frame when supported."""
+    await websocket_client.send_json(
+        {"id": 5, "type": "supported_features", "features": {"coalesce_messages": 1}}
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    await websocket_client.send_json(
+        {"id": 6, "type": "subscribe_events", "event_type": "test_event"}
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    for idx in range(3):
+        hass.bus.async_fire("test_event", {"idx": idx})
+
+    msgs = await websocket_client.receive_json()
+    assert [msg["event"]["data"]["idx"] for msg in msgs] == [0, 1, 2]
+
+
+async def test_collapse_superseded_states(hass, websocket_client):
+    """Test newer states replace queued states of an entity behind the peak."""
+    await websocket_client.send_json(
+        {"id": 5, "type": "subscribe_events", "event_type": "state_changed"}
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    with patch("homeassistant.components.websocket_api.http.PENDING_MSG_PEAK", 0):
+        for state in ("one", "two", "three"):
+            hass.states.async_set("light.kitchen", state)
+        hass.states.async_set("light.hallway", "on")
+
+        msg = await websocket_client.receive_json()
+        assert msg["event"]["data"]["new_state"]["state"] == "three"
+        msg = await websocket_client.receive_json()
+        assert msg["event"]["data"]["entity_id"] == "light.hallway"
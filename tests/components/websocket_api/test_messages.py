@@ -4,9 +4,10 @@ from homeassistant.components.websocket_api.messages import (
     _cached_event_message as lru_event_cache,
     cached_event_message,
     message_to_json,
+    result_message_json,
 )
 from homeassistant.const import EVENT_STATE_CHANGED
-from homeassistant.core import callback
+from homeassistant.core import Event, callback
 
 
 async def test_cached_event_message(hass):
@@ -83,16 +84,28 @@ async def test_message_to_json(caplog):
 
     json_str = message_to_json({"id": 1, "message": "xyz"})
 
-    assert json_str == '{"id": 1, "message": "xyz"}'
+    assert json_str == '{"id":1,"message":"xyz"}'
 
     json_str2 = message_to_json({"id": 1, "message": _Unserializeable()})
 
     assert (
         json_str2
-        == '{"id": 1, "type": "result", "success": false, "error": {"code": "unknown_error", "message": "Invalid JSON in response"}}'
+        == '{"id":1,"type":"result","success":false,"error":{"code":"unknown_error","message":"Invalid JSON in response"}}'
     )
     assert "Unable to serialize to JSON" in caplog.text
 
 
+async def test_spliced_messages_compact(hass):
+    """Test the messages built from cached JSON match message_to_json."""
+    event = Event("test_event", {"value": 1})
+
+    assert cached_event_message(2, event) == message_to_json(
+        {"id": 2, "type": "event", "event": event.as_dict()}
+    )
+    assert result_message_json(3, "[1]") == message_to_json(
+        {"id": 3, "type": "result", "success": True, "result": [1]}
+    )
+
+
 class _Unserializeable:
     """A class that cannot be serialized."""
@@ -125,6 +125,47 @@ async def test_track_point_in_time_drift_rearm(hass):
     assert len(specific_runs) == 1
 
 
+async def test_track_point_in_time_shares_loop_timer(hass, caplog):
+    """Test listeners share one loop timer and run in order."""
+    runs = []
+    now = dt_util.utcnow()
+    first = now + timedelta(seconds=10)
+    second = now + timedelta(seconds=20)
+
+    def timer_handles():
+        return [
+            handle
+            for handle in hass.loop._scheduled  # pylint: disable=protected-access
+            if not handle.cancelled()
+        ]
+
+    timers_before = len(timer_handles())
+
+    @callback
+    def failing_listener(now):
+        raise ValueError("boom")
+
+    async_track_point_in_utc_time(hass, callback(lambda x: runs.append(2)), second)
+    async_track_point_in_utc_time(hass, callback(lambda x: runs.append(1)), first)
+    async_track_point_in_utc_time(hass, failing_listener, first)
+    unsub = async_track_point_in_utc_time(
+        hass, callback(lambda x: runs.append("cancelled")), first
+    )
+    async_track_point_in_utc_time(hass, callback(lambda x: runs.append(3)), second)
+    assert len(timer_handles()) == timers_before + 1
+
+    unsub()
+    async_fire_time_changed(hass, first)
+    await hass.async_block_till_done()
+    assert runs == [1]
+    assert "boom" in caplog.text
+
+    async_fire_time_changed(hass, second)
+    await hass.async_block_till_done()
+    assert runs == [1, 2, 3]
+    assert len(timer_handles()) == timers_before
+
+
 async def test_track_state_change_from_to_state_match(hass):
     """Test track_state_change with from and to state matchers."""
     from_and_to_state_runs = []
@@ -1021,6 +1062,56 @@ async def test_track_template_result(hass):
     assert len(wildercard_runs) == 4
 
 
+async def test_track_template_result_only_renders_affected_templates(hass):
+    """Test a state change only re-renders the templates that depend on it."""
+    template_light = Template("{{ states('light.one') }}", hass)
+    template_lock = Template("{{ states.lock | count }}", hass)
+    template_all = Template("{{ states | count }}", hass)
+    runs = []
+
+    @ha.callback
+    def refresh_listener(event, updates):
+        runs.append({update.template for update in updates})
+
+    info = async_track_template_result(
+        hass,
+        [
+            TrackTemplate(template_light, None),
+            TrackTemplate(template_lock, None),
+            TrackTemplate(template_all, None),
+        ],
+        refresh_listener,
+    )
+    await hass.async_block_till_done()
+
+    render_stats = info.render_stats
+    assert {template: stats.count for template, stats in render_stats.items()} == {
+        template_light: 1,
+        template_lock: 1,
+        template_all: 1,
+    }
+    assert render_stats[template_light].total_time >= 0
+
+    hass.states.async_set("light.one", "on")
+    await hass.async_block_till_done()
+    assert runs == [{template_light, template_all}]
+    assert render_stats[template_light].count == 2
+    assert render_stats[template_lock].count == 1
+    assert render_stats[template_all].count == 2
+
+    hass.states.async_set("lock.one", "locked")
+    await hass.async_block_till_done()
+    assert runs[-1] == {template_lock, template_all}
+    assert render_stats[template_light].count == 2
+    assert render_stats[template_lock].count == 2
+
+    hass.states.async_set("light.one", "off")
+    await hass.async_block_till_done()
+    assert runs[-1] == {template_light}
+    assert render_stats[template_light].count == 3
+    assert render_stats[template_lock].count == 2
+
+
 async def test_track_template_result_complex(hass):
     """Test tracking template."""
     specific_runs = []
@@ -1,8 +1,17 @@
 """Test Home Assistant remote methods and classes."""
+import math
+
 import pytest
 
 from homeassistant import core
-from homeassistant.helpers.json import JSONEncoder
+from homeassistant.helpers.json import (
+    JSONEncoder,
+    json_dumps,
+    json_dumps_pretty,
+    json_dumps_strict,
+    json_loads,
+    raise_on_non_finite,
+)
 from homeassistant.util import dt as dt_util
 
 
@@ -19,3 +28,58 @@ def test_json_encoder(hass):
 
     now = dt_util.utcnow()
     assert ha_json_enc.default(now) == now.isoformat()
+
+
+def test_json_dumps_home_assistant_objects():
+    """Test the JSON facade encodes Home Assistant objects."""
+    state = core.State("test.test", "hello", {"list": [1]})
+    now = dt_util.utcnow()
+    data = {
+        "state": state,
+        "attributes": state.attributes,
+        "set": {"a"},
+        "now": now,
+    }
+
+    assert json_loads(json_dumps(data)) == {
+        "state": json_loads(json_dumps(state.as_dict())),
+        "attributes": {"list": [1]},
+        "set": ["a"],
+        "now": now.isoformat(),
+    }
+
+    with pytest.raises(TypeError):
+        json_dumps({"bad": object()})
+
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), float("-inf")])
+def test_json_dumps_non_finite(value):
+    """Test NaN and infinity are written as null and can be rejected."""
+    assert json_dumps({"list": [1, {"value": value}]}) == '{"list":[1,{"value":null}]}'
+
+    with pytest.raises(ValueError):
+        raise_on_non_finite(value)
+    with pytest.raises(ValueError):
+        raise_on_non_finite({"list": [1, {"value": value}]})
+    with pytest.raises(ValueError):
+        raise_on_non_finite(core.State("test.test", "on", {"value": value}))
+    raise_on_non_finite({"value": None, "text": "null"})
+
+    with pytest.raises(ValueError):
+        json_dumps_strict({"list": [1, {"value": value}]})
+    assert json_dumps_strict({"value": None}) == '{"value":null}'
+
+
+def test_json_loads_non_finite():
+    """Test NaN and infinity written by older versions are decoded."""
+    data = json_loads('{"nan": NaN, "inf": Infinity}')
+
+    assert math.isnan(data["nan"])
+    assert data["inf"] == float("inf")
+    with pytest.raises(ValueError):
+        json_loads('{"bad": }')
+
+
+def test_json_dumps_pretty():
+    """Test the pretty format of the .storage files is indented by 4 spaces."""
+    assert json_dumps_pretty({"key": [1]}) == '{\n    "key": [\n        1\n    ]\n}'
@@ -1,4 +1,5 @@
 """Test Home Assistant template helper methods."""
+from collections import OrderedDict
 from datetime import datetime
 import math
 import random
@@ -2055,35 +2056,59 @@ def test_urlencode(hass):
     assert tpl.async_render() == "the%20quick%20brown%20fox%20%3D%20true"
 
 
-async def test_cache_garbage_collection():
-    """Test caching a template."""
+async def test_compiled_code_shared(hass):
+    """Test templates with the same source share their compiled code."""
     template_string = (
         "{% set dict = {'foo': 'x&y', 'bar': 42} %} {{ dict | urlencode }}"
     )
-    tpl = template.Template(
-        (template_string),
-    )
+    tpl = template.Template(template_string)
     tpl.ensure_valid()
-    assert template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
+    tpl2 = template.Template(template_string, hass)
+    tpl2.ensure_valid()
 
-    tpl2 = template.Template(
-        (template_string),
+    # pylint: disable=protected-access
+    assert tpl._compiled_code is tpl2._compiled_code
+    assert (
+        template._COMPILED_CODE_CACHE[(template.TemplateEnvironment, template_string)]
+        is tpl._compiled_code
     )
-    tpl2.ensure_valid()
-    assert template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
+    assert tpl2.async_render() == "foo=x%26y&bar=42"
+
+
+async def test_compiled_code_cache_size():
+    """Test the least recently used compiled code is evicted."""
+    # pylint: disable=protected-access
+    with patch.object(template, "COMPILED_CODE_CACHE_SIZE", 2), patch.object(
+        template, "_COMPILED_CODE_CACHE", OrderedDict()
+    ) as cache:
+        for source in ("{{ 1 }}", "{{ 2 }}", "{{ 1 }}", "{{ 3 }}"):
+            template.Template(source).ensure_valid()
+
+        assert list(cache) == [
+            (template.TemplateEnvironment, "{{ 1 }}"),
+            (template.TemplateEnvironment, "{{ 3 }}"),
+        ]
+
+
+async def test_async_precompile(hass):
+    """Test precompiling the templates of a config."""
+    config = {
+        "sensors": {
+            "one": {"value_template": template.Template("{{ 1 + 1 }}")},
+            "two": {"value_template": template.Template("{{ 1 + ")},
+        },
+        "static": [template.Template("static")],
+    }
+
+    await template.async_precompile(hass, config)
 
-    del tpl
-    assert template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
-    del tpl2
-    assert not template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
+    # pylint: disable=protected-access
+    tpl = config["sensors"]["one"]["value_template"]
+    assert tpl.hass is hass
+    assert tpl._compiled is not None
+    assert tpl.async_render() == 2
+    assert config["sensors"]["two"]["value_template"]._compiled is None
+    assert config["static"][0]._compiled is None
 
 
 def test_is_template_string():
@@ -2434,3 +2459,68 @@ async def test_parse_result(hass):
         ("0011101.00100001010001", "0011101.00100001010001"),
     ):
         assert template.Template(tpl, hass).async_render() == result
+
+
+@pytest.mark.parametrize(
+    "template_string",
+    [
+        "{{ states('sensor.temperature') | float * 2 }}",
+        "{{ (states('sensor.temperature') | int + 3) // 2 }}",
+        "{{ (states('sensor.temperature') | float / 3) | round(2, 'floor') }}",
+        "{{ 10 < states('sensor.temperature') | float <= 30 }}",
+        "{{ is_state('light.kitchen', 'on') and is_state('light.hall', 'off') }}",
+        "{{ not is_state('light.kitchen', 'on') or is_state('light.hall', 'on') }}",
+        "{{ states('light.kitchen') in ['on', 'off'] }}",
+        "{{ state_attr('sensor.temperature', 'unit_of_measurement') }}",
+        "{{ is_state_attr('sensor.temperature', 'unit_of_measurement', '°C') }}",
+        "{{ states('sensor.missing') }} {{ state_attr('sensor.missing', 'any') }}",
+        "Temperature: {{ states('Sensor.Temperature') }}",
+        "{{ states('sensor.temperature') | float / 0 }}",
+    ],
+)
+async def test_fast_path_render(hass, template_string):
+    """Test simple templates render like Jinja does."""
+    hass.states.async_set("sensor.temperature", "21.5", {"unit_of_measurement": "°C"})
+    hass.states.async_set("light.kitchen", "on")
+    hass.states.async_set("light.hall", "off")
+
+    tpl = template.Template(template_string, hass)
+    info = tpl.async_render_to_info()
+    # pylint: disable=protected-access
+    assert tpl._fast_render is not None
+
+    tpl._fast_render = None
+    jinja_info = tpl.async_render_to_info()
+    assert info._result == jinja_info._result
+    assert str(info.exception) == str(jinja_info.exception)
+    assert info.entities == jinja_info.entities
+
+
+@pytest.mark.parametrize(
+    "template_string",
+    [
+        "{{ states.sensor.temperature.state }}",
+        "{{ states('sensor.temperature', 'extra') }}",
+        "{{ value | float }}",
+        "{% if is_state('light.kitchen', 'on') %}on{% endif %}",
+        "{{ states('sensor.temperature') | float ** 2 }}",
+        "{{ now() }}",
+    ],
+)
+async def test_fast_path_not_used(hass, template_string):
+    """Test other templates are rendered by Jinja."""
+    tpl = template.Template(template_string, hass)
+    tpl.ensure_valid()
+    tpl._ensure_compiled()  # pylint: disable=protected-access
+    assert tpl._fast_render is None  # pylint: disable=protected-access
+
+
+async def test_fast_path_shadowed_by_variables(hass):
+    """Test variables named like the fast path functions render with Jinja."""
+    hass.states.async_set("sensor.temperature", "21.5")
+    tpl = template.Template("{{ states('sensor.temperature') }}", hass)
+
+    assert tpl.async_render() == 21.5
+    assert tpl.async_render({"states": lambda entity_id: entity_id}) == (
+        "sensor.temperature"
+    )
@@ -3,8 +3,10 @@
 import asyncio
 from datetime import datetime, timedelta
 import functools
+import json
 import logging
 import os
+import sys
 from tempfile import TemporaryDirectory
 from unittest.mock import MagicMock, Mock, PropertyMock, patch
 
@@ -38,6 +40,7 @@ from homeassistant.exceptions import (
     InvalidStateError,
     ServiceNotFound,
 )
+from homeassistant.helpers.json import JSONEncoder, json_dumps
 import homeassistant.util.dt as dt_util
 from homeassistant.util.unit_system import METRIC_SYSTEM
 
@@ -308,6 +311,38 @@ def test_event_as_dict():
     assert event.as_dict() == expected
 
 
+def test_event_as_json():
+    """Test an Event as JSON reuses the JSON of its states."""
+    state = ha.State("light.bowl", "on", {"brightness": 100})
+    event = ha.Event(
+        EVENT_STATE_CHANGED,
+        {"entity_id": "light.bowl", "old_state": None, "new_state": state},
+    )
+
+    assert json.loads(event.as_json()) == json.loads(
+        json.dumps(event.as_dict(), cls=JSONEncoder)
+    )
+    assert state.as_json() in event.as_json()
+    # The spliced JSON is as compact as json_dumps
+    assert event.as_json() == json_dumps(event.as_dict())
+    # 2nd time to verify cache
+    assert event.as_json() is event.as_json()
+
+
+def test_state_as_json():
+    """Test a State as JSON."""
+    state = ha.State("sensor.temperature", "20", {"unit_of_measurement": "°C"})
+
+    assert json.loads(state.as_json()) == state.as_dict()
+    assert state.as_json() == json_dumps(state.as_dict())
+    assert json.loads(state.attributes_as_json()) == {"unit_of_measurement": "°C"}
+    # 2nd time to verify cache
+    assert state.as_json() is state.as_json()
+
+    with pytest.raises(ValueError):
+        ha.State("sensor.temperature", "20", {"value": float("nan")}).as_json()
+
+
 def test_state_as_dict():
     """Test a State as dictionary."""
     last_time = datetime(1984, 12, 8, 12, 0, 0)
@@ -471,6 +506,56 @@ async def test_eventbus_coroutine_event_listener(hass):
     assert len(coroutine_calls) == 1
 
 
+async def test_eventbus_keyed_listener(hass):
+    """Test keyed listeners only get the events with their data value."""
+    calls = []
+
+    @ha.callback
+    def listener(event):
+        calls.append(event)
+
+    unsub = hass.bus.async_listen_keyed("test_keyed", "entity_id", "light.a", listener)
+    assert hass.bus.async_listeners()["test_keyed"] == 1
+
+    hass.bus.async_fire("test_keyed", {"entity_id": "light.a"})
+    hass.bus.async_fire("test_keyed", {"entity_id": "light.b"})
+    hass.bus.async_fire("test_keyed", {"entity_id": ["light.a"]})
+    hass.bus.async_fire("test_keyed")
+    hass.bus.async_fire("other", {"entity_id": "light.a"})
+    await hass.async_block_till_done()
+
+    assert len(calls) == 1
+    assert calls[0].data == {"entity_id": "light.a"}
+
+    unsub()
+    assert "test_keyed" not in hass.bus.async_listeners()
+
+    hass.bus.async_fire("test_keyed", {"entity_id": "light.a"})
+    await hass.async_block_till_done()
+    assert len(calls) == 1
+
+
+async def test_eventbus_keyed_listener_match_all(hass):
+    """Test keyed listeners of all event types."""
+    calls = []
+
+    @ha.callback
+    def listener(event):
+        calls.append(event)
+
+    unsub = hass.bus.async_listen_keyed(MATCH_ALL, "entity_id", "light.a", listener)
+
+    hass.bus.async_fire("test_keyed", {"entity_id": "light.a"})
+    hass.bus.async_fire("other", {"entity_id": "light.a"})
+    hass.bus.async_fire("other", {"entity_id": "light.b"})
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_CLOSE, {"entity_id": "light.a"})
+    await hass.async_block_till_done()
+
+    assert [event.event_type for event in calls] == ["test_keyed", "other"]
+    unsub()
+    assert MATCH_ALL not in hass.bus.async_listeners()
+
+
 def test_state_init():
     """Test state.init."""
     with pytest.raises(InvalidEntityFormatError):
@@ -623,6 +708,34 @@ async def test_statemachine_last_changed_not_updated_on_same_state(hass):
     assert state.last_changed == state2.last_changed
 
 
+async def test_statemachine_shares_unchanged_attributes(hass):
+    """Test states with unchanged attributes share the attributes mapping."""
+    hass.states.async_set("sensor.temp", "20", {"unit_of_measurement": "°C"})
+    state = hass.states.get("sensor.temp")
+
+    hass.states.async_set("sensor.temp", "21", {"unit_of_measurement": "°C"})
+    state2 = hass.states.get("sensor.temp")
+    assert state2.attributes is state.attributes
+
+    hass.states.async_set("sensor.temp", "21", {"unit_of_measurement": "°F"})
+    state3 = hass.states.get("sensor.temp")
+    assert state3.attributes is not state2.attributes
+    assert state3.attributes == {"unit_of_measurement": "°F"}
+
+
+async def test_statemachine_interns_common_attributes(hass):
+    """Test common attribute values are interned."""
+    unit = "".join(["k", "Wh"])
+    name = "".join(["Kitchen ", "power"])
+    hass.states.async_set(
+        "sensor.power", "1", {"unit_of_measurement": unit, "friendly_name": name}
+    )
+    attributes = hass.states.get("sensor.power").attributes
+
+    assert attributes["unit_of_measurement"] is sys.intern("kWh")
+    assert attributes["friendly_name"] is sys.intern("Kitchen power")
+
+
 async def test_statemachine_force_update(hass):
     """Test force update option."""
     hass.states.async_set("light.bowl", "on", {})
@@ -1462,6 +1575,38 @@ async def test_async_entity_ids_count(hass):
     assert hass.states.async_entity_ids_count("light") == 3
 
 
+async def test_domain_filter_follows_state_updates(hass):
+    """Test domain filtered lookups see updated and removed states."""
+    hass.states.async_set("light.bowl", "on")
+    hass.states.async_set("light.frog", "on")
+    hass.states.async_set("switch.link", "on")
+    hass.states.async_set("light.bowl", "off")
+
+    assert [state.state for state in hass.states.async_all("light")] == ["off", "on"]
+
+    hass.states.async_remove("light.bowl")
+    hass.states.async_remove("switch.link")
+
+    assert hass.states.async_entity_ids("light") == ["light.frog"]
+    assert hass.states.async_entity_ids(["switch"]) == []
+    assert hass.states.async_entity_ids_count("LIGHT") == 1
+
+
+async def test_domain_filter_iterable_normalized(hass):
+    """Test iterable domain filters ignore repeats and case."""
+    hass.states.async_set("light.bowl", "on")
+    hass.states.async_set("switch.link", "on")
+
+    domains = ["light", "LIGHT", "Switch", "light"]
+    assert hass.states.async_entity_ids(domains) == ["light.bowl", "switch.link"]
+    assert hass.states.async_entity_ids_count(domains) == 2
+    assert [state.entity_id for state in hass.states.async_all(domains)] == [
+        "light.bowl",
+        "switch.link",
+    ]
+    assert hass.states.async_entity_ids_count(iter(["light", "light"])) == 1
+
+
 async def test_hassjob_forbid_coroutine():
     """Test hassjob forbids coroutines."""
 